@@ -0,0 +1,284 @@
+# benchmarks/run_benchmarks.py
+#
+# Performance benchmarks for nel_utils.
+#
+# Two groups of cases:
+#   grid   call_model over a small, representative grid for every entry of
+#          caller.model_dict, on synthetic regression data. Records wall time,
+#          generations per second, peak RSS and log bytes written. Each case
+#          runs in a fresh process so peak RSS is its own. With psutil, RSS is
+#          sampled over the case process and its live workers and the peak of
+#          their sum is kept; without it, the workers are shut down first so
+#          getrusage counts them (largest single process, not the sum).
+#   micro  select_top_n, knn_impute and the evolution-plot aggregations over
+#          the existing notebooks/log files.
+#
+# Results can be saved as a baseline JSON and later runs compared against it;
+# the exit status is 1 when a case is slower than the baseline by more than
+# the tolerance.
+#
+# Usage:
+#   python benchmarks/run_benchmarks.py --save-baseline benchmarks/baseline.json
+#   python benchmarks/run_benchmarks.py --baseline benchmarks/baseline.json
+
+import argparse
+import glob
+import json
+import multiprocessing as mp
+import os
+import resource
+import sys
+import tempfile
+import threading
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, 'src'))
+
+LOG_DIR = os.path.join(ROOT, 'notebooks', 'log')
+CONFIGS = {
+    'gp': os.path.join(ROOT, 'configs', 'gp_config.json'),
+    'gsgp': os.path.join(ROOT, 'configs', 'gsgp_config.json'),
+    'slim': os.path.join(ROOT, 'configs', 'slim_config.json')
+}
+
+# ---------------- DATA ---------------- #
+
+def make_regression_data(n_rows, n_features, seed=0):
+    """Synthetic regression target: a few interacting features plus noise, as torch tensors."""
+    import numpy as np
+    import torch
+
+    rng = np.random.default_rng(seed)
+    X = rng.normal(size=(n_rows, n_features))
+    y = 3 * X[:, 0] - 2 * X[:, 1 % n_features] * X[:, 2 % n_features] + np.sin(X[:, 3 % n_features])
+    y += rng.normal(scale=0.1, size=n_rows)
+
+    return torch.tensor(X, dtype=torch.float32), torch.tensor(y, dtype=torch.float32)
+
+# ---------------- GRID CASES ---------------- #
+
+class _RSSSampler:
+    """Peak of the summed RSS of this process and its descendants (needs psutil)."""
+
+    def __init__(self, interval=0.05):
+        import psutil
+
+        self.process = psutil.Process()
+        self.interval = interval
+        self.peak = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def _sample(self):
+        import psutil
+
+        total = 0
+        for proc in [self.process, *self.process.children(recursive=True)]:
+            try:
+                total += proc.memory_info().rss
+            except psutil.Error:
+                pass
+        self.peak = max(self.peak, total)
+
+    def _run(self):
+        while not self._stop.is_set():
+            self._sample()
+            self._stop.wait(self.interval)
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+        self._sample()
+
+def _peak_rss_mb(sampler):
+    if sampler is not None:
+        return sampler.peak / 2**20
+
+    # Workers only count in RUSAGE_CHILDREN once they have been waited for
+    from joblib.externals.loky import get_reusable_executor
+    get_reusable_executor().shutdown(wait=True)
+    rss_kb = max(
+        resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+        resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss
+    )
+    return rss_kb / 1024
+
+def _grid_case(algorithm, args, queue):
+
+    from contextlib import nullcontext
+    from nel_utils import caller, json_parser
+
+    try:
+        sampler = _RSSSampler()
+    except ImportError:
+        sampler = None
+
+    config = json_parser.load_config(CONFIGS[algorithm], algorithm)
+    X, y = make_regression_data(args.rows, args.features, seed=args.seed)
+    n_train = int(0.8 * len(X))
+
+    # Representative grid: two population sizes (and SLIM versions), first value of the rest
+    param_grid = {
+        k: v[:2] if k in ('pop_size', 'slim_version') else v[:1]
+        for k, v in config['grid_params'].items()
+    }
+
+    with tempfile.TemporaryDirectory() as log_dir:
+        log_path = os.path.join(log_dir, f'_{algorithm}_0.csv')
+        fixed_params = {
+            **config['solver_params'],
+            'n_iter': args.n_iter,
+            'X_train': X[:n_train], 'y_train': y[:n_train],
+            'X_test': X[n_train:], 'y_test': y[n_train:],
+            'log_path': log_path,
+            'verbose': 0
+        }
+
+        with sampler or nullcontext():
+            start = time.perf_counter()
+            caller.call_model(fixed_params, param_grid, seed=args.seed, n_jobs=args.n_jobs)
+            wall = time.perf_counter() - start
+
+        log_bytes = sum(os.path.getsize(p) for p in glob.glob(os.path.join(log_dir, '*')))
+        with open(log_path) as f:
+            generations = sum(1 for _ in f)
+
+    queue.put({
+        'wall_s': wall,
+        'generations_per_s': generations / wall,
+        'peak_rss_mb': _peak_rss_mb(sampler),
+        'log_bytes': log_bytes
+    })
+
+def run_grid_cases(args):
+
+    ctx = mp.get_context('spawn')
+    results = {}
+
+    for algorithm in CONFIGS:
+        queue = ctx.Queue()
+        proc = ctx.Process(target=_grid_case, args=(algorithm, args, queue))
+        proc.start()
+        res = queue.get()
+        proc.join()
+        results[f'grid/{algorithm}'] = res
+    return results
+
+# ---------------- MICRO CASES ---------------- #
+
+def _best_of(fn, repeat):
+
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - start)
+    return {'wall_s': min(times)}
+
+def _read_logs(algorithm):
+
+    import pandas as pd
+
+    frames = []
+    for path in sorted(glob.glob(os.path.join(LOG_DIR, '*', f'_{algorithm}_[0-9].csv'))):
+        tmp = pd.read_csv(path, header=None)
+        tmp['cv'] = int(path[-5])
+        frames.append(tmp)
+    return pd.concat(frames, ignore_index=True)
+
+def run_micro_cases(args):
+
+    import numpy as np
+    import pandas as pd
+    from nel_utils import imputer, selector
+    from nel_utils.aggregator import GenerationStats
+
+    results = {}
+
+    for algorithm in ('gp', 'gsgp'):
+        df_log = _read_logs(algorithm)
+        results[f'micro/select_top_n/{algorithm}'] = _best_of(
+            lambda: selector.select_top_n(df_log, algorithm), args.repeat
+        )
+        results[f'micro/nsmallest_size/{algorithm}'] = _best_of(
+            lambda: selector.MODEL_DICT[algorithm](df_log, 9, 10), args.repeat
+        )
+
+    rng = np.random.default_rng(args.seed)
+    values = rng.normal(size=(args.rows, args.features))
+    values[rng.random(values.shape) < 0.05] = np.nan
+    df = pd.DataFrame(values, columns=[f'x{i}' for i in range(args.features)])
+    results['micro/knn_impute'] = _best_of(lambda: imputer.knn_impute(df), args.repeat)
+
+    slim_paths = sorted(glob.glob(os.path.join(LOG_DIR, '*', '_slim_[0-9].csv')))
+    df_slim = _read_logs('slim')
+
+    def groupby_agg():
+        for var in (5, 8, 9):
+            for sv in df_slim[0].unique():
+                df_slim[df_slim[0] == sv].groupby(4)[var].agg(['mean', 'std'])
+
+    results['micro/plot_agg/groupby'] = _best_of(groupby_agg, args.repeat)
+    results['micro/plot_agg/streaming'] = _best_of(
+        lambda: GenerationStats.from_csv(slim_paths), args.repeat
+    )
+    return results
+
+# ---------------- BASELINE ---------------- #
+
+def compare(results, baseline, tolerance):
+    """Print every case against the baseline; return the cases slower than tolerance allows."""
+    regressions = []
+    print(f"{'case':40s} {'wall_s':>10s} {'baseline':>10s} {'ratio':>7s}")
+
+    for case, metrics in results.items():
+        ref = baseline.get(case, {}).get('wall_s')
+        ratio = metrics['wall_s'] / ref if ref else float('nan')
+        flag = ''
+        if ref and ratio > 1 + tolerance:
+            regressions.append(case)
+            flag = '  <-- slower'
+        print(f"{case:40s} {metrics['wall_s']:10.4f} {ref or float('nan'):10.4f} {ratio:7.2f}{flag}")
+
+    return regressions
+
+def main():
+
+    parser = argparse.ArgumentParser(description='Benchmark nel_utils grid runs and analysis helpers.')
+    parser.add_argument('--only', choices=['grid', 'micro'], help='run a single group of cases')
+    parser.add_argument('--rows', type=int, default=1000, help='synthetic dataset rows')
+    parser.add_argument('--features', type=int, default=10, help='synthetic dataset features')
+    parser.add_argument('--n-iter', type=int, default=10, help='generations per grid run')
+    parser.add_argument('--n-jobs', type=int, default=1, help='call_model n_jobs')
+    parser.add_argument('--repeat', type=int, default=3, help='repetitions of micro cases (best is kept)')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--baseline', help='baseline JSON to compare against')
+    parser.add_argument('--save-baseline', help='write the results to this JSON')
+    parser.add_argument('--tolerance', type=float, default=0.10, help='allowed slowdown ratio')
+    args = parser.parse_args()
+
+    results = {}
+    if args.only in (None, 'grid'):
+        results.update(run_grid_cases(args))
+    if args.only in (None, 'micro'):
+        results.update(run_micro_cases(args))
+
+    print(json.dumps(results, indent=2))
+
+    if args.save_baseline:
+        with open(args.save_baseline, 'w') as f:
+            json.dump(results, f, indent=2)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        if compare(results, baseline, args.tolerance):
+            sys.exit(1)
+
+if __name__ == '__main__':
+    main()
@@ -1 +1,24 @@
-# Package level __init__.py
\ No newline at end of file
+# Package level __init__.py
+#
+# Submodules are imported on first attribute access (PEP 562): `import
+# nel_utils` loads nothing else, and `nel_utils.selector` only loads what
+# selector needs. `from nel_utils import caller, plotter` works as before.
+# The solvers (slim_gsgp, torch) and plotly are in turn only imported by the
+# functions that use them; `python -m nel_utils.importtime` reports the cost.
+
+import importlib
+
+__all__ = [
+    'aggregator', 'budget', 'cache', 'caller', 'compiler', 'dataset', 'hooks',
+    'imputer', 'importtime', 'json_parser', 'logio', 'logstore', 'manifest',
+    'nested_cv', 'options', 'planner', 'plotter', 'racing', 'retention', 'selector',
+    'semantics', 'shared', 'tailer', 'workqueue'
+]
+
+def __getattr__(name):
+    if name in __all__:
+        return importlib.import_module(f'.{name}', __name__)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
@@ -0,0 +1,143 @@
+# nel_utils/aggregator.py
+#
+# Streaming per-generation statistics over run logs.
+#
+# Logs are consumed chunk by chunk. For every (variant, generation, metric)
+# only (count, mean, M2) is kept, and chunks are merged with the pairwise
+# Welford update (Chan et al.), so memory depends on the number of
+# generations, not the number of log rows.
+
+import numpy as np
+import pandas as pd
+from .logio import read_log
+from .logstore import LogStore, name_columns
+
+METRICS = ['rmse_train', 'rmse_test', 'size', 'size_log']
+
+def _merge(a, b):
+    """Combine two (count, mean, m2) frames aligned on the same index."""
+    a, b = a.align(b, fill_value=0)
+    out = pd.DataFrame(index=a.index)
+
+    for metric in a.columns.get_level_values(0).unique():
+        n_a, n_b = a[(metric, 'count')], b[(metric, 'count')]
+        n = n_a + n_b
+        delta = b[(metric, 'mean')] - a[(metric, 'mean')]
+        ratio = (n_b / n.where(n > 0)).fillna(0)
+
+        out[(metric, 'count')] = n
+        out[(metric, 'mean')] = a[(metric, 'mean')] + delta * ratio
+        out[(metric, 'm2')] = a[(metric, 'm2')] + b[(metric, 'm2')] + delta ** 2 * n_a * ratio
+
+    out.columns = pd.MultiIndex.from_tuples(out.columns)
+    return out
+
+class GenerationStats:
+    """
+    Running mean and variance per (variant, generation, metric).
+
+    Metrics are train/test RMSE, program size and log10(size + 1).
+    Instances are accepted by `plotter.make_evolution_plot` and
+    `plotter.make_slim_evolution_plots` in place of a log DataFrame.
+    """
+
+    def __init__(self):
+        self.state = None
+
+    def update(self, chunk):
+        """
+        Fold a chunk of log rows into the statistics.
+
+        Parameters
+        ----------
+        chunk : pd.DataFrame
+            Headerless log rows or a frame with named log columns.
+        """
+        chunk = name_columns(chunk)
+        size = pd.to_numeric(chunk['size'], errors='coerce').astype('float64')
+
+        values = pd.DataFrame({
+            'variant': chunk['variant'].to_numpy(),
+            'generation': chunk['generation'].to_numpy(),
+            'rmse_train': chunk['rmse_train'].to_numpy(dtype='float64'),
+            'rmse_test': pd.to_numeric(chunk['rmse_test'], errors='coerce').to_numpy(),
+            'size': size.to_numpy(),
+            'size_log': np.log10(size.fillna(0).clip(lower=0) + 1).to_numpy()
+        })
+
+        grouped = values.groupby(['variant', 'generation'])[METRICS]
+        stats = pd.concat({
+            'count': grouped.count(),
+            'mean': grouped.mean(),
+            'm2': grouped.var(ddof=0).mul(grouped.count())
+        }, axis=1).swaplevel(axis=1).sort_index(axis=1)
+
+        self.state = stats if self.state is None else _merge(self.state, stats)
+        return self
+
+    @classmethod
+    def from_csv(cls, paths, chunksize=100_000):
+        """Aggregate headerless log CSVs (plain or compressed), reading `chunksize` rows at a time."""
+        stats = cls()
+        for path in [paths] if isinstance(paths, str) else paths:
+            for chunk in read_log(path, chunksize=chunksize):
+                stats.update(chunk)
+        return stats
+
+    @classmethod
+    def from_store(cls, store, algorithm=None, cv=None):
+        """Aggregate a LogStore batch by batch, decoding only the needed columns."""
+        import pyarrow.dataset as ds
+
+        if not isinstance(store, LogStore):
+            store = LogStore(store)
+
+        expr = None
+        for name, value in (('algorithm', algorithm), ('cv', cv)):
+            if value is not None:
+                cond = ds.field(name).isin(value if isinstance(value, list) else [value])
+                expr = cond if expr is None else expr & cond
+
+        stats = cls()
+        batches = store.dataset().to_batches(
+            columns=['variant', 'generation', 'rmse_train', 'rmse_test', 'size'], filter=expr
+        )
+        for batch in batches:
+            if batch.num_rows:
+                stats.update(batch.to_pandas())
+        return stats
+
+    def frame(self, metric, variant=None):
+        """
+        Per-generation aggregate of `metric`.
+
+        Parameters
+        ----------
+        metric : str
+            One of METRICS.
+        variant : str, optional
+            Restrict to one variant (e.g. a SLIM version); all variants are
+            pooled if None.
+
+        Returns
+        -------
+        pd.DataFrame
+            Columns 'x', 'mean', 'std' (sample std, as pandas), one row per generation.
+        """
+        state = self.state[metric]
+        if variant is not None:
+            state = state.xs(variant, level='variant')
+        else:
+            pooled = None
+            for _, group in state.groupby(level='variant'):
+                group = pd.concat({metric: group.droplevel('variant')}, axis=1)
+                pooled = group if pooled is None else _merge(pooled, group)
+            state = pooled[metric]
+
+        count = state['count']
+        agg = pd.DataFrame({
+            'x': state.index.get_level_values('generation'),
+            'mean': state['mean'].to_numpy(),
+            'std': np.sqrt(state['m2'] / (count - 1).where(count > 1)).to_numpy()
+        })
+        return agg.sort_values('x').reset_index(drop=True)
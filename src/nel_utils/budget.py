@@ -0,0 +1,317 @@
+# nel_utils/budget.py
+#
+# Per-run resource budgets for grid points that blow up.
+#
+# GSGP program size grows exponentially with the generations, and a few
+# grid points can take most of a sweep's time and memory, or get the whole
+# worker killed. With `call_model(budget=Budget(...))` (or
+# `nested_cv.run/run_all(budget=...)`) each solver call runs in a child
+# process of its own, watched by a thread of the calling process (the grid
+# then runs on threads instead of loky workers) or by the queue worker:
+#
+#   wall   seconds since the child started
+#   rss    resident memory of the child, in bytes (/proc, or psutil)
+#   size   'size' of the run's last logged generation (exact integer)
+#
+# Run processes are never forked from a threaded process. Each watching
+# thread owns a launcher: a single-threaded helper started once with spawn,
+# which imports the solver module once and forks one process per run from
+# itself, so a run neither imports torch again nor the calling script. The
+# launcher relays the run's messages and exit status; the wall clock starts
+# once the run is ready to call the solver.
+#
+# The parent picks the run UUID and pins `uuid.uuid1` to it in the child, so
+# it can follow that run's rows in the shared log while other workers append
+# to it too. A run over budget gets SIGTERM, raised as SystemExit in the
+# child so the row being written completes, then SIGKILL after `grace`
+# seconds. Its result is censored: no model, the metrics of its last logged
+# generation, and 'censored' = {'reason', 'limit', 'value', 'generation'}.
+# Censored results are neither cached nor spilled, and rank last wherever
+# configs are compared. A child that fails to start, raises, or dies without
+# being stopped by its budget (e.g. by the OOM killer) is an error.
+
+import importlib
+import math
+import multiprocessing as mp
+import os
+import signal
+import sys
+import threading
+import time
+import traceback
+import uuid
+from multiprocessing.connection import Connection
+
+REASONS = ('wall', 'rss', 'size')
+
+def censored(res):
+    """True if `res` is the result of a run stopped by its budget."""
+    return bool(res.get('censored'))
+
+def score(res):
+    """rmse_test of a result for ranking configs; inf when censored."""
+    return math.inf if censored(res) else res['rmse_test']
+
+def _rss(pid):
+    """Resident memory of process `pid` in bytes, None if it cannot be read."""
+    try:
+        with open(f'/proc/{pid}/status') as f:
+            for line in f:
+                if line.startswith('VmRSS:'):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+
+    try:
+        import psutil
+        return psutil.Process(pid).memory_info().rss
+    except Exception:
+        return None
+
+def _number(text):
+    text = text.strip()
+    return int(text) if text.isdigit() else float(text)
+
+class _LogWatch:
+    """Last logged generation of one run, read incrementally from a shared log."""
+
+    def __init__(self, path, run_id):
+        self.path = path
+        self.run_id = run_id
+        self.offset = os.path.getsize(path) if path and os.path.exists(path) else 0
+        self.last = None
+
+    def poll(self):
+        if not self.path or not os.path.exists(self.path):
+            return self.last
+        size = os.path.getsize(self.path)
+        if size < self.offset:
+            self.offset = 0
+        if size == self.offset:
+            return self.last
+
+        with open(self.path, 'rb') as f:
+            f.seek(self.offset)
+            data = f.read(size - self.offset)
+        end = data.rfind(b'\n') + 1
+        self.offset += end
+
+        for line in data[:end].decode(errors='replace').splitlines():
+            fields = line.split(',')
+            if len(fields) >= 10 and fields[1] == self.run_id:
+                self.last = {
+                    'generation': int(fields[4]),
+                    'rmse_train': float(fields[5]),
+                    'rmse_test': float(fields[8]),
+                    'size': _number(fields[9])
+                }
+        return self.last
+
+def _child(conn, fit, run_id):
+    """Run `fit` with uuid1 pinned to `run_id` and send back its return value."""
+    import cloudpickle
+
+    def stop(signum, frame):
+        sys.exit(128 + signum)
+
+    signal.signal(signal.SIGTERM, stop)
+    uuid.uuid1 = lambda node=None, clock_seq=None: run_id
+
+    try:
+        fit = cloudpickle.loads(fit)
+        conn.send_bytes(b'')
+        out = ('ok', fit())
+    except SystemExit:
+        return
+    except BaseException:
+        out = ('error', traceback.format_exc())
+    conn.send_bytes(cloudpickle.dumps(out))
+
+def _launcher(conn):
+    """Fork one process per requested run and relay its messages, then its exit code."""
+    import cloudpickle  # noqa: F401, imported once for every run
+
+    while True:
+        try:
+            fit, run_id, preload = conn.recv()
+        except EOFError:
+            return
+        for module in preload:
+            try:
+                importlib.import_module(module)
+            except ImportError:
+                pass  # the run reports it when it unpickles `fit`
+
+        r, w = os.pipe()
+        pid = os.fork()
+        if pid == 0:
+            conn.close()
+            os.close(r)
+            try:
+                with Connection(w, readable=False) as out:
+                    _child(out, fit, run_id)
+            finally:
+                sys.stdout.flush()
+                sys.stderr.flush()
+                os._exit(0)
+
+        os.close(w)
+        conn.send(('pid', pid))
+        with Connection(r, writable=False) as out:
+            while True:
+                try:
+                    conn.send(('message', out.recv_bytes()))
+                except EOFError:
+                    break
+        conn.send(('exit', os.waitstatus_to_exitcode(os.waitpid(pid, 0)[1])))
+
+def _signal(pid, signum):
+    try:
+        os.kill(pid, signum)
+    except ProcessLookupError:
+        pass
+
+# Launcher (process, connection) of each watching thread
+_LAUNCHERS = threading.local()
+
+def _get_launcher():
+
+    if mp.current_process().daemon:
+        raise RuntimeError('Budget runs need a non-daemon process to start their launcher.')
+
+    launcher = getattr(_LAUNCHERS, 'value', None)
+    if launcher is None or not launcher[0].is_alive():
+        ctx = mp.get_context('spawn')
+        conn, child_conn = ctx.Pipe()
+        proc = ctx.Process(target=_launcher, args=(child_conn,), daemon=True)
+        proc.start()
+        child_conn.close()
+        launcher = _LAUNCHERS.value = (proc, conn)
+    return launcher
+
+class Budget:
+    """
+    Wall-clock, memory and program-size limits for each solver call.
+
+    Parameters
+    ----------
+    wall : float, optional
+        Seconds per run.
+    rss : int, optional
+        Resident memory of the run's process, in bytes.
+    size : int, optional
+        Largest 'size' a run may log; needs the solver's `log_path` and
+        `log_level` > 0.
+    poll : float, optional
+        Seconds between checks.
+    grace : float, optional
+        Seconds between SIGTERM and SIGKILL.
+
+    Limits left as None are not enforced.
+    """
+
+    def __init__(self, wall=None, rss=None, size=None, poll=0.5, grace=5.0):
+        self.wall = wall
+        self.rss = rss
+        self.size = size
+        self.poll = poll
+        self.grace = grace
+
+    def _over(self, elapsed, rss, last):
+        """(reason, limit, value) of the first limit exceeded, or None."""
+        if self.wall is not None and elapsed > self.wall:
+            return 'wall', self.wall, elapsed
+        if self.rss is not None and rss is not None and rss > self.rss:
+            return 'rss', self.rss, rss
+        if self.size is not None and last is not None and last['size'] > self.size:
+            return 'size', self.size, last['size']
+        return None
+
+    def run(self, fit, log_path=None, preload=()):
+        """
+        Call `fit()` in a watched child process.
+
+        Parameters
+        ----------
+        fit : callable
+            Runs the solver and returns a picklable (cloudpickle) value.
+        log_path : str, optional
+            Log the run writes to, followed for the size limit and the last
+            metrics.
+        preload : sequence of str, optional
+            Modules the launcher imports before forking the run (e.g. the
+            solver's), kept for its later runs.
+
+        Returns
+        -------
+        tuple
+            (value, run_id, censored): `value` is what `fit` returned, None
+            when censored; `run_id` the UUID the run logged under; `censored`
+            None, or the dict described in the module header, holding the
+            last logged metrics under 'last'.
+
+        Raises
+        ------
+        RuntimeError
+            If the run could not be started, if `fit` raised (the child's
+            traceback is in the message), or if the run exited without a
+            result while within budget.
+        """
+        import cloudpickle
+
+        proc, conn = _get_launcher()
+        run_id = uuid.uuid1()
+        watch = _LogWatch(log_path, str(run_id))
+
+        pid, finished = None, False
+        try:
+            conn.send((cloudpickle.dumps(fit), run_id, list(preload)))
+            _, pid = conn.recv()
+            start = time.monotonic()
+
+            over, out, kill_at = None, None, None
+            while True:
+                if conn.poll(self.poll):
+                    kind, value = conn.recv()
+                    if kind == 'exit':
+                        break
+                    if not value:
+                        # Ready to call the solver: start-up does not count
+                        start = time.monotonic()
+                    else:
+                        out = cloudpickle.loads(value)
+                    continue
+
+                if over is None and out is None:
+                    over = self._over(time.monotonic() - start, _rss(pid), watch.poll())
+                    if over is not None:
+                        _signal(pid, signal.SIGTERM)
+                        kill_at = time.monotonic() + self.grace
+                elif kill_at is not None and time.monotonic() > kill_at:
+                    _signal(pid, signal.SIGKILL)
+                    kill_at = None
+            finished = True
+        except (EOFError, OSError) as e:
+            raise RuntimeError(f'Run {run_id} lost its launcher: {e!r}') from e
+        finally:
+            if not finished:
+                # Launcher lost, or the watch interrupted: the next run starts a new one
+                if pid is not None:
+                    _signal(pid, signal.SIGKILL)
+                proc.kill()
+                _LAUNCHERS.value = None
+
+        if out is not None:
+            status, value = out
+            if status == 'error':
+                raise RuntimeError(f'Run {run_id} failed:\n{value}')
+            return value, str(run_id), None
+        if over is None:
+            raise RuntimeError(f'Run {run_id} exited with code {value} without a result.')
+
+        last = watch.poll()
+        reason, limit, value = over
+        return None, str(run_id), {
+            'reason': reason, 'limit': limit, 'value': value,
+            'generation': None if last is None else last['generation'], 'last': last
+        }
@@ -0,0 +1,138 @@
+# nel_utils/cache.py
+#
+# On-disk, content-addressed store for finished grid runs.
+#
+# Every result is keyed by a hash of (algorithm, effective params, fold
+# indices, seed), so a rerun of the same grid on the same folds finds the
+# configs that already finished and only executes the missing ones. The
+# effective params are the ones the solver actually gets, `set_max_depth`
+# applied. Without fold indices, a fingerprint of the data arrays takes their
+# place, so runs on different datasets never share a key.
+#
+# Layout:
+#   <root>/<key[:2]>/<key>.pkl   full result dict (model included)
+#   <root>/<key[:2]>/<key>.json  metrics only, readable without the solvers
+
+import hashlib
+import json
+import os
+
+import numpy as np
+
+# Data tensors are identified through the fold indices, not hashed themselves
+DATA_KEYS = ('X_train', 'y_train', 'X_test', 'y_test')
+
+def _canonical(obj):
+
+    if isinstance(obj, dict):
+        return {str(k): _canonical(v) for k, v in sorted(obj.items(), key=lambda kv: str(kv[0]))}
+    if isinstance(obj, (list, tuple)):
+        return [_canonical(v) for v in obj]
+    if hasattr(obj, 'tolist'):
+        return obj.tolist()
+    if obj is None or isinstance(obj, (bool, int, float, str)):
+        return obj
+    return repr(obj)
+
+def effective_params(fixed_params, dynamic_params, set_max_depth=False):
+    """Solver parameters a grid point actually runs with, data and log path excluded."""
+    params = {**fixed_params, **dynamic_params}
+    if set_max_depth:
+        params['max_depth'] = params['init_depth'] + 15
+    return {k: v for k, v in params.items() if k not in DATA_KEYS and k not in ('log_path', 'algorithm')}
+
+def fingerprint(params):
+    """SHA-256 of the data arrays (numpy or torch) among `params`, None if there are none."""
+    digest = hashlib.sha256()
+    found = False
+    for name in DATA_KEYS:
+        value = params.get(name)
+        if value is None:
+            continue
+        if hasattr(value, 'detach'):
+            value = value.detach().cpu().numpy()
+        value = np.ascontiguousarray(value)
+        digest.update(f'{name}:{value.dtype.str}:{value.shape}'.encode())
+        digest.update(value.tobytes())
+        found = True
+    return digest.hexdigest() if found else None
+
+def make_key(algorithm, fixed_params, dynamic_params, fold=None, seed=None, set_max_depth=False, data=None):
+    """
+    Hash a run description into a hex digest.
+
+    Parameters
+    ----------
+    algorithm : str
+        Key of `caller.model_dict`.
+    fixed_params : dict
+        Solver parameters; data tensors and `log_path` are ignored.
+    dynamic_params : dict
+        The grid point.
+    fold : any, optional
+        Fold indices (arrays or nested lists of arrays) identifying the data.
+    seed : int, optional
+        Seed of the run.
+    set_max_depth : bool, optional
+        Whether the run gets max_depth = init_depth + 15.
+    data : str, optional
+        `fingerprint` of the data arrays, used when `fold` is None; computed
+        from `fixed_params` if not given.
+
+    Returns
+    -------
+    str
+        SHA-256 hex digest.
+    """
+    if fold is None:
+        fold = {'data': data or fingerprint(fixed_params)}
+    payload = json.dumps(
+        _canonical([algorithm, effective_params(fixed_params, dynamic_params, set_max_depth), fold, seed]),
+        sort_keys=True, separators=(',', ':')
+    )
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+class ResultCache:
+    """
+    Directory-backed result cache. Instances only hold the root path, so they
+    can be shipped to worker processes, which store results as they finish.
+    """
+
+    def __init__(self, root):
+        self.root = root
+
+    def _path(self, key, ext):
+        return os.path.join(self.root, key[:2], f'{key}.{ext}')
+
+    def __contains__(self, key):
+        return os.path.exists(self._path(key, 'pkl'))
+
+    def get(self, key):
+        """Return the stored result dict for `key`, or None."""
+        import cloudpickle
+
+        if key not in self:
+            return None
+        with open(self._path(key, 'pkl'), 'rb') as f:
+            return cloudpickle.load(f)
+
+    def metrics(self, key):
+        """Return the stored metrics for `key` without unpickling the model."""
+        with open(self._path(key, 'json'), 'r') as f:
+            return json.load(f)
+
+    def put(self, key, res):
+        """Store a result dict; the write is atomic so a crash never leaves a partial entry."""
+        import cloudpickle
+
+        os.makedirs(os.path.dirname(self._path(key, 'pkl')), exist_ok=True)
+
+        metrics = {k: _canonical(v) for k, v in res.items() if k != 'model'}
+        for ext, mode, dump, obj in (
+            ('json', 'w', json.dump, metrics),
+            ('pkl', 'wb', cloudpickle.dump, res)
+        ):
+            path = self._path(key, ext)
+            with open(path + '.tmp', mode) as f:
+                dump(obj, f)
+            os.replace(path + '.tmp', path)
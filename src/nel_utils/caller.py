@@ -1,43 +1,444 @@
-from itertools import product
-from slim_gsgp.main_gp import gp
-from slim_gsgp.main_gsgp import gsgp
-from slim_gsgp.main_slim import slim
-
-model_dict = {
-    "gp": gp,
-    "gsgp": gsgp,
-    "slim": slim
+import importlib
+import math
+import time
+import uuid
+from collections.abc import Mapping
+from concurrent.futures import FIRST_COMPLETED, wait
+from itertools import islice
+from .budget import censored, score
+from .hooks import Hooks, measure
+from .manifest import recording
+from .options import RunOptions
+from .retention import Retention, model_size
+from .semantics import compute_semantics
+from .shared import FoldDatasets
+
+DATA_KEYS = ('X_train', 'y_train', 'X_test', 'y_test')
+
+# Model key -> (module, solver). slim_gsgp pulls in torch, so a solver is
+# only imported when a run of it is first fitted.
+SOLVERS = {
+    "gp": ("slim_gsgp.main_gp", "gp"),
+    "gsgp": ("slim_gsgp.main_gsgp", "gsgp"),
+    "slim": ("slim_gsgp.main_slim", "slim")
 }
 
+class _Solvers(Mapping):
+    """Read-only `model_dict` importing each solver on first access."""
+
+    def __init__(self):
+        self._loaded = {}
+
+    def __getitem__(self, key):
+        if key not in self._loaded:
+            module, name = SOLVERS[key]
+            self._loaded[key] = getattr(importlib.import_module(module), name)
+        return self._loaded[key]
+
+    def __iter__(self):
+        return iter(SOLVERS)
+
+    def __len__(self):
+        return len(SOLVERS)
+
+model_dict = _Solvers()
+
+def __getattr__(name):
+    # `caller.gp` & co. as module attributes, resolved through model_dict
+    if name in SOLVERS:
+        return model_dict[name]
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+# Reusable supervisor thread pools for budgeted runs, by size
+_SUPERVISORS = {}
+
+def _n_workers(n_jobs):
+
+    from joblib import cpu_count
+
+    return cpu_count() if n_jobs == -1 else n_jobs
+
+def _get_executor(n_jobs, budget=None):
+
+    from joblib.externals.loky import get_reusable_executor
+
+    n_workers = _n_workers(n_jobs)
+    if budget is not None:
+        # Budgeted runs start their own process: threads of this process
+        # supervise them, as loky workers cannot start processes safely
+        if n_workers not in _SUPERVISORS:
+            from concurrent.futures import ThreadPoolExecutor
+            _SUPERVISORS[n_workers] = ThreadPoolExecutor(n_workers, thread_name_prefix='nel_utils-budget')
+        return _SUPERVISORS[n_workers]
+
+    return get_reusable_executor(max_workers=n_workers)
+
+def _fit_config(model_key, fixed_params, dynamic_params, seed, options, key=None, data=None, splits=None):
+
+    phases = {}
+
+    # A budgeted solver runs in a child process: nothing to trace here, and
+    # the supervising threads would share tracemalloc
+    budget = options.budget
+    with measure(options.trace_memory and budget is None) as span:
+        tic = time.perf_counter()
+        full_params = {**fixed_params, **dynamic_params}
+
+        # Fold slices are taken here, from shared memory, when a FoldData handle is given.
+        # A budgeted run takes them in its child instead of receiving copies
+        if data is not None and budget is None:
+            full_params.update(data.params())
+
+        params = dict(dynamic_params)
+        if options.set_max_depth:
+            full_params.update({'max_depth': full_params['init_depth']+15})
+            params['max_depth'] = full_params['max_depth']
+        phases['data'], tic = time.perf_counter() - tic, time.perf_counter()
+
+        # The solver's settings go to the run manifest next to its log, under the run id it logs with
+        solver = model_dict[model_key]
+        log_path = full_params.get('log_path')
+
+        def fit():
+            run_params = full_params if data is None or budget is None else {**full_params, **data.params()}
+            with recording(solver, model_key, fixed_params, params, seed, log_path) as run:
+                return solver(**run_params, seed=seed), run.run_id
+
+        stopped = None
+        if budget is None:
+            model, run_id = fit()
+        else:
+            out, run_id, stopped = budget.run(fit, log_path, preload=[solver.__module__])
+            model = None if out is None else out[0]
+        phases['fit'], tic = time.perf_counter() - tic, time.perf_counter()
+
+        if stopped is None:
+            res = {'model': model}
+            res.update({'rmse_train': model.fitness.item()})
+            res.update({'rmse_test': model.test_fitness.item()})
+            res.update({'size': model_size(model)})
+        else:
+            # Stopped by the budget: what the run last logged, if anything
+            last = stopped.pop('last') or {}
+            res = {'model': None, 'censored': stopped}
+            res.update({k: last.get(k, float('nan')) for k in ('rmse_train', 'rmse_test')})
+            res.update({'size': last.get('size')})
+            splits = None
+        res.update({'dynamic_params': dynamic_params})
+        res.update({'run_id': run_id or uuid.uuid4().hex})
+        phases['extract'], tic = time.perf_counter() - tic, time.perf_counter()
+
+        # Predictions on the requested sets, before the model may be spilled
+        semantics = None
+        if splits is not None:
+            if data is not None and budget is not None:
+                full_params.update(data.params())
+            semantics = compute_semantics(model, {
+                name: full_params[source] if isinstance(source, str) else source.params()['X']
+                for name, source in splits.items()
+            })
+            phases['semantics'], tic = time.perf_counter() - tic, time.perf_counter()
+
+        # Spill before caching, so the cache entry stays lightweight too
+        if options.retention is not None and stopped is None:
+            options.retention.spill(res, key)
+
+        # Persist from inside the worker, so finished configs survive a crash.
+        # Censored runs are not: a larger budget should train them again
+        if options.cache is not None and stopped is None:
+            options.cache.put(key, res)
+        phases['persist'] = time.perf_counter() - tic
+
+    # Measured where the config ran, so it travels back from workers with the result
+    res['profile'] = {**span, 'phases': phases}
+    if stopped is not None:
+        res['profile']['censored'] = stopped['reason']
+
+    # Carried back to the parent, which owns the store; never cached with the result
+    if semantics is not None:
+        res['semantics'] = semantics
+    return res
+
 def call_model(
-        fixed_params, 
-        param_grid, 
+        fixed_params,
+        param_grid,
         seed,
-        set_max_depth = False
+        set_max_depth = False,
+        n_jobs = 1,
+        fold = None,
+        search = 'grid',
+        min_iter = 10,
+        eta = 3,
+        options = None,
+        **kwargs
     ):
-    
+    """
+    Train one model per combination of `param_grid` on top of `fixed_params`.
+
+    Parameters
+    ----------
+    fixed_params : dict
+        Solver parameters shared by every combination, including 'algorithm'.
+    param_grid : dict or list of dict
+        Maps a parameter name to the list of values to search, or lists the
+        combinations explicitly (e.g. the survivors of a race).
+    seed : int
+        Seed passed to every combination, so a (config, seed) pair always
+        reproduces the same run regardless of how the grid is executed.
+    set_max_depth : bool, optional
+        If True, `max_depth` is set to `init_depth + 15`.
+    n_jobs : int, optional
+        Number of worker processes (as in `system_params.n_jobs`). 1 runs the
+        grid serially in-process; -1 uses all cores.
+    fold : any, optional
+        Fold indices identifying the data in `fixed_params`; part of the
+        cache key.
+    search : str, optional
+        'grid' (default) trains every combination for the full `n_iter`.
+        'halving' runs successive halving: every combination first gets
+        `min_iter` generations, then only the best `1/eta` on validation
+        RMSE are rerun with `eta` times the budget, until `n_iter`.
+    min_iter : int, optional
+        First-rung generation budget for `search='halving'`.
+    eta : int, optional
+        Promotion ratio for `search='halving'`.
+    options : nel_utils.options.RunOptions, optional
+        The per-run options below, bundled. Each of them can also be given
+        as a keyword argument, which takes precedence over `options`.
+    cache : nel_utils.cache.ResultCache, optional
+        If given, combinations already in the cache are loaded instead of
+        trained, and new results are stored as soon as they finish.
+    retention : nel_utils.retention.Retention, optional
+        Which trained models to keep: all (default), the top-k on rmse_test,
+        or none in memory with every model spilled to disk. Use
+        `retention.load_model(res)` to get a model back.
+    hooks : nel_utils.hooks.Hooks, optional
+        Receives config_start/config_end for every combination (and rung)
+        and run_end when the call returns. Each result also carries its
+        timings under 'profile'.
+    planner : nel_utils.planner.Planner, optional
+        Trains grid points with identical effective parameters (e.g. under
+        `set_max_depth`) once, and submits the most expensive configs first.
+        Reused results carry 'duplicate_of' in their 'profile'.
+    semantics : nel_utils.semantics.SemanticsStore, optional
+        Stores each trained run's predictions on X_train ('train') and on
+        X_test ('val') under the result's 'run_id'. Cached results keep the
+        vectors stored when they were trained.
+    queue : nel_utils.workqueue.WorkQueue, optional
+        Run the configs as tasks of a shared-filesystem queue, on workers
+        started on other nodes (`python -m nel_utils.workqueue <root>`)
+        instead of local processes; `n_jobs` is then ignored. The data is
+        stored in the queue once, and results are collected in order.
+    budget : nel_utils.budget.Budget, optional
+        Wall-clock, memory and program-size limits per run. Each solver call
+        then runs in a watched child process, supervised by one of `n_jobs`
+        threads instead of a loky worker; runs over a limit are stopped
+        and returned censored ('model' None, the metrics of their last logged
+        generation and a 'censored' entry), so the rest of the grid completes.
+
+    Returns
+    -------
+    list of dict
+        One result per combination, in `itertools.product` (or list) order, holding
+        'model', 'rmse_train', 'rmse_test', 'size', 'dynamic_params' and 'run_id'. With
+        `search='halving'`, each result is the one from the last rung the
+        combination reached and carries that rung's budget under 'n_iter'.
+
+    Notes
+    -----
+    Workers are spawned through joblib's loky executor, which pickles with
+    cloudpickle: the solver individuals keep closures and lambdas (operators,
+    constants) that the standard pickler rejects. Every worker appends to the
+    same `log_path`; rows from concurrent runs interleave but remain
+    identifiable by their run id. The solvers cannot resume a run, so each
+    halving rung retrains its survivors from scratch and logs them again.
+    """
+
     # Copy and pop
     fixed_params = fixed_params.copy()
     model_key = fixed_params.pop('algorithm')
 
+    if set_max_depth:
+        kwargs['set_max_depth'] = True
+    options = RunOptions.of(options, **kwargs)
+    options = options.replace(retention=options.retention or Retention(), hooks=options.hooks or Hooks())
+
+    # A grid is expanded lazily, one point at a time as the runs are submitted
+    if isinstance(param_grid, dict):
+        from .planner import expand
+        combos, n_configs = expand(param_grid), math.prod(len(values) for values in param_grid.values())
+    else:
+        combos = [dict(combo) for combo in param_grid]
+        n_configs = len(combos)
+
+    with options.hooks.run(algorithm=model_key, n_configs=n_configs):
+        if search == 'halving':
+            return _successive_halving(model_key, fixed_params, combos, seed, options, n_jobs, fold, min_iter, eta)
+
+        return _run_grid(model_key, fixed_params, combos, seed, options, n_jobs, fold)
+
+def _imap(executor, fn, tasks, window):
+    """
+    Yield (tag, fn(*args)) for each (tag, args) of `tasks` as it completes,
+    with at most `window` calls submitted and not yet returned. `tasks` is
+    consumed as the calls finish, so it can be a generator.
+    """
+    running = {}
+    tasks = iter(tasks)
+    while True:
+        for tag, args in islice(tasks, window - len(running)):
+            running[executor.submit(fn, *args)] = tag
+        if not running:
+            return
+        done, _ = wait(running, return_when=FIRST_COMPLETED)
+        for future in done:
+            yield running.pop(future), future.result()
+
+def _run_grid(model_key, fixed_params, combos, seed, options, n_jobs, fold, ids=None):
+
+    cache, retention, hooks, planner, semantics, queue = (
+        options.cache, options.retention, options.hooks, options.planner, options.semantics, options.queue
+    )
+
+    # Filled in grid order as `combos` is consumed
     models = []
-    keys, values = zip(*param_grid.items())
 
-    for combo in product(*values):
+    def config_id(i):
+        # Global grid positions, so halving rungs report the same config ids
+        return i if ids is None else ids[i]
 
-        dynamic_params = dict(zip(keys, combo))
-        full_params = {**fixed_params, **dynamic_params}
+    def emit(event, i, dynamic_params, **info):
+        hooks.emit(event, config=config_id(i), dynamic_params=dynamic_params, n_iter=fixed_params.get('n_iter'), **info)
 
-        if set_max_depth:
-            full_params.update({'max_depth': full_params['init_depth']+15})
+    if cache is not None:
+        from .cache import fingerprint, make_key
 
-        model = model_dict[model_key](**full_params, seed=seed)
+        # Hashed once for the grid, not once per config
+        data = fingerprint(fixed_params) if fold is None else None
 
-        res = {'model': model}
-        res.update({'rmse_train': model.fitness.item()})
-        res.update({'rmse_test': model.test_fitness.item()})
-        res.update({'dynamic_params': dynamic_params})
+    def todo():
+        """(position, dynamic_params, cache key) of the points to train; cached ones are loaded on the way."""
+        for i, dynamic_params in enumerate(combos):
+            models.append(None)
+            key = None
+            if cache is not None:
+                key = make_key(model_key, fixed_params, dynamic_params, fold, seed, options.set_max_depth, data)
+                with measure(hooks.trace_memory) as span:
+                    res = cache.get(key)
+                if res is not None:
+                    models[i] = res
+                    res['profile'] = {**span, 'cached': True}
+                    emit('config_start', i, dynamic_params, cached=True)
+                    emit('config_end', i, dynamic_params, **res['profile'])
+                    retention.prune(models)
+                    continue
+            yield i, dynamic_params, key
+
+    # Distinct runs in execution order; the first point of a group is trained
+    if planner is not None:
+        # Ordering needs every estimate: the points left to train are held, once each
+        missing = list(todo())
+        plan = planner.plan(fixed_params, (dynamic_params for _, dynamic_params, _ in missing), options.set_max_depth)
+        groups = [[missing[j] for j in group] for _, group in plan]
+    else:
+        groups = ([point] for point in todo())
+
+    # Solver arguments the stored semantics are computed on
+    splits = {'train': 'X_train', 'val': 'X_test'} if semantics is not None else None
+
+    def finish(group, res):
+        i, dynamic_params, _ = group[0]
+        models[i] = res
+        if semantics is not None and 'semantics' in res:
+            semantics.put(res['run_id'], res.pop('semantics'))
+        emit('config_end', i, dynamic_params, **res['profile'])
+
+        # Grid points with the same effective parameters reuse the trained result
+        for j, dynamic_params, key in group[1:]:
+            models[j] = {**res, 'dynamic_params': dynamic_params}
+            if cache is not None:
+                cache.put(key, {k: v for k, v in models[j].items() if k != 'profile'})
+            models[j]['profile'] = {
+                'wall': 0.0, 'cpu': 0.0, 'peak_mem': None, 'cached': True, 'duplicate_of': config_id(i)
+            }
+            emit('config_start', j, dynamic_params, cached=True)
+            emit('config_end', j, dynamic_params, **models[j]['profile'])
+        retention.prune(models)
+
+    if queue is not None:
+        data = {k: (queue.share(fixed_params[k]), None) for k in DATA_KEYS if fixed_params.get(k) is not None}
+        fixed = {k: v for k, v in fixed_params.items() if k not in DATA_KEYS}
+
+        # Tasks wait on the shared filesystem: all of them are submitted, then collected in order
+        pending, submitted = queue.pending(), []
+        for group in groups:
+            i, dynamic_params, _ = group[0]
+            emit('config_start', i, dynamic_params)
+            submitted.append((group, queue.submit(model_key, fixed, dynamic_params, seed, data, options, splits, pending)))
+        for (group, _), res in zip(submitted, queue.results([key for _, key in submitted])):
+            if cache is not None and not censored(res):
+                cache.put(group[0][2], {k: v for k, v in res.items() if k not in ('profile', 'semantics')})
+            finish(group, res)
+        return models
+
+    if n_jobs == 1:
+        for group in groups:
+            i, dynamic_params, key = group[0]
+            emit('config_start', i, dynamic_params)
+            finish(group, _fit_config(model_key, fixed_params, dynamic_params, seed, options, key, splits=splits))
+        return models
+
+    # Hand the data over once through shared memory instead of pickling it per task
+    with FoldDatasets() as shared:
+        data = None
+        if all(fixed_params.get(k) is not None for k in DATA_KEYS):
+            data = shared.split(*[fixed_params[k] for k in DATA_KEYS])
+            fixed_params = {k: v for k, v in fixed_params.items() if k not in DATA_KEYS}
+
+        task = options.task()
+
+        def tasks():
+            for group in groups:
+                i, dynamic_params, key = group[0]
+                emit('config_start', i, dynamic_params)
+                yield group, (model_key, fixed_params, dynamic_params, seed, task, key, data, splits)
+
+        # Workers take tasks in submission order, so a planned order is honoured. Two
+        # tasks per worker are in flight, so no worker waits for the next submission
+        executor = _get_executor(n_jobs, options.budget)
+        for group, res in _imap(executor, _fit_config, tasks(), 2 * _n_workers(n_jobs)):
+            finish(group, res)
+
+    return models
+
+def _successive_halving(model_key, fixed_params, combos, seed, options, n_jobs, fold, min_iter, eta):
+
+    if 'n_iter' not in fixed_params:
+        raise ValueError("search='halving' needs 'n_iter' in fixed_params as the full budget.")
+
+    max_iter = fixed_params['n_iter']
+    n_iter = min(min_iter, max_iter)
+
+    # The first rung consumes the grid; later ones rerun the survivors by their params
+    models = _run_grid(model_key, {**fixed_params, 'n_iter': n_iter}, combos, seed, options, n_jobs, fold)
+    alive = list(range(len(models)))
+
+    while True:
+        for i in alive:
+            models[i]['n_iter'] = n_iter
+        options.retention.prune(models)
+
+        if n_iter >= max_iter:
+            return models
 
-        models.append(res)
+        # Promote the best 1/eta on validation RMSE, keeping grid order; censored runs go last
+        n_keep = max(1, len(alive) // eta)
+        alive = sorted(sorted(alive, key=lambda i: score(models[i]))[:n_keep])
+        n_iter = min(n_iter * eta, max_iter)
 
-    return models      
+        rung = _run_grid(
+            model_key, {**fixed_params, 'n_iter': n_iter}, [models[i]['dynamic_params'] for i in alive], seed,
+            options, n_jobs, fold, alive
+        )
+        for i, res in zip(alive, rung):
+            models[i] = res
@@ -0,0 +1,340 @@
+# nel_utils/compiler.py
+#
+# Compiled batch inference for GP trees, GSGP trees and SLIM individuals.
+#
+# The solvers' own `predict` walks the model recursively on every call.
+# GSGP trees reference their parents, so the same ancestor is evaluated once
+# per path that reaches it, and SLIM blocks often repeat the same random
+# trees. `compile_model` flattens a model once into a list of instructions:
+#
+#   ('col', i)                    X[:, i]
+#   ('const', value)              a constant terminal
+#   ('fn', f, lo, hi, *args)      clamp(f(*args), lo, hi), a tree node
+#   ('sigmoid', a)
+#   ('gsgp', op, args, ms)        a GSGP crossover/mutation operator
+#   ('slim', op, args, ms)        a SLIM block delta operator
+#   ('reduce', how, args)         sum or product of the SLIM blocks
+#
+# Identical subtrees (same function table and structure) and shared GSGP
+# ancestors become a single instruction, so their semantics are computed
+# once per chunk. Each slot is released after its last use.
+#
+# The arithmetic is the solvers' own: tree functions and GSGP/SLIM operators
+# are called as stored in the model, with the same clamping bounds.
+
+from types import SimpleNamespace
+
+import numpy as np
+
+# Clamping of GP `_execute_tree` and of GSGP `apply_tree` (also used by SLIM blocks)
+GP_BOUNDS = (-1e12, 1e12)
+GSGP_BOUNDS = (-1e12, 1e13)
+SLIM_BOUNDS = (-1e12, 1e12)
+
+class _Numpy:
+
+    @staticmethod
+    def sigmoid(x):
+        return 1 / (1 + np.exp(-x))
+
+    @staticmethod
+    def clamp(x, lo, hi):
+        return np.clip(x, lo, hi)
+
+    @staticmethod
+    def reduce(how, values):
+        return (np.sum if how == 'sum' else np.prod)(np.stack(values), axis=0)
+
+    @staticmethod
+    def full(value, n):
+        return np.full(n, value)
+
+class _Torch:
+
+    def __init__(self):
+        import torch
+        self.torch = torch
+
+    def sigmoid(self, x):
+        return self.torch.sigmoid(x)
+
+    def clamp(self, x, lo, hi):
+        return self.torch.clamp(x, lo, hi)
+
+    def reduce(self, how, values):
+        how = self.torch.sum if how == 'sum' else self.torch.prod
+        return how(self.torch.stack(values), dim=0)
+
+    def full(self, value, n):
+        return self.torch.as_tensor(value).repeat(n)
+
+class Program:
+    """
+    Flat evaluation program of a compiled model.
+
+    Parameters
+    ----------
+    code : list of tuple
+        Instructions; instruction `i` writes slot `i`.
+    kind : str
+        'gp', 'gsgp' or 'slim'.
+    backend : str, optional
+        'torch' (slim_gsgp models) or 'numpy' (models built on NumPy functions).
+    """
+
+    def __init__(self, code, kind, backend='torch'):
+        self.code = code
+        self.kind = kind
+        self.backend = backend
+
+        # Slots to release after each instruction
+        last_use = {}
+        for i, ins in enumerate(code):
+            for slot in _args(ins):
+                last_use[slot] = i
+        self._release = [[] for _ in code]
+        for slot, i in last_use.items():
+            self._release[i].append(slot)
+
+    def __len__(self):
+        return len(self.code)
+
+    def _run(self, X, ops):
+
+        n = len(X)
+        slots = [None] * len(self.code)
+        for i, ins in enumerate(self.code):
+            op = ins[0]
+            if op == 'col':
+                out = X[:, ins[1]]
+            elif op == 'const':
+                out = ins[1]
+            elif op == 'fn':
+                f, lo, hi, *args = ins[1:]
+                out = ops.clamp(f(*(slots[a] for a in args)), lo, hi)
+            elif op == 'sigmoid':
+                out = ops.sigmoid(slots[ins[1]])
+            elif op == 'gsgp':
+                out = ins[1](*(slots[a] for a in ins[2]), *ins[3], testing=False, new_data=True)
+            elif op == 'slim':
+                trees = (SimpleNamespace(train_semantics=slots[a]) for a in ins[2])
+                out = ins[1](*trees, ins[3], testing=False)
+            else:
+                values = [_broadcast(slots[a], n, ops) for a in ins[2]]
+                out = ops.clamp(ops.reduce(ins[1], values), *SLIM_BOUNDS)
+            slots[i] = out
+            for slot in self._release[i]:
+                slots[slot] = None
+
+        return _broadcast(slots[-1], n, ops)
+
+    def predict(self, X, chunk_size=65536):
+        """
+        Semantics of the model on `X`, evaluated `chunk_size` rows at a time.
+
+        Parameters
+        ----------
+        X : np.ndarray or torch.Tensor, shape (n_samples, n_features)
+            Input data. NumPy input to a torch program is wrapped per chunk
+            without copying, and the result is returned as an array.
+        chunk_size : int, optional
+            Rows per chunk; bounds the memory of the intermediate semantics.
+
+        Returns
+        -------
+        np.ndarray or torch.Tensor, shape (n_samples,)
+        """
+        return predict_all([self], X, chunk_size)[0]
+
+def _args(ins):
+    """Slots read by an instruction."""
+    op = ins[0]
+    if op == 'fn':
+        return ins[4:]
+    if op == 'sigmoid':
+        return ins[1:]
+    if op in ('gsgp', 'slim', 'reduce'):
+        return ins[2]
+    return ()
+
+def _broadcast(value, n, ops):
+    """Repeat a constant result to one value per row, as SLIM does."""
+    shape = getattr(value, 'shape', ())
+    return value if len(shape) and shape[0] == n else ops.full(value, n)
+
+class _Compiler:
+
+    def __init__(self):
+        self.code = []
+        self.memo = {}
+        # Keeps compiled objects alive so their ids stay unique
+        self.seen = []
+
+    def emit(self, key, *ins):
+        if key not in self.memo:
+            self.code.append(ins)
+            self.memo[key] = len(self.code) - 1
+        return self.memo[key]
+
+    def tree(self, repr_, tables, bounds):
+        """Slot of a tree representation, sharing identical subtrees."""
+        functions, terminals, constants = tables
+        if isinstance(repr_, tuple):
+            key = ('fn', id(functions), bounds, repr_)
+            if key not in self.memo:
+                args = [self.tree(sub, tables, bounds) for sub in repr_[1:functions[repr_[0]]['arity'] + 1]]
+                self.emit(key, 'fn', functions[repr_[0]]['function'], *bounds, *args)
+            return self.memo[key]
+        if repr_ in terminals:
+            return self.emit(('col', terminals[repr_]), 'col', terminals[repr_])
+        return self.emit(('const', id(constants), repr_), 'const', constants[repr_](None))
+
+    def sigmoid(self, slot):
+        return self.emit(('sigmoid', slot), 'sigmoid', slot)
+
+    def gsgp(self, root):
+        """Slot of a GSGP tree; each ancestor is compiled once."""
+        stack = [root]
+        while stack:
+            node = stack[-1]
+            if ('obj', id(node)) in self.memo:
+                stack.pop()
+                continue
+
+            if not isinstance(node.structure, list):
+                slot = self.tree(node.structure, _tables(node), GSGP_BOUNDS)
+            else:
+                op, *rest = node.structure
+                trees = [t for t in rest if hasattr(t, 'structure')]
+                pending = [t for t in trees if ('obj', id(t)) not in self.memo]
+                if pending:
+                    stack.extend(pending)
+                    continue
+
+                args = [self.memo[('obj', id(t))] for t in trees]
+                if op.__name__ == 'geometric_crossover':
+                    # Parents as they are, sigmoid of the random tree
+                    args[-1] = self.sigmoid(args[-1])
+                    ms = ()
+                else:
+                    # Mutated tree as it is, sigmoid of the random trees
+                    args[1:] = [self.sigmoid(a) for a in args[1:]]
+                    ms = tuple(m for m in rest if isinstance(m, float))
+                slot = self.emit(('obj', id(node)), 'gsgp', op, tuple(args), ms)
+
+            self.memo[('obj', id(node))] = slot
+            self.seen.append(node)
+            stack.pop()
+        return self.memo[('obj', id(root))]
+
+    def slim(self, individual):
+        """Slot of a SLIM individual: its blocks, then their sum or product."""
+        sig = 'SIG' in individual.version
+        how = 'sum' if '+' in individual.version else 'prod'
+
+        blocks = []
+        for block in individual.collection:
+            if not isinstance(block.structure, list):
+                blocks.append(self.tree(block.structure, _tables(block), GSGP_BOUNDS))
+                continue
+
+            op, *trees, ms = block.structure
+            args = [self.tree(t.structure, _tables(t), GSGP_BOUNDS) for t in trees]
+            if sig or len(trees) == 2:
+                args = [self.sigmoid(a) for a in args]
+            blocks.append(self.emit(('obj', id(block)), 'slim', op, tuple(args), ms))
+            self.seen.append(block)
+
+        return self.emit(('reduce', tuple(blocks)), 'reduce', how, tuple(blocks))
+
+def _tables(tree):
+    return tree.FUNCTIONS, tree.TERMINALS, tree.CONSTANTS
+
+def model_kind(model):
+    """'slim', 'gsgp' or 'gp', from the attributes of a trained model."""
+    if hasattr(model, 'collection'):
+        return 'slim'
+    if hasattr(model, 'structure'):
+        return 'gsgp'
+    if hasattr(model, 'repr_'):
+        return 'gp'
+    raise TypeError(f'Cannot compile a {type(model).__name__}; expected a GP/GSGP tree or SLIM individual.')
+
+def model_backend(model):
+    """'torch' for slim_gsgp models, whose functions call torch; 'numpy' for other models."""
+    return 'torch' if type(model).__module__.partition('.')[0] == 'slim_gsgp' else 'numpy'
+
+def compile_model(model, backend='torch'):
+    """
+    Flatten a trained model into a `Program`.
+
+    Parameters
+    ----------
+    model : Tree or Individual
+        GP tree, GSGP tree or SLIM individual, trained with reconstruction on
+        (GSGP/SLIM models without `structure`/`collection` cannot be compiled).
+    backend : str, optional
+        'torch' for slim_gsgp models, 'numpy' for models whose functions
+        take NumPy arrays.
+
+    Returns
+    -------
+    Program
+    """
+    if backend not in ('torch', 'numpy'):
+        raise ValueError(f"backend must be 'torch' or 'numpy', got '{backend}'.")
+
+    kind = model_kind(model)
+    compiler = _Compiler()
+    if kind == 'slim':
+        compiler.slim(model)
+    elif kind == 'gsgp':
+        compiler.gsgp(model)
+    else:
+        compiler.tree(model.repr_, _tables(model), GP_BOUNDS)
+
+    # The root is compiled after everything it depends on: it is the last slot
+    return Program(compiler.code, kind, backend)
+
+def compile_results(results, backend='torch'):
+    """Programs of the models of `call_model`/`nested_cv` results, spilled ones included."""
+    from .retention import load_model
+
+    return [compile_model(load_model(res), backend) for res in results]
+
+def predict_all(programs, X, chunk_size=65536):
+    """
+    Semantics of several programs on `X`, reading each chunk of rows once.
+
+    Parameters
+    ----------
+    programs : list of Program
+        E.g. the compiled models picked with `selector.select_top_n`.
+    X : np.ndarray or torch.Tensor, shape (n_samples, n_features)
+    chunk_size : int, optional
+        Rows per chunk.
+
+    Returns
+    -------
+    list of np.ndarray or torch.Tensor
+        One prediction per program, in order.
+    """
+    as_numpy = isinstance(X, np.ndarray)
+    backends = {p.backend for p in programs}
+    ops = {b: _Torch() if b == 'torch' else _Numpy() for b in backends}
+
+    chunks = [[] for _ in programs]
+    for start in range(0, len(X), chunk_size):
+        rows = X[start:start + chunk_size]
+        for program, out in zip(programs, chunks):
+            if program.backend == 'torch' and as_numpy:
+                y = program._run(ops['torch'].torch.from_numpy(np.ascontiguousarray(rows)), ops['torch'])
+                out.append(y.numpy())
+            else:
+                out.append(program._run(rows, ops[program.backend]))
+
+    if as_numpy:
+        return [np.concatenate(out) if out else np.empty(0) for out in chunks]
+
+    import torch
+    return [torch.cat(out) if out else torch.empty(0) for out in chunks]
@@ -0,0 +1,155 @@
+# nel_utils/dataset.py
+#
+# Cached load -> impute -> tensor preparation of a tabular dataset.
+#
+# The notebooks parse the source spreadsheet, KNN-impute it and split off the
+# target on every start. `load_dataset` does it once per (file contents,
+# preparation parameters) and stores the result as .npy files:
+#
+#   <cache_dir>/<fingerprint>/X.npy       features, target column removed
+#   <cache_dir>/<fingerprint>/y.npy       target
+#   <cache_dir>/<fingerprint>/frame.npy   full imputed table
+#   <cache_dir>/<fingerprint>/meta.json   columns, index, parameters
+#
+# Later calls memory-map the arrays and wrap them as tensors without copying.
+# Editing the source file or changing a parameter changes the fingerprint, so
+# stale entries are never read.
+
+import hashlib
+import json
+import os
+import shutil
+import uuid
+
+import numpy as np
+import pandas as pd
+from .cache import _canonical
+from .imputer import knn_impute
+
+READERS = {
+    '.xlsx': pd.read_excel,
+    '.xls': pd.read_excel,
+    '.csv': pd.read_csv,
+    '.parquet': pd.read_parquet
+}
+
+def fingerprint(path, **params):
+    """SHA-256 of the file contents and the preparation parameters."""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+
+    digest.update(json.dumps(_canonical(params), sort_keys=True).encode())
+    return digest.hexdigest()
+
+def _prepare(path, target, n_neighbors, impute_kwargs, read_kwargs, dtype):
+
+    ext = os.path.splitext(path)[1].lower()
+    if ext not in READERS:
+        raise ValueError(f"Unsupported file type '{ext}'; expected one of {list(READERS)}.")
+
+    df = READERS[ext](path, **read_kwargs)
+    if n_neighbors:
+        df = knn_impute(df, n_neighbors=n_neighbors, **impute_kwargs)
+
+    i_target = df.columns.get_loc(target) if isinstance(target, str) else target % df.shape[1]
+    values = df.to_numpy(dtype=dtype)
+
+    return df, values, np.delete(values, i_target, axis=1), values[:, i_target]
+
+def load_dataset(
+        path,
+        cache_dir,
+        target = -2,
+        n_neighbors = 5,
+        impute_kwargs = None,
+        read_kwargs = None,
+        dtype = 'float32',
+        as_torch = True,
+        return_frame = False
+    ):
+    """
+    Load, impute and split a dataset, through an on-disk cache.
+
+    Parameters
+    ----------
+    path : str
+        Source file (.xlsx, .xls, .csv or .parquet).
+    cache_dir : str
+        Directory holding prepared datasets.
+    target : int or str, optional
+        Target column, by position or name (default -2, as in the notebooks).
+    n_neighbors : int, optional
+        Neighbours for `imputer.knn_impute`; 0 or None skips imputation.
+    impute_kwargs : dict, optional
+        Extra `knn_impute` options (`algorithm`, `block_size`, `dtype`).
+    read_kwargs : dict, optional
+        Passed to the pandas reader, e.g. {'index_col': 'WING TAG', 'na_values': '/'}.
+    dtype : str, optional
+        Stored dtype of X and y.
+    as_torch : bool, optional
+        Return torch tensors (zero-copy over the memory map) instead of arrays.
+    return_frame : bool, optional
+        Also return the imputed table as a DataFrame.
+
+    Returns
+    -------
+    X, y : torch.Tensor or np.ndarray
+        Features and target.
+    df : pd.DataFrame
+        Only with `return_frame=True`.
+
+    Examples
+    --------
+    >>> X, y = load_dataset(
+    ...     '../data/sustavianfeed.xlsx', '../data/.prepared',
+    ...     read_kwargs={'index_col': 'WING TAG', 'na_values': '/'}
+    ... )
+    """
+    impute_kwargs, read_kwargs = impute_kwargs or {}, read_kwargs or {}
+    key = fingerprint(
+        path, target=target, n_neighbors=n_neighbors, impute_kwargs=impute_kwargs,
+        read_kwargs=read_kwargs, dtype=dtype
+    )
+    entry = os.path.join(cache_dir, key)
+
+    if not os.path.exists(os.path.join(entry, 'meta.json')):
+        df, values, X, y = _prepare(path, target, n_neighbors, impute_kwargs, read_kwargs, dtype)
+
+        # Build next to the final entry, then rename, so readers never see a partial one
+        tmp = os.path.join(cache_dir, f'.{key}.{uuid.uuid4().hex}')
+        os.makedirs(tmp)
+        for name, array in (('X', X), ('y', y), ('frame', values)):
+            np.save(os.path.join(tmp, f'{name}.npy'), np.ascontiguousarray(array))
+        with open(os.path.join(tmp, 'meta.json'), 'w') as f:
+            json.dump({
+                'source': os.path.abspath(path),
+                'columns': [str(c) for c in df.columns],
+                'index_name': df.index.name,
+                'index': _canonical(df.index.to_numpy())
+            }, f)
+        try:
+            os.rename(tmp, entry)
+        except OSError:
+            # Another process prepared the same entry first
+            shutil.rmtree(tmp)
+
+    # Copy-on-write maps: writable for torch, never written back to the cache
+    X, y = (np.load(os.path.join(entry, f'{name}.npy'), mmap_mode='c') for name in ('X', 'y'))
+
+    if as_torch:
+        import torch
+        X, y = torch.from_numpy(X), torch.from_numpy(y)
+
+    if not return_frame:
+        return X, y
+
+    with open(os.path.join(entry, 'meta.json')) as f:
+        meta = json.load(f)
+    df = pd.DataFrame(
+        np.load(os.path.join(entry, 'frame.npy'), mmap_mode='c'),
+        columns=meta['columns'],
+        index=pd.Index(meta['index'], name=meta['index_name'])
+    )
+    return X, y, df
@@ -0,0 +1,245 @@
+# nel_utils/hooks.py
+#
+# Instrumentation hooks for the grid / CV pipeline.
+#
+# The solvers only log per-generation timings. A Hooks object, passed to
+# `caller.call_model`, `nested_cv.run` or `nested_cv.run_all`, receives
+# events around the rest of the pipeline:
+#
+#   config_start  a grid point is about to be trained (or loaded from cache)
+#   config_end    it finished; carries wall/CPU time, memory peak and phases
+#   fold_start    an inner fold starts
+#   fold_end      it finished; carries the fold's totals
+#   run_end       the outermost call returns
+#
+# Every event passes one dict to the callbacks. The timed events hold 'wall'
+# and 'cpu' (seconds) and 'peak_mem' (bytes above the start, or None without
+# `trace_memory`). config_end also holds 'phases', the wall time spent
+# materialising the fold ('data'), inside the solver, logging included
+# ('fit'), reading fitness and size back ('extract') and spilling/caching the
+# result ('persist').
+#
+# Configs are measured where they run, so with n_jobs > 1 the numbers come
+# from the worker and reach the parent with the result. tracemalloc only sees
+# allocations made through Python and numpy; torch tensors are not counted.
+
+import time
+import tracemalloc
+from contextlib import contextmanager
+
+EVENTS = ('config_start', 'config_end', 'fold_start', 'fold_end', 'run_end')
+
+# Absolute tracemalloc peaks of the open `measure` spans, innermost last
+_PEAKS = []
+
+@contextmanager
+def measure(trace_memory=False):
+    """
+    Time the enclosed block.
+
+    Yields a dict that is filled on exit with 'wall', 'cpu' and 'peak_mem'.
+    Spans nest: an inner span resets the tracemalloc peak, and hands its own
+    peak back to the enclosing span when it closes.
+    """
+    out = {}
+    started = False
+    if trace_memory and not tracemalloc.is_tracing():
+        tracemalloc.start()
+        started = True
+
+    tracing = tracemalloc.is_tracing()
+    if tracing:
+        current, peak = tracemalloc.get_traced_memory()
+        if _PEAKS:
+            _PEAKS[-1] = max(_PEAKS[-1], peak)
+        tracemalloc.reset_peak()
+        _PEAKS.append(current)
+
+    wall, cpu = time.perf_counter(), time.process_time()
+    try:
+        yield out
+    finally:
+        out['wall'] = time.perf_counter() - wall
+        out['cpu'] = time.process_time() - cpu
+        out['peak_mem'] = None
+
+        if tracing:
+            peak = max(_PEAKS.pop(), tracemalloc.get_traced_memory()[1])
+            out['peak_mem'] = peak - current
+            if _PEAKS:
+                _PEAKS[-1] = max(_PEAKS[-1], peak)
+        if started:
+            tracemalloc.stop()
+
+class Hooks:
+    """
+    Event dispatcher for the grid / CV pipeline.
+
+    Parameters
+    ----------
+    trace_memory : bool, optional
+        Record tracemalloc peaks. Off by default: tracing slows allocation-heavy
+        code down noticeably.
+
+    Examples
+    --------
+    >>> hooks = Hooks()
+    >>> hooks.on('config_end', lambda info: print(info['dynamic_params'], info['wall']))
+    >>> call_model(fixed_params, param_grid, seed, hooks=hooks)
+    """
+
+    def __init__(self, trace_memory=False):
+        self.trace_memory = trace_memory
+        self.callbacks = {event: [] for event in EVENTS}
+        self.context = {}
+        self._depth = 0
+
+    def on(self, event, callback):
+        """Register `callback(info)` for `event`. Returns `callback`."""
+        if event not in self.callbacks:
+            raise ValueError(f"event must be one of {EVENTS}, got '{event}'.")
+        self.callbacks[event].append(callback)
+        return callback
+
+    def emit(self, event, **info):
+        info = {**self.context, **info, 'event': event}
+        for callback in self.callbacks[event]:
+            callback(info)
+
+    @contextmanager
+    def fold(self, fold, **info):
+        """
+        Scope of one fold, run in this process: emits fold_start and
+        fold_end, and tags every event emitted inside with `fold`.
+        """
+        self.emit('fold_start', fold=fold, **info)
+        context, self.context = self.context, {**self.context, 'fold': fold}
+        try:
+            with measure(self.trace_memory) as span:
+                yield span
+        finally:
+            self.context = context
+        self.emit('fold_end', fold=fold, **info, **span)
+
+    @contextmanager
+    def run(self, **info):
+        """
+        Scope of one pipeline call. Nested scopes (call_model inside
+        nested_cv.run) are merged, so run_end fires once, from the outermost.
+        """
+        self._depth += 1
+        try:
+            with measure(self.trace_memory) as span:
+                yield
+        finally:
+            self._depth -= 1
+        if self._depth == 0:
+            self.emit('run_end', **info, **span)
+
+def _outliers(wall, threshold, min_ratio):
+    """Mask of values above the median by more than `threshold` scaled MADs and `min_ratio` times."""
+    median = wall.median()
+    mad = (wall - median).abs().median() * 1.4826
+    slow = wall > median * min_ratio
+    if mad > 0:
+        slow &= (wall - median) / mad > threshold
+    return slow
+
+class TimingCollector:
+    """
+    Collects config and fold events into a timing table.
+
+    Parameters
+    ----------
+    path : str, optional
+        CSV written on run_end.
+    threshold : float, optional
+        A row is flagged 'slow' when its wall time exceeds the median of its
+        kind (config or fold) by more than `threshold` robust standard
+        deviations (MAD * 1.4826) and by at least `min_ratio` times.
+    min_ratio : float, optional
+        Keeps near-identical runs, whose MAD is tiny, from being flagged.
+
+    Examples
+    --------
+    >>> hooks = Hooks(trace_memory=True)
+    >>> timings = TimingCollector('timings.csv').attach(hooks)
+    >>> nested_cv.run(..., hooks=hooks)
+    >>> timings.budget(['pop_size', 'p_inflate'])
+    """
+
+    def __init__(self, path=None, threshold=3.5, min_ratio=1.5):
+        self.path = path
+        self.threshold = threshold
+        self.min_ratio = min_ratio
+        self.rows = []
+
+    def attach(self, hooks):
+        hooks.on('config_end', self._record)
+        hooks.on('fold_end', self._record)
+        hooks.on('run_end', self._write)
+        return self
+
+    def _record(self, info):
+        row = {
+            'kind': 'config' if info['event'] == 'config_end' else 'fold',
+            'fold': info.get('fold'),
+            'config': info.get('config'),
+            'n_iter': info.get('n_iter'),
+            'cached': info.get('cached', False),
+            'wall': info['wall'],
+            'cpu': info['cpu'],
+            'peak_mem': info['peak_mem']
+        }
+        row.update({f'phase_{k}': v for k, v in info.get('phases', {}).items()})
+        row.update(info.get('dynamic_params', {}))
+        self.rows.append(row)
+
+    def _write(self, info):
+        if self.path is not None:
+            self.table().to_csv(self.path, index=False)
+
+    def table(self):
+        """
+        One row per config run and per fold.
+
+        Returns
+        -------
+        pd.DataFrame
+            'kind', 'fold', 'config', 'n_iter', 'cached', 'wall', 'cpu', 'peak_mem',
+            the phase columns, the grid parameters and the boolean 'slow'.
+            Cached configs are never flagged.
+        """
+        import pandas as pd
+
+        df = pd.DataFrame(self.rows)
+        if df.empty:
+            return df
+
+        df[['config', 'n_iter']] = df[['config', 'n_iter']].astype('Int64')
+        df['slow'] = False
+        for _, group in df[~df['cached']].groupby('kind'):
+            df.loc[group.index, 'slow'] = _outliers(group['wall'], self.threshold, self.min_ratio)
+        return df
+
+    def budget(self, by):
+        """
+        Wall and CPU time spent per grid region.
+
+        Parameters
+        ----------
+        by : str or list of str
+            Grid parameters to group by, e.g. ['pop_size', 'p_inflate'].
+
+        Returns
+        -------
+        pd.DataFrame
+            Total 'wall' and 'cpu', run count 'n' and the share of the total
+            wall time, most expensive region first.
+        """
+        df = self.table()
+        df = df[(df['kind'] == 'config') & ~df['cached']]
+
+        out = df.groupby(by).agg(wall=('wall', 'sum'), cpu=('cpu', 'sum'), n=('wall', 'size'))
+        out['share'] = out['wall'] / out['wall'].sum()
+        return out.sort_values('wall', ascending=False)
@@ -1,7 +1,168 @@
+import numpy as np
 import pandas as pd
-from sklearn.impute import KNNImputer
 
-def knn_impute(df, n_neighbors=5):
+def _nan_euclidean(A, B, mask_A, mask_B):
+    """
+    Pairwise nan-euclidean distances, as `sklearn.metrics.nan_euclidean_distances`:
+    squared differences over the coordinates present in both rows, scaled by
+    n_features / n_present. NaN when two rows share no coordinate.
+    """
+    dtype = A.dtype
+    A0, B0 = np.where(mask_A, A, 0), np.where(mask_B, B, 0)
+    wA, wB = mask_A.astype(dtype), mask_B.astype(dtype)
+
+    sq = (A0 * A0) @ wB.T + wA @ (B0 * B0).T - 2 * (A0 @ B0.T)
+    np.maximum(sq, 0, out=sq)
+    present = wA @ wB.T
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        dist = np.sqrt(sq * (A.shape[1] / present))
+    dist[present == 0] = np.nan
+    return dist
+
+def _neighbour_mean(dist, donor_values, n_neighbors):
+    """Uniform mean of the `n_neighbors` closest donors per row; NaN distances weigh 0."""
+    k = min(n_neighbors, dist.shape[1])
+    idx = np.argpartition(dist, k - 1, axis=1)[:, :k]
+    weights = ~np.isnan(np.take_along_axis(dist, idx, axis=1))
+    values = donor_values[idx]
+    return (values * weights).sum(axis=1) / weights.sum(axis=1)
+
+class BlockKNNImputer:
+    """
+    KNN imputation with memory bounded by `block_size`, for tables where a
+    full pairwise distance matrix does not fit.
+
+    Matches sklearn's `KNNImputer(weights='uniform')`: a missing value is the
+    mean of that column over the `n_neighbors` nearest rows (nan-euclidean
+    distance) of the fitted data that have it; the column mean of the fitted
+    data is used when no such row shares a coordinate with the receiver.
+
+    Parameters
+    ----------
+    n_neighbors : int
+        Number of neighbors to use for imputation.
+    algorithm : str, optional
+        'brute' (default) compares each block of incomplete rows with every
+        fitted row, exactly as sklearn does, holding block_size x n_fit
+        distances at a time. 'tree' groups incomplete rows by missing
+        pattern and queries a KD-tree built on the donors complete on the
+        pattern's observed columns. It is exact when the fitted data has no
+        missing values. Otherwise donors with gaps in those columns are
+        skipped, and patterns with fewer than `n_neighbors` complete donors
+        fall back to 'brute'.
+    block_size : int, optional
+        Incomplete rows handled per block.
+    dtype : np.dtype, optional
+        Working precision; float32 halves memory and distance cost.
+
+    Examples
+    --------
+    >>> imputer = BlockKNNImputer(n_neighbors=5, dtype=np.float32).fit(df_train)
+    >>> df_train, df_test = imputer.transform(df_train), imputer.transform(df_test)
+    """
+
+    def __init__(self, n_neighbors=5, algorithm='brute', block_size=1024, dtype=np.float64):
+        if algorithm not in ('brute', 'tree'):
+            raise ValueError(f"algorithm must be 'brute' or 'tree', got '{algorithm}'.")
+
+        self.n_neighbors = n_neighbors
+        self.algorithm = algorithm
+        self.block_size = block_size
+        self.dtype = np.dtype(dtype)
+
+    def fit(self, df):
+        """Store the donor rows and the column means of `df`."""
+        self.columns = df.columns
+        self.fit_X = np.asarray(df, dtype=self.dtype)
+        self.fit_mask = ~np.isnan(self.fit_X)
+
+        with np.errstate(invalid='ignore'):
+            self.means = np.nanmean(self.fit_X, axis=0) if len(self.fit_X) else np.full(len(self.columns), np.nan)
+        self._trees = {}
+        return self
+
+    def transform(self, df):
+        """
+        Impute the missing values of `df` from the fitted rows.
+
+        Returns
+        -------
+        pd.DataFrame
+            Same index and columns as `df`, values in the working dtype.
+        """
+        if not df.columns.equals(self.columns):
+            raise ValueError('df must have the columns the imputer was fitted on.')
+
+        X = np.array(df, dtype=self.dtype)
+        mask = ~np.isnan(X)
+        rows = np.flatnonzero(~mask.all(axis=1))
+
+        if self.algorithm == 'tree':
+            rows = self._transform_tree(X, mask, rows)
+
+        for start in range(0, len(rows), self.block_size):
+            self._impute_block(X, mask, rows[start:start + self.block_size])
+
+        return pd.DataFrame(X, columns=df.columns, index=df.index)
+
+    def fit_transform(self, df):
+        return self.fit(df).transform(df)
+
+    def _impute_block(self, X, mask, block):
+
+        dist = _nan_euclidean(X[block], self.fit_X, mask[block], self.fit_mask)
+
+        for col in np.flatnonzero(~mask[block].all(axis=0)):
+            receivers = np.flatnonzero(~mask[block, col])
+            donors = np.flatnonzero(self.fit_mask[:, col])
+            if len(donors) == 0:
+                continue
+
+            sub = dist[np.ix_(receivers, donors)]
+            no_donor = np.isnan(sub).all(axis=1)
+
+            values = np.full(len(receivers), self.means[col], dtype=self.dtype)
+            if not no_donor.all():
+                values[~no_donor] = _neighbour_mean(sub[~no_donor], self.fit_X[donors, col], self.n_neighbors)
+            X[block[receivers], col] = values
+
+    def _transform_tree(self, X, mask, rows):
+        """Impute `rows` pattern by pattern; return the rows left for the brute-force path."""
+        from scipy.spatial import cKDTree
+
+        left = []
+        patterns, inverse = np.unique(mask[rows], axis=0, return_inverse=True)
+
+        for i_pattern, observed in enumerate(patterns):
+            group = rows[inverse.ravel() == i_pattern]
+            obs = np.flatnonzero(observed)
+            if len(obs) == 0:
+                left.append(group)
+                continue
+
+            complete = self.fit_mask[:, obs].all(axis=1)
+            filled = {}
+            for col in np.flatnonzero(~observed):
+                donors = np.flatnonzero(complete & self.fit_mask[:, col])
+                if len(donors) < self.n_neighbors:
+                    break
+
+                key = (observed.tobytes(), col)
+                if key not in self._trees:
+                    self._trees[key] = cKDTree(self.fit_X[np.ix_(donors, obs)])
+                _, idx = self._trees[key].query(X[np.ix_(group, obs)], k=self.n_neighbors)
+                idx = idx.reshape(len(group), -1)
+                filled[col] = self.fit_X[donors, col][idx].mean(axis=1)
+            else:
+                for col, values in filled.items():
+                    X[group, col] = values
+                continue
+            left.append(group)
+
+        return np.concatenate(left) if left else rows[:0]
+
+def knn_impute(df, n_neighbors=5, **kwargs):
     """
     Impute missing values in a DataFrame using KNN regression.
 
@@ -11,12 +172,12 @@ def knn_impute(df, n_neighbors=5):
         The input DataFrame with missing values.
     n_neighbors : int
         Number of neighbors to use for imputation.
+    **kwargs
+        `algorithm`, `block_size` and `dtype` of BlockKNNImputer.
 
     Returns
     -------
     pd.DataFrame
         DataFrame with imputed values.
     """
-    imputer = KNNImputer(n_neighbors=n_neighbors)
-    imputed_array = imputer.fit_transform(df)
-    return pd.DataFrame(imputed_array, columns=df.columns, index=df.index)
+    return BlockKNNImputer(n_neighbors=n_neighbors, **kwargs).fit_transform(df)
@@ -0,0 +1,287 @@
+# nel_utils/logio.py
+#
+# Block-compressed run logs with a per-run index.
+#
+# Finished logs are repetitive text: variant, run UUID and dataset name on
+# every row. `compress_log` rewrites `<log>.csv` as `<log>.csv.zst` (or
+# `.csv.gz`), made of independent blocks of whole lines:
+#
+#   - each block is one zstd frame / gzip member, so the file is still a
+#     valid stream for zstdcat, zcat and pandas;
+#   - rows are grouped by run first, so a run sits in one or a few blocks;
+#   - the sidecar `<log>.csv.zst.idx` (JSON) holds the offset and sizes of
+#     every block and, per run UUID, the blocks holding its rows.
+#
+# `read_log` reads either form: a plain path also finds its compressed
+# sibling, and `run_id=` decompresses only that run's blocks. zstd goes
+# through pyarrow's codec (already needed by LogStore); gzip through the
+# standard library.
+
+import gzip
+import io
+import json
+import os
+
+from .logstore import LOG_COLUMNS
+
+# Extension -> codec
+CODECS = {'.zst': 'zstd', '.gz': 'gzip'}
+EXTENSIONS = {codec: ext for ext, codec in CODECS.items()}
+
+def _codec(path):
+    return CODECS.get(os.path.splitext(path)[1])
+
+def index_path(path):
+    return path + '.idx'
+
+def _compress(data, codec, level):
+    if codec == 'gzip':
+        return gzip.compress(data, compresslevel=9 if level is None else level)
+
+    import pyarrow as pa
+    return pa.Codec('zstd', compression_level=level).compress(data, asbytes=True)
+
+def _decompress(data, codec, raw_length):
+    if codec == 'gzip':
+        return gzip.decompress(data)
+
+    import pyarrow as pa
+    return pa.Codec('zstd').decompress(data, decompressed_size=raw_length, asbytes=True)
+
+def plain_path(path):
+    """The `.csv` path of a log, with any compression extension removed."""
+    return path[:-len(os.path.splitext(path)[1])] if _codec(path) else path
+
+def resolve(path):
+    """
+    The file to read for a log path.
+
+    A compressed path is returned as is. For a plain `.csv` that does not
+    exist, its `.csv.zst` or `.csv.gz` sibling is returned if present.
+    """
+    if _codec(path) or os.path.exists(path):
+        return path
+    for ext in ('.zst', '.gz'):
+        if os.path.exists(path + ext):
+            return path + ext
+    return path
+
+def compress_log(path, codec='zstd', block_size=1 << 18, level=None, group_runs=True, remove=False):
+    """
+    Write a block-compressed copy of a headerless log CSV and its index.
+
+    Parameters
+    ----------
+    path : str
+        Plain log CSV.
+    codec : str, optional
+        'zstd' (default) or 'gzip'.
+    block_size : int, optional
+        Uncompressed bytes per block. Smaller blocks make single-run reads
+        cheaper; larger ones compress better.
+    level : int, optional
+        Codec compression level.
+    group_runs : bool, optional
+        Store the rows run by run (stable, so generations keep their order)
+        instead of in logging order.
+    remove : bool, optional
+        Delete the plain CSV once the compressed log is complete.
+
+    Returns
+    -------
+    str
+        Path of the compressed log.
+    """
+    if codec not in EXTENSIONS:
+        raise ValueError(f"codec must be one of {list(EXTENSIONS)}, got '{codec}'.")
+
+    with open(path, 'rb') as f:
+        lines = f.read().splitlines(keepends=True)
+    if lines and not lines[-1].endswith(b'\n'):
+        lines[-1] += b'\n'
+
+    run_ids = [line.split(b',', 2)[1].decode() if line.count(b',') >= 2 else '' for line in lines]
+    order = range(len(lines))
+    if group_runs:
+        first = {}
+        for i, run_id in enumerate(run_ids):
+            first.setdefault(run_id, i)
+        order = sorted(order, key=lambda i: first[run_ids[i]])
+
+    out = path + EXTENSIONS[codec]
+    blocks, runs = [], {}
+    offset, block, block_runs = 0, [], set()
+
+    with open(out + '.tmp', 'wb') as f:
+        def flush():
+            nonlocal offset, block, block_runs
+            raw = b''.join(block)
+            data = _compress(raw, codec, level)
+            f.write(data)
+            for run_id in block_runs:
+                runs.setdefault(run_id, []).append(len(blocks))
+            blocks.append([offset, len(data), len(raw), len(block)])
+            offset += len(data)
+            block, block_runs = [], set()
+
+        size = 0
+        for i in order:
+            block.append(lines[i])
+            block_runs.add(run_ids[i])
+            size += len(lines[i])
+            if size >= block_size:
+                flush()
+                size = 0
+        if block:
+            flush()
+
+    with open(index_path(out) + '.tmp', 'w') as f:
+        json.dump({'codec': codec, 'rows': len(lines), 'blocks': blocks, 'runs': runs}, f)
+
+    # Index last: a log with an index is always complete
+    os.replace(out + '.tmp', out)
+    os.replace(index_path(out) + '.tmp', index_path(out))
+    if remove:
+        os.remove(path)
+    return out
+
+def compress_dir(log_dir, codec='zstd', remove=False, **kwargs):
+    """
+    Compress every run log in `log_dir` (settings and manifests are left as they are).
+
+    Returns
+    -------
+    list of str
+        Paths of the compressed logs.
+    """
+    out = []
+    for name in sorted(os.listdir(log_dir)):
+        if name.endswith('.csv') and not name.endswith('_settings.csv'):
+            out.append(compress_log(os.path.join(log_dir, name), codec, remove=remove, **kwargs))
+    return out
+
+def read_index(path):
+    """Sidecar index of a compressed log."""
+    with open(index_path(path)) as f:
+        return json.load(f)
+
+class _BlockReader(io.RawIOBase):
+    """Decompressed byte stream over some blocks of a compressed log."""
+
+    def __init__(self, path, codec, blocks):
+        self.file = open(path, 'rb')
+        self.codec = codec
+        self.blocks = iter(blocks)
+        self.buffer = b''
+
+    def readable(self):
+        return True
+
+    def readinto(self, out):
+        while not self.buffer:
+            block = next(self.blocks, None)
+            if block is None:
+                return 0
+            offset, length, raw_length, _ = block
+            self.file.seek(offset)
+            self.buffer = _decompress(self.file.read(length), self.codec, raw_length)
+
+        n = min(len(out), len(self.buffer))
+        out[:n], self.buffer = self.buffer[:n], self.buffer[n:]
+        return n
+
+    def close(self):
+        if not self.closed:
+            self.file.close()
+        super().close()
+
+def open_log(path, run_id=None):
+    """
+    Binary stream of a log's CSV text, plain or compressed.
+
+    With `run_id`, only the blocks holding that run are decompressed; they
+    may still contain rows of other runs. The caller closes the stream, e.g.
+    with `with open_log(path) as f:`.
+    """
+    path = resolve(path)
+    codec = _codec(path)
+    if codec is None:
+        return open(path, 'rb')
+
+    if not os.path.exists(index_path(path)):
+        if run_id is not None or codec != 'gzip':
+            raise FileNotFoundError(f'No index for {path}; recreate it with compress_log.')
+        return gzip.open(path, 'rb')
+
+    index = read_index(path)
+    ids = range(len(index['blocks'])) if run_id is None else index['runs'].get(str(run_id), [])
+    return io.BufferedReader(_BlockReader(path, codec, [index['blocks'][i] for i in ids]))
+
+def read_log(path, run_id=None, **kwargs):
+    """
+    Read a log as `pd.read_csv(path, header=None)` would, compressed or not.
+
+    Parameters
+    ----------
+    path : str
+        Plain or compressed log; a plain path that no longer exists falls
+        back to its compressed version.
+    run_id : str or list of str, optional
+        Only these runs, read from their blocks alone when the log is
+        compressed.
+    **kwargs
+        Passed to `pd.read_csv` (e.g. `usecols`, `chunksize`).
+
+    Returns
+    -------
+    pd.DataFrame, or a chunk iterator with `chunksize`; the file is closed
+    once the iterator is exhausted or discarded.
+    """
+    import pandas as pd
+
+    kwargs.setdefault('header', None)
+    if run_id is None:
+        if kwargs.get('chunksize') is not None:
+            return _chunks(path, kwargs)
+        with open_log(path) as f:
+            return pd.read_csv(f, **kwargs)
+
+    run_ids = [run_id] if isinstance(run_id, str) else [str(r) for r in run_id]
+    if kwargs.get('chunksize') is not None:
+        raise ValueError('chunksize is not supported with run_id.')
+
+    frames = []
+    for rid in run_ids:
+        with open_log(path, rid) as f:
+            if not f.peek(1):
+                # Run not in the index (or an empty log): nothing to parse
+                continue
+            df = pd.read_csv(f, **kwargs)
+        frames.append(df[df.iloc[:, _run_column(kwargs)] == rid])
+    return pd.concat(frames, ignore_index=True) if frames else _empty(kwargs)
+
+def _empty(kwargs):
+    """Frame without rows, with the columns `pd.read_csv(log, **kwargs)` gives."""
+    import pandas as pd
+
+    columns = list(kwargs.get('names') or range(len(LOG_COLUMNS)))
+    usecols = kwargs.get('usecols')
+    if usecols is not None:
+        columns = [col for i, col in enumerate(columns) if i in usecols or col in usecols]
+    return pd.DataFrame(columns=columns)
+
+def _chunks(path, kwargs):
+    import pandas as pd
+
+    with open_log(path) as f, pd.read_csv(f, **kwargs) as reader:
+        yield from reader
+
+def _run_column(kwargs):
+    """Position of the run_id column in a frame read with `kwargs`."""
+    usecols = kwargs.get('usecols')
+    if usecols is None:
+        return 1
+    usecols = sorted(usecols)
+    if 1 not in usecols:
+        raise ValueError('usecols must include column 1 (run_id) to filter by run.')
+    return usecols.index(1)
@@ -0,0 +1,194 @@
+# nel_utils/logstore.py
+#
+# Columnar store for the solver run logs.
+#
+# The slim_gsgp logger writes headerless CSV rows. This module gives them
+# names and types, and keeps them as compressed Parquet files in a
+# hive-partitioned tree:
+#
+#   <root>/algorithm=<gp|gsgp|slim>/cv=<fold>/run_id=<uuid>/part-0.parquet
+#
+# Reads are memory-mapped. Only the requested columns are decoded, and only
+# the partitions that match the filters are opened.
+#
+# Requires pyarrow, which is imported on first use.
+
+import os
+
+# Positional layout of the slim_gsgp log rows (log_level 1)
+LOG_COLUMNS = [
+    'variant',      # StandardGP / StandardGSGP / SLIM version
+    'run_id',
+    'dataset',
+    'seed',
+    'generation',
+    'rmse_train',
+    'timing',
+    'nodes_count',  # population total
+    'rmse_test',
+    'size',         # elite nodes, exceeds int64 for GSGP
+    'log_level'
+]
+
+PARTITIONS = ['algorithm', 'cv', 'run_id']
+
+def _schema():
+
+    import pyarrow as pa
+
+    return pa.schema([
+        ('variant', pa.string()),
+        ('dataset', pa.string()),
+        ('seed', pa.int64()),
+        ('generation', pa.int32()),
+        ('rmse_train', pa.float64()),
+        ('timing', pa.float64()),
+        ('nodes_count', pa.float64()),
+        ('rmse_test', pa.float64()),
+        ('size', pa.float64()),
+        ('size_exact', pa.string()),
+        ('size_log10', pa.float64()),
+        ('log_level', pa.int8())
+    ])
+
+def name_columns(df_log):
+    """
+    Return `df_log` with named columns. Frames read with `header=None` are
+    renamed after LOG_COLUMNS; extra columns (e.g. 'cv') are kept.
+    """
+    mapping = {i: name for i, name in enumerate(LOG_COLUMNS)}
+    return df_log.rename(columns=mapping)
+
+class LogStore:
+    """
+    Hive-partitioned Parquet store of run logs.
+
+    Parameters
+    ----------
+    root : str
+        Directory holding the store; created on first ingest.
+    """
+
+    def __init__(self, root):
+        self.root = root
+
+    def ingest(self, csv_path, algorithm, cv, compression='zstd'):
+        """
+        Convert one headerless log CSV into the store.
+
+        Parameters
+        ----------
+        csv_path : str
+            Path to a `_<algorithm>_<cv>.csv` log, or its `.csv.zst` /
+            `.csv.gz` version (see logio.py).
+        algorithm : str
+            'gp', 'gsgp' or 'slim'.
+        cv : int
+            Fold the log belongs to.
+        compression : str, optional
+            Parquet codec (default 'zstd').
+
+        Returns
+        -------
+        int
+            Number of rows written.
+        """
+        import pyarrow as pa
+        import pyarrow.compute as pc
+        import pyarrow.csv as pcsv
+        import pyarrow.dataset as ds
+        from .logio import open_log
+        from .selector import size_log10
+
+        # 'size' is read as text: GSGP sizes overflow every integer type
+        with open_log(csv_path) as f:
+            table = pcsv.read_csv(
+                f,
+                read_options=pcsv.ReadOptions(column_names=LOG_COLUMNS),
+                convert_options=pcsv.ConvertOptions(column_types={
+                    'variant': pa.string(), 'run_id': pa.string(), 'dataset': pa.string(),
+                    'size': pa.string()
+                })
+            )
+
+        size_exact = table['size']
+        table = table.set_column(
+            LOG_COLUMNS.index('size'), 'size', pc.cast(size_exact, pa.float64())
+        )
+        table = table.append_column('size_exact', size_exact)
+        table = table.append_column(
+            'size_log10', pa.array(size_log10(size_exact.to_pandas()), pa.float64())
+        )
+        table = table.append_column('algorithm', pa.array([algorithm] * len(table), pa.string()))
+        table = table.append_column('cv', pa.array([cv] * len(table), pa.int32()))
+
+        schema = _schema()
+        for field in schema:
+            idx = table.schema.get_field_index(field.name)
+            table = table.set_column(idx, field.name, table[field.name].cast(field.type))
+
+        # Rewrite the run_id partitions present in this log instead of appending
+        # duplicates; other runs of the same (algorithm, cv) are left in place
+        ds.write_dataset(
+            table, self.root, format='parquet',
+            partitioning=PARTITIONS, partitioning_flavor='hive',
+            existing_data_behavior='delete_matching',
+            file_options=ds.ParquetFileFormat().make_write_options(compression=compression)
+        )
+        return len(table)
+
+    def ingest_dir(self, log_dir, algorithm):
+        """Ingest every `_<algorithm>_<cv>.csv` (or compressed version) found in `log_dir`."""
+        from .logio import plain_path
+
+        n_rows, seen = 0, set()
+        prefix = f'_{algorithm}_'
+        for name in sorted(os.listdir(log_dir)):
+            plain = plain_path(name)
+            tag = plain[len(prefix):-len('.csv')]
+            if plain.startswith(prefix) and plain.endswith('.csv') and tag.isdigit() and tag not in seen:
+                seen.add(tag)
+                n_rows += self.ingest(os.path.join(log_dir, name), algorithm, int(tag))
+        return n_rows
+
+    def dataset(self):
+        """Return the underlying memory-mapped `pyarrow.dataset.Dataset`."""
+        import pyarrow as pa
+        import pyarrow.dataset as ds
+        import pyarrow.fs as pfs
+
+        partitioning = ds.partitioning(
+            pa.schema([('algorithm', pa.string()), ('cv', pa.int32()), ('run_id', pa.string())]),
+            flavor='hive'
+        )
+        return ds.dataset(
+            self.root, format='parquet', partitioning=partitioning,
+            filesystem=pfs.LocalFileSystem(use_mmap=True)
+        )
+
+    def read(self, columns=None, algorithm=None, cv=None, run_id=None):
+        """
+        Read a subset of the store into a DataFrame.
+
+        Parameters
+        ----------
+        columns : list, optional
+            Columns to decode; all columns if None.
+        algorithm, cv, run_id : scalar or list, optional
+            Partition filters.
+
+        Returns
+        -------
+        pd.DataFrame
+        """
+        import pyarrow.dataset as ds
+
+        expr = None
+        for name, value in (('algorithm', algorithm), ('cv', cv), ('run_id', run_id)):
+            if value is None:
+                continue
+            values = value if isinstance(value, (list, tuple, set)) else [value]
+            cond = ds.field(name).isin(list(values))
+            expr = cond if expr is None else expr & cond
+
+        return self.dataset().to_table(columns=columns, filter=expr).to_pandas()
@@ -0,0 +1,170 @@
+# nel_utils/manifest.py
+#
+# Compact run manifests in place of the solvers' `_settings.csv` dumps.
+#
+# slim_gsgp appends `run_id,"{repr of every setting}"` per run, constants'
+# lambdas and all. Those rows cannot be parsed back, and they repeat the
+# settings that never change within a sweep. While a grid run trains
+# (`caller._fit_config`), the solver's `log_settings` is swapped for a
+# writer of `<log>_manifest.jsonl` next to the log:
+#
+#   {"sweep": "<sha256[:16]>", "algorithm": "slim", "fixed": {...}}
+#   {"run_id": "<uuid>", "sweep": "<sha256[:16]>", "seed": 3, "params": {...}}
+#
+# The manifest sits next to the `log_path` the run was given, whatever path
+# the solver passes to `log_settings` (slim_gsgp's SLIM always uses
+# `<cwd>/log/slim_settings.csv`). A sweep line holds the fixed parameters
+# once per file, whichever process (worker, Budget child, queue worker) logs
+# the sweep's first run: under an exclusive lock on the manifest, a process
+# appends it only if the file does not hold it yet. A run line holds the grid
+# point and seed, keyed by the run UUID found in the log rows. Both are single
+# appends of one line, so concurrent workers can share a file.
+#
+# SLIM keeps one module-level run id per process; it is renewed for every
+# run, so runs of the same worker are told apart in the logs as well.
+
+import fcntl
+import hashlib
+import json
+import os
+import sys
+import uuid
+from contextlib import contextmanager
+
+from .logio import plain_path
+
+# Data arrays are identified by the fold, not stored
+SKIPPED = ('X_train', 'y_train', 'X_test', 'y_test', 'log_path')
+
+def manifest_path(log_path):
+    """Manifest next to a log (plain or compressed) or its `_settings.csv`."""
+    log_path = plain_path(log_path)
+    for suffix in ('_settings.csv', '.csv'):
+        if log_path.endswith(suffix):
+            return log_path[:-len(suffix)] + '_manifest.jsonl'
+    return log_path + '_manifest.jsonl'
+
+def _plain(obj):
+    """JSON value of a parameter, stable across processes (no object addresses)."""
+    if isinstance(obj, dict):
+        return {str(k): _plain(v) for k, v in obj.items()}
+    if isinstance(obj, (list, tuple)):
+        return [_plain(v) for v in obj]
+    if hasattr(obj, 'tolist'):
+        return obj.tolist()
+    if obj is None or isinstance(obj, (bool, int, float, str)):
+        return obj
+    if callable(obj):
+        return f"{getattr(obj, '__module__', '')}.{getattr(obj, '__qualname__', type(obj).__name__)}"
+    return type(obj).__name__
+
+def _write(fd, record):
+    """Append one JSON line with a single write."""
+    os.write(fd, (json.dumps(record, separators=(',', ':')) + '\n').encode())
+
+def _read(fd):
+    """Whole content of the file open as `fd`."""
+    chunks, offset = [], 0
+    while chunk := os.pread(fd, 1 << 20, offset):
+        chunks.append(chunk)
+        offset += len(chunk)
+    return b''.join(chunks)
+
+class _Recorder:
+    """Stand-in for slim_gsgp's `log_settings` during one run."""
+
+    def __init__(self, algorithm, fixed_params, params, seed, log_path=None):
+        self.fixed = {'algorithm': algorithm, 'fixed': _plain({
+            k: v for k, v in fixed_params.items() if k not in SKIPPED
+        })}
+        self.sweep = hashlib.sha256(json.dumps(self.fixed, sort_keys=True).encode()).hexdigest()[:16]
+        self.params = _plain(params)
+        self.seed = seed
+        self.log_path = log_path
+        self.run_id = None
+
+    def __call__(self, path, settings_dict=None, unique_run_id=None):
+        path = manifest_path(self.log_path or path)
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+
+        self.run_id = str(unique_run_id)
+        sweep = json.dumps({'sweep': self.sweep}, separators=(',', ':'))[:-1].encode()
+        fd = os.open(path, os.O_RDWR | os.O_APPEND | os.O_CREAT, 0o644)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX)
+            if b'\n' + sweep not in b'\n' + _read(fd):
+                _write(fd, {'sweep': self.sweep, **self.fixed})
+            _write(fd, {'run_id': self.run_id, 'sweep': self.sweep, 'seed': self.seed, 'params': self.params})
+        finally:
+            os.close(fd)
+
+@contextmanager
+def recording(solver, algorithm, fixed_params, params, seed, log_path=None):
+    """
+    Write the manifest instead of `_settings.csv` while `solver` runs.
+
+    The manifest goes next to `log_path`, or next to the path the solver
+    logs its settings to if it is None.
+
+    Yields the recorder; its `run_id` is the solver's run UUID once the run
+    has logged its settings, None if the solver does not log them.
+    """
+    recorder = _Recorder(algorithm, fixed_params, params, seed, log_path)
+    module = sys.modules.get(solver.__module__)
+    if module is None or not hasattr(module, 'log_settings'):
+        yield recorder
+        return
+
+    saved = {name: getattr(module, name) for name in ('log_settings', 'UNIQUE_RUN_ID') if hasattr(module, name)}
+    module.log_settings = recorder
+    if 'UNIQUE_RUN_ID' in saved:
+        module.UNIQUE_RUN_ID = uuid.uuid1()
+    try:
+        yield recorder
+    finally:
+        for name, value in saved.items():
+            setattr(module, name, value)
+
+def read_manifest(paths, fixed=True):
+    """
+    Runs of one or more manifests.
+
+    Parameters
+    ----------
+    paths : str or list of str
+        Manifest files, or the logs they belong to.
+    fixed : bool, optional
+        Also add the sweep's fixed scalar parameters as columns.
+
+    Returns
+    -------
+    pd.DataFrame
+        One row per run, indexed by run_id: 'sweep', 'algorithm', 'seed',
+        the grid parameters and, with `fixed`, the fixed parameters.
+    """
+    import pandas as pd
+
+    paths = [paths] if isinstance(paths, str) else list(paths)
+
+    sweeps, runs = {}, []
+    for path in paths:
+        if not path.endswith('.jsonl'):
+            path = manifest_path(path)
+        with open(path) as f:
+            for line in f:
+                record = json.loads(line)
+                if 'run_id' in record:
+                    runs.append({'run_id': record['run_id'], 'sweep': record['sweep'], 'seed': record['seed'], **record['params']})
+                else:
+                    sweeps[record['sweep']] = record
+
+    df = pd.DataFrame(runs, columns=['run_id', 'sweep', 'seed'] if not runs else None)
+    df['algorithm'] = df['sweep'].map(lambda s: sweeps[s]['algorithm'])
+    if fixed:
+        scalars = pd.DataFrame.from_dict({
+            sweep: {k: v for k, v in record['fixed'].items() if not isinstance(v, (dict, list))}
+            for sweep, record in sweeps.items()
+        }, orient='index')
+        scalars = scalars.drop(columns=[c for c in scalars.columns if c in df.columns])
+        df = df.join(scalars, on='sweep')
+    return df.set_index('run_id')
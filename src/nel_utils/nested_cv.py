@@ -1,4 +1,10 @@
 import os
+import time
+from .budget import score
+from .hooks import Hooks, measure
+from .options import RunOptions
+from .planner import expand
+from .racing import placeholder
 
 def run(
     X, 
@@ -10,7 +16,10 @@ def run(
     seed, 
     LOG_DIR, 
     DATASET_NAME, 
-    call_slim
+    call_slim,
+    race=None,
+    options=None,
+    **kwargs
 ):
     
     """
@@ -26,44 +35,363 @@ def run(
         LOG_DIR: str, directory path to store logs.
         DATASET_NAME: str, dataset name for log files.
         call_slim: function, model training function accepting fixed_params and param_grid.
+        race: Race, optional. Races the configs across inner folds: from
+            `race.min_folds` on, configs significantly worse than the best
+            are dropped, and later folds pass only the survivors to
+            `call_slim` (as a list of combinations). Dropped configs keep
+            their place in each fold's results as a placeholder marked
+            'eliminated', with the fold it was first skipped on. Censored
+            runs count as the worst score.
+        options: RunOptions, optional. Per-run options; each field can also
+            be given as a keyword, which takes precedence. The options that
+            are set are passed on to `call_slim` as keywords:
+        cache: ResultCache, optional. When given, existing logs are kept and
+            `call_slim` also receives `cache` and `fold`, so finished configs
+            are loaded instead of retrained.
+        retention: Retention, optional. Forwarded to `call_slim`, bounding
+            how many models each inner fold keeps.
+        hooks: Hooks, optional. Receives fold_start/fold_end per inner fold
+            (fold slicing timed as phase 'slice') and run_end; it is also
+            forwarded to `call_slim`, which reports the configs.
+        semantics: SemanticsStore, optional. Forwarded to `call_slim`, which
+            stores every trained run's train and validation predictions.
+        queue: WorkQueue, optional. Forwarded to `call_slim`, which then runs
+            each inner fold's configs on the queue's workers.
+        budget: Budget, optional. Forwarded to `call_slim`; runs over its
+            limits are stopped and come back censored.
         
     Returns:
         results: list of results from inner folds.
     """
     
-    # Get first outer fold indices
-    data_cv_outer = [[learning_ix, test_ix] for learning_ix, test_ix in cv_outer.split(X, y)][0]
-    learning_ix, test_ix = data_cv_outer
-    
-    X_learning, y_learning = X[learning_ix], y[learning_ix]
-    X_test, y_test = X[test_ix], y[test_ix]
-    
-    print('\n' + '-'*41 + '\n')
-    print(f'Outer CV\nLearning shape: {X_learning.shape}\nTest shape: {X_test.shape}\n')
-    
-    results = []
-    data_cv_inner = [[train_ix, val_ix] for train_ix, val_ix in cv_inner.split(X_learning, y_learning)]
-    
-    for i_inner, (train_ix, val_ix) in enumerate(data_cv_inner):
-        print('-----\nInner CV {}'.format(i_inner))
-        
-        X_train, y_train = X_learning[train_ix], y_learning[train_ix]
-        X_val, y_val = X_learning[val_ix], y_learning[val_ix]
+    options = RunOptions.of(options, **kwargs)
+    hooks = options.hooks or Hooks()
+
+    # Only the options that were given reach `call_slim`
+    extra = options.kwargs()
+
+    with hooks.run(dataset=DATASET_NAME):
+        # Get first outer fold indices
+        data_cv_outer = [[learning_ix, test_ix] for learning_ix, test_ix in cv_outer.split(X, y)][0]
+        learning_ix, test_ix = data_cv_outer
         
-        print(f'Training shape: {X_train.shape}\nValidation shape: {X_val.shape}\n')
+        X_learning, y_learning = X[learning_ix], y[learning_ix]
+        X_test, y_test = X[test_ix], y[test_ix]
         
-        # Update fixed params for this fold
-        fixed_params.update({
-            'X_train': X_train, 'y_train': y_train,
-            'X_test': X_val, 'y_test': y_val
-        })
+        print('\n' + '-'*41 + '\n')
+        print(f'Outer CV\nLearning shape: {X_learning.shape}\nTest shape: {X_test.shape}\n')
         
-        LOG_PATH = os.path.join(LOG_DIR, f'slim_{DATASET_NAME}_{i_inner}.csv')
-        if os.path.exists(LOG_PATH):
-            os.remove(LOG_PATH)
-        fixed_params['log_path'] = LOG_PATH
+        results = []
+        data_cv_inner = [[train_ix, val_ix] for train_ix, val_ix in cv_inner.split(X_learning, y_learning)]
+
+        if race is not None:
+            combos = list(expand(param_grid))
+            alive = list(range(len(combos)))
+            dropped_at, scores = {}, []
         
-        res = call_slim(fixed_params, param_grid, seed=(seed + i_inner))
-        results.append(res)
+        for i_inner, (train_ix, val_ix) in enumerate(data_cv_inner):
+            print('-----\nInner CV {}'.format(i_inner))
+            
+            with hooks.fold(i_inner) as span:
+                tic = time.perf_counter()
+                X_train, y_train = X_learning[train_ix], y_learning[train_ix]
+                X_val, y_val = X_learning[val_ix], y_learning[val_ix]
+                span['phases'] = {'slice': time.perf_counter() - tic}
+                
+                print(f'Training shape: {X_train.shape}\nValidation shape: {X_val.shape}\n')
+                
+                # Update fixed params for this fold
+                fixed_params.update({
+                    'X_train': X_train, 'y_train': y_train,
+                    'X_test': X_val, 'y_test': y_val
+                })
+                
+                LOG_PATH = os.path.join(LOG_DIR, f'slim_{DATASET_NAME}_{i_inner}.csv')
+                if os.path.exists(LOG_PATH) and options.cache is None:
+                    os.remove(LOG_PATH)
+                fixed_params['log_path'] = LOG_PATH
+                
+                fold_extra = extra if options.cache is None else {**extra, 'fold': learning_ix[train_ix]}
+
+                if race is None:
+                    res = call_slim(fixed_params, param_grid, seed=(seed + i_inner), **fold_extra)
+                else:
+                    survivors = call_slim(
+                        fixed_params, [combos[j] for j in alive], seed=(seed + i_inner), **fold_extra
+                    )
+                    res = [placeholder(combos[j], dropped_at.get(j)) for j in range(len(combos))]
+                    for j, config_res in zip(alive, survivors):
+                        res[j] = config_res
+
+                    # Every survivor has a score on every fold so far; censored runs score inf
+                    scores.append([score(res[j]) for j in alive])
+                    keep = race.survivors(scores)
+                    dropped_at.update({j: i_inner + 1 for j, k in zip(alive, keep) if not k})
+                    alive = [j for j, k in zip(alive, keep) if k]
+                    scores = [[x for x, k in zip(fold_scores, keep) if k] for fold_scores in scores]
+                    print(f'Racing: {len(alive)} of {len(combos)} configs left\n')
+
+                results.append(res)
         
     return results
+
+def run_all(
+    X,
+    y,
+    cv_outer,
+    cv_inner,
+    fixed_params,
+    param_grid,
+    seed,
+    LOG_DIR,
+    DATASET_NAME,
+    n_jobs=-1,
+    set_max_depth=False,
+    race=None,
+    options=None,
+    **kwargs
+):
+
+    """
+    Run the full nested cross-validation, scheduling every (outer fold,
+    inner fold, config) triple as an independent task on a worker pool.
+
+    As soon as all inner tasks of an outer fold finish, the config with the
+    lowest mean validation RMSE is refitted on that fold's learning set and
+    scored on its test set, while other folds are still being searched.
+
+    Parameters:
+        X, y: Features and target arrays.
+        cv_outer: Outer CV splitter object (with split method).
+        cv_inner: Inner CV splitter object.
+        fixed_params: dict, fixed solver parameters, including 'algorithm'.
+        param_grid: dict, grid of hyperparameters to search.
+        seed: int, base seed; inner fold i uses seed + i, refits use seed.
+        LOG_DIR: str, directory path to store logs.
+        DATASET_NAME: str, dataset name for log files.
+        n_jobs: int, number of worker processes (-1 uses all cores).
+        set_max_depth: bool, forwarded to the model call.
+        race: Race, optional. Races the configs across the inner folds of
+            each outer fold: the first `race.min_folds` inner folds run all
+            configs, then each further inner fold only runs the configs that
+            are not significantly worse than the best. Dropped configs are
+            placeholders marked 'eliminated' in 'inner_results', and the best
+            config is chosen among the survivors. Censored runs count as the
+            worst score.
+        options: RunOptions, optional. Per-run options; each field can also
+            be given as a keyword, which takes precedence. A planner or a
+            queue is not supported here:
+        cache: ResultCache, optional. Finished tasks (inner and refit) are
+            loaded from it instead of resubmitted, and existing logs are kept.
+        retention: Retention, optional. Applied per inner fold; refitted
+            models are always kept.
+        hooks: Hooks, optional. Receives config_start/config_end per task
+            with the timings measured in the worker, fold_start/fold_end per
+            (outer, inner) fold, and run_end. A fold's 'wall' runs from its
+            first submission to its last result; 'cpu' sums its configs.
+        semantics: SemanticsStore, optional. Stores the predictions of every
+            trained run under its 'run_id': inner runs on their training
+            ('train') and validation ('val') sets and on the outer test set
+            of their fold ('test'), refits on the learning ('train') and
+            test ('test') sets. Ensembles of inner runs can then be scored on
+            the outer test set with `semantics.ensemble_score`.
+        budget: Budget, optional. Per-run wall-clock, memory and size limits.
+            Runs over a limit are stopped and returned censored; a config
+            censored on any inner fold ranks last when choosing the refit.
+
+    Returns:
+        results: list with one dict per outer fold holding 'inner_results'
+        (per inner fold, per config), 'best_params', 'inner_rmse', and the
+        refitted 'model' with its 'rmse_train', 'rmse_test' and 'run_id'.
+    """
+
+    from concurrent.futures import FIRST_COMPLETED, wait
+    from .cache import make_key
+    from .caller import _fit_config, _get_executor
+    from .shared import FoldDatasets
+
+    fixed_params = fixed_params.copy()
+    model_key = fixed_params.pop('algorithm')
+
+    if set_max_depth:
+        kwargs['set_max_depth'] = True
+    options = RunOptions.of(options, **kwargs)
+    if options.planner is not None or options.queue is not None:
+        raise ValueError('run_all schedules its own tasks: planner and queue are not supported.')
+    hooks = options.hooks or Hooks()
+    cache, retention, semantics = options.cache, options.retention, options.semantics
+
+    # What the workers need, pickled with every task; refits keep their models
+    task_options = options.task()
+    refit_options = task_options.replace(retention=None)
+
+    combos = list(expand(param_grid))
+
+    def log_path(*tags):
+        path = os.path.join(LOG_DIR, '_'.join([f'{model_key}_{DATASET_NAME}', *map(str, tags)]) + '.csv')
+        if os.path.exists(path) and cache is None:
+            os.remove(path)
+        return path
+
+    outer = [[learning_ix, test_ix] for learning_ix, test_ix in cv_outer.split(X, y)]
+    executor = _get_executor(n_jobs, options.budget)
+
+    # Task graph: inner tasks first, one refit per outer fold once its inner tasks are done.
+    # states[i_outer] tracks the inner folds submitted ('next'), tasks in flight ('left')
+    # and, when racing, the configs still in the race.
+    pending, cached, states, folds = {}, [], {}, []
+
+    # Per (outer, inner) fold: start time, configs left, cpu total, peak memory
+    fold_spans = {}
+
+    # X, y and fold indices go to shared memory once; tasks only carry handles
+    shared = FoldDatasets(X, y)
+
+    def event(name, task, **info):
+        kind, i_outer, i_inner, i_config = task
+        fold = (i_outer, 'refit' if kind == 'refit' else i_inner)
+        hooks.emit(name, fold=fold, config=i_config, dynamic_params=combos[i_config], **info)
+
+    def submit(task, fold_params, dynamic_params, task_seed, fold_ix, data, splits=None):
+        event('config_start', task)
+
+        key = None
+        if cache is not None:
+            key = make_key(model_key, fold_params, dynamic_params, fold_ix, task_seed, options.set_max_depth)
+            with measure(hooks.trace_memory) as span:
+                res = cache.get(key)
+            if res is not None:
+                res['profile'] = {**span, 'cached': True}
+                cached.append((task, res))
+                return
+        future = executor.submit(
+            _fit_config, model_key, fold_params, dynamic_params, task_seed,
+            refit_options if task[0] == 'refit' else task_options, key, data, splits
+        )
+        pending[future] = task
+
+    def submit_waves(i_outer):
+        """Submit the next inner folds of an outer fold: all of them, or one race step."""
+        state = states[i_outer]
+        n_inner = len(state['inner'])
+
+        if race is not None and state['next'] >= race.min_folds:
+            inner_results = folds[i_outer]['inner_results']
+            scores = [[score(inner_results[k][j]) for j in state['alive']] for k in range(state['next'])]
+            keep = race.survivors(scores)
+            state['dropped_at'].update({j: state['next'] for j, k in zip(state['alive'], keep) if not k})
+            state['alive'] = [j for j, k in zip(state['alive'], keep) if k]
+
+        stop = n_inner if race is None else min(max(state['next'] + 1, race.min_folds), n_inner)
+        for i_inner in range(state['next'], stop):
+            train_ix, val_ix = state['inner'][i_inner]
+            learning_ix = outer[i_outer][0]
+            fold_params = {**fixed_params, 'log_path': log_path(i_outer, i_inner)}
+            fold_ix = [learning_ix[train_ix], learning_ix[val_ix]]
+            data = shared.fold(*fold_ix)
+
+            splits = None
+            if semantics is not None:
+                splits = {'train': 'X_train', 'val': 'X_test', 'test': state['test_rows']}
+
+            hooks.emit('fold_start', fold=(i_outer, i_inner))
+            fold_spans[i_outer, i_inner] = {
+                'start': time.perf_counter(), 'left': len(state['alive']), 'cpu': 0.0, 'peak_mem': None
+            }
+            state['left'] += len(state['alive'])
+            for i_config in state['alive']:
+                submit(
+                    ('inner', i_outer, i_inner, i_config), fold_params, combos[i_config],
+                    seed + i_inner, fold_ix, data, splits
+                )
+        state['next'] = stop
+
+    with hooks.run(algorithm=model_key, dataset=DATASET_NAME, n_configs=len(combos)):
+        for i_outer, (learning_ix, test_ix) in enumerate(outer):
+            X_learning, y_learning = X[learning_ix], y[learning_ix]
+            inner = [[train_ix, val_ix] for train_ix, val_ix in cv_inner.split(X_learning, y_learning)]
+
+            folds.append({
+                'outer_fold': i_outer,
+                'inner_results': [[None] * len(combos) for _ in inner]
+            })
+            states[i_outer] = {
+                'inner': inner, 'next': 0, 'left': 0, 'alive': list(range(len(combos))), 'dropped_at': {},
+                'test_rows': shared.rows(test_ix) if semantics is not None else None
+            }
+            submit_waves(i_outer)
+
+        try:
+            while pending or cached:
+                if cached:
+                    done, cached = cached, []
+                else:
+                    finished, _ = wait(pending, return_when=FIRST_COMPLETED)
+                    done = [(pending.pop(future), future.result()) for future in finished]
+
+                for task, res in done:
+                    kind, i_outer, i_inner, i_config = task
+                    fold = folds[i_outer]
+                    event('config_end', task, **res['profile'])
+                    if 'semantics' in res:
+                        semantics.put(res['run_id'], res.pop('semantics'))
+
+                    if kind == 'refit':
+                        fold.update({
+                            'model': res['model'], 'rmse_train': res['rmse_train'], 'rmse_test': res['rmse_test'],
+                            'run_id': res['run_id']
+                        })
+                        print(f"Outer CV {i_outer} | best {fold['best_params']} | test RMSE {res['rmse_test']:.4f}")
+                        continue
+
+                    fold['inner_results'][i_inner][i_config] = res
+                    if retention is not None:
+                        retention.prune(fold['inner_results'][i_inner])
+
+                    span = fold_spans[i_outer, i_inner]
+                    span['left'] -= 1
+                    span['cpu'] += res['profile']['cpu']
+                    peak = res['profile']['peak_mem']
+                    if peak is not None:
+                        span['peak_mem'] = max(span['peak_mem'] or 0, peak)
+                    if not span['left']:
+                        hooks.emit(
+                            'fold_end', fold=(i_outer, i_inner), wall=time.perf_counter() - span['start'],
+                            cpu=span['cpu'], peak_mem=span['peak_mem']
+                        )
+
+                    state = states[i_outer]
+                    state['left'] -= 1
+                    if state['left']:
+                        continue
+                    if state['next'] < len(state['inner']):
+                        submit_waves(i_outer)
+                        continue
+
+                    # All inner folds finished: pick the best config and refit it on the learning set
+                    inner_results = fold['inner_results']
+                    for fold_res in inner_results:
+                        for j, at in state['dropped_at'].items():
+                            fold_res[j] = fold_res[j] or placeholder(combos[j], at)
+
+                    alive = state['alive']
+                    mean_rmse = [
+                        sum(score(fold_res[i_config]) for fold_res in inner_results) / len(inner_results)
+                        for i_config in alive
+                    ]
+                    i_best = alive[min(range(len(alive)), key=mean_rmse.__getitem__)]
+                    fold.update({'best_params': combos[i_best], 'inner_rmse': min(mean_rmse)})
+                    if race is not None:
+                        print(f"Outer CV {i_outer} | racing kept {len(alive)} of {len(combos)} configs")
+
+                    learning_ix, test_ix = outer[i_outer]
+                    refit_params = {**fixed_params, 'log_path': log_path(i_outer, 'refit')}
+                    submit(
+                        ('refit', i_outer, None, i_best), refit_params, combos[i_best], seed,
+                        [learning_ix, test_ix], shared.fold(learning_ix, test_ix),
+                        None if semantics is None else {'train': 'X_train', 'test': 'X_test'}
+                    )
+        finally:
+            shared.close()
+
+    return folds
@@ -0,0 +1,89 @@
+# nel_utils/options.py
+#
+# Options of the runs of a grid or nested CV.
+#
+# `call_model`, `nested_cv.run` and `nested_cv.run_all` take the same per-run
+# options: max-depth rule, result cache, retention, hooks, planner,
+# semantics store, work queue and budget. They are bundled in one RunOptions,
+# built once from the keywords of the entry point and passed unchanged down
+# to every fitted config, so a new option does not have to be threaded
+# through every signature on the way.
+#
+# Only part of it is needed where a config is trained (a worker process or a
+# queue node): `task()` drops what lives in the coordinating process (hook
+# callbacks, planner, semantics store, queue) before it is pickled.
+
+FIELDS = ('set_max_depth', 'cache', 'retention', 'hooks', 'planner', 'semantics', 'queue', 'budget')
+
+class RunOptions:
+    """
+    Per-run options of a grid or nested CV.
+
+    Parameters
+    ----------
+    set_max_depth : bool, optional
+        If True, `max_depth` is set to `init_depth + 15`.
+    cache : nel_utils.cache.ResultCache, optional
+        Finished configs are loaded from it instead of trained, and new
+        results are stored as soon as they finish.
+    retention : nel_utils.retention.Retention, optional
+        Which trained models to keep in memory.
+    hooks : nel_utils.hooks.Hooks, optional
+        Receives the pipeline events.
+    planner : nel_utils.planner.Planner, optional
+        Dedupes and orders the grid points.
+    semantics : nel_utils.semantics.SemanticsStore, optional
+        Stores the predictions of every trained run.
+    queue : nel_utils.workqueue.WorkQueue, optional
+        Runs the configs on the workers of a shared-filesystem queue.
+    budget : nel_utils.budget.Budget, optional
+        Wall-clock, memory and size limits per run.
+    """
+
+    def __init__(self, set_max_depth=False, cache=None, retention=None, hooks=None, planner=None,
+                 semantics=None, queue=None, budget=None):
+        self.set_max_depth = set_max_depth
+        self.cache = cache
+        self.retention = retention
+        self.hooks = hooks
+        self.planner = planner
+        self.semantics = semantics
+        self.queue = queue
+        self.budget = budget
+
+    @classmethod
+    def of(cls, options=None, **kwargs):
+        """`options` (default options if None) with the fields given as keywords replaced."""
+        return (options or cls()).replace(**kwargs)
+
+    def replace(self, **kwargs):
+        """Copy with the given fields replaced."""
+        unknown = set(kwargs) - set(FIELDS)
+        if unknown:
+            raise TypeError(f'Unknown run options {sorted(unknown)}; expected some of {FIELDS}.')
+        return RunOptions(**{**{name: getattr(self, name) for name in FIELDS}, **kwargs})
+
+    def kwargs(self):
+        """The fields that differ from their default, as keyword arguments."""
+        default = RunOptions()
+        return {
+            name: getattr(self, name) for name in FIELDS
+            if getattr(self, name) is not getattr(default, name)
+        }
+
+    @property
+    def trace_memory(self):
+        return self.hooks is not None and self.hooks.trace_memory
+
+    def task(self):
+        """The options a config needs where it is trained, safe to send to a worker."""
+        from .hooks import Hooks
+
+        return self.replace(
+            hooks=Hooks(trace_memory=True) if self.trace_memory else None,
+            planner=None, semantics=None, queue=None
+        )
+
+    def __repr__(self):
+        fields = ', '.join(f'{name}={value!r}' for name, value in self.kwargs().items())
+        return f'RunOptions({fields})'
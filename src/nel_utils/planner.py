@@ -0,0 +1,223 @@
+# nel_utils/planner.py
+#
+# Cost-aware planning of grid runs.
+#
+# Two sources of waste in a plain `itertools.product` sweep:
+#
+#   - duplicates: with `set_max_depth=True` the solver gets
+#     max_depth = init_depth + 15, so grid points that only differ in
+#     max_depth are the same run. The planner trains one of them and
+#     shares its result with the others.
+#   - long tails: GSGP/SLIM run times vary by orders of magnitude with
+#     pop_size and the ms bounds. If the slowest configs start last, the
+#     other workers sit idle while they finish. The planner estimates each
+#     config's cost from past runs and submits the most expensive first.
+#
+# A Planner is passed to `caller.call_model(planner=...)`. Results are still
+# returned in grid order.
+
+import ast
+import json
+import os
+import re
+from itertools import product
+
+import numpy as np
+import pandas as pd
+from .cache import _canonical, effective_params
+from .logio import plain_path, read_log
+from .manifest import manifest_path, read_manifest
+
+# Top-level scalar entries of a slim_gsgp settings row (a dict repr holding functions)
+_SETTING = re.compile(r"'(\w+)': (True|False|None|-?\d+\.?\d*(?:e[-+]?\d+)?|'[^']*')(?=[,}])")
+
+def expand(param_grid):
+    """Lazily yield every grid point of `param_grid`, in `itertools.product` order."""
+    keys, values = zip(*param_grid.items())
+    for combo in product(*values):
+        yield dict(zip(keys, combo))
+
+def _scalar(value):
+    return isinstance(value, (bool, int, float, str, np.integer, np.floating))
+
+def parse_settings(path):
+    """
+    Read a slim_gsgp `_settings.csv` into one row of scalar parameters per run.
+
+    The settings are `repr` dumps of the solver arguments; only the top-level
+    scalars (numbers, booleans, strings) are recovered.
+    """
+    rows = []
+    with open(path) as f:
+        for line in f:
+            run_id, _, settings = line.rstrip('\n').partition(',')
+            row = {k: ast.literal_eval(v) for k, v in _SETTING.findall(settings)}
+            row['run_id'] = run_id
+            rows.append(row)
+    return pd.DataFrame(rows)
+
+class CostModel:
+    """
+    Seconds-per-generation estimates for grid points, learned from past runs.
+
+    A config seen before gets the median of its observed costs. Others get
+    a log-linear fit over the history: log(cost) regressed on log(1 + |x|)
+    of each numeric parameter and an indicator per categorical value. The
+    estimate is multiplied by the config's `n_iter`.
+
+    Parameters
+    ----------
+    history : pd.DataFrame, optional
+        One row per past run: parameter columns plus 'cost_per_gen' (seconds).
+        Without history, costs fall back to pop_size * n_iter.
+    """
+
+    def __init__(self, history=None):
+        self.history = history if history is not None else pd.DataFrame(columns=['cost_per_gen'])
+        self._fits = {}
+
+    @classmethod
+    def from_logs(cls, log_paths, settings_paths=None):
+        """
+        Build the history from solver logs and their settings files.
+
+        Each run's cost is the mean of its per-generation 'timing' column. Its
+        parameters come from `settings_paths`: by default the run manifest
+        next to each log, or its `_settings.csv` for logs written before
+        manifests. Runs without settings are skipped.
+        """
+        log_paths = [log_paths] if isinstance(log_paths, str) else list(log_paths)
+        if settings_paths is None:
+            settings_paths = [
+                manifest_path(p) if os.path.exists(manifest_path(p)) else plain_path(p)[:-4] + '_settings.csv'
+                for p in log_paths
+            ]
+
+        frames = []
+        for log_path, settings_path in zip(log_paths, settings_paths):
+            if not os.path.exists(settings_path):
+                continue
+            df_log = read_log(log_path, usecols=[1, 6], names=['run_id', 'timing'])
+            costs = df_log.groupby('run_id')['timing'].mean().rename('cost_per_gen').reset_index()
+            if settings_path.endswith('.jsonl'):
+                settings = read_manifest(settings_path).reset_index()
+            else:
+                settings = parse_settings(settings_path)
+            frames.append(settings.merge(costs, on='run_id'))
+
+        return cls(pd.concat(frames, ignore_index=True) if frames else None)
+
+    @classmethod
+    def from_timings(cls, table):
+        """Build the history from a `hooks.TimingCollector` table (or its CSV)."""
+        if isinstance(table, str):
+            table = pd.read_csv(table)
+
+        table = table[(table['kind'] == 'config') & ~table['cached'].astype(bool)]
+        history = table.drop(columns=[c for c in table.columns if c.startswith('phase_')] + [
+            'kind', 'fold', 'config', 'cached', 'cpu', 'peak_mem', 'slow', 'wall'
+        ], errors='ignore')
+        history['cost_per_gen'] = table['wall'] / table['n_iter'].fillna(1).clip(lower=1)
+        return cls(history.reset_index(drop=True))
+
+    def _features(self, frame, names):
+        """Design matrix of `frame` over parameters `names`, with an intercept."""
+        cols = [np.ones(len(frame))]
+        for name in names:
+            values = frame[name]
+            if pd.api.types.is_numeric_dtype(values) and not pd.api.types.is_bool_dtype(values):
+                cols.append(np.log1p(np.abs(values.to_numpy(dtype='float64'))))
+            else:
+                for level in sorted(self.history[name].dropna().astype(str).unique())[1:]:
+                    cols.append((values.astype(str) == level).to_numpy(dtype='float64'))
+        return np.column_stack(cols)
+
+    def _fit(self, names):
+
+        if names not in self._fits:
+            hist = self.history.dropna(subset=list(names) + ['cost_per_gen'])
+            hist = hist[hist['cost_per_gen'] > 0]
+            coef = None
+            if len(hist):
+                A = self._features(hist, names)
+                # Small ridge term keeps the fit defined with few runs
+                reg = 1e-3 * np.eye(A.shape[1])
+                coef = np.linalg.solve(A.T @ A + reg, A.T @ np.log(hist['cost_per_gen'].to_numpy()))
+            self._fits[names] = coef
+        return self._fits[names]
+
+    def predict(self, params):
+        """Estimated seconds for one run with solver parameters `params`."""
+        n_iter = params.get('n_iter', 1)
+        names = tuple(sorted(
+            k for k, v in params.items()
+            if k in self.history.columns and k != 'n_iter' and _scalar(v)
+        ))
+
+        if names:
+            hist = self.history
+            match = np.ones(len(hist), dtype=bool)
+            for name in names:
+                match &= (hist[name] == params[name]).to_numpy()
+            if match.any():
+                return float(hist.loc[match, 'cost_per_gen'].median()) * n_iter
+
+            coef = self._fit(names)
+            if coef is not None:
+                row = pd.DataFrame([{name: params[name] for name in names}])
+                return float(np.exp(self._features(row, names) @ coef)[0]) * n_iter
+
+        return float(params.get('pop_size', 1)) * n_iter
+
+class Planner:
+    """
+    Orders and deduplicates the grid points of a `call_model` run.
+
+    Parameters
+    ----------
+    cost_model : CostModel, optional
+        Source of the cost estimates; pop_size * n_iter without one.
+    dedupe : bool, optional
+        Train grid points with identical effective parameters only once.
+    longest_first : bool, optional
+        Submit the most expensive configs first.
+    """
+
+    def __init__(self, cost_model=None, dedupe=True, longest_first=True):
+        self.cost_model = cost_model or CostModel()
+        self.dedupe = dedupe
+        self.longest_first = longest_first
+
+    def plan(self, fixed_params, combos, set_max_depth=False):
+        """
+        Group and order grid points.
+
+        Parameters
+        ----------
+        fixed_params : dict
+            Solver parameters shared by every grid point.
+        combos : iterable of dict
+            Grid points; consumed once, so a generator from `expand` works.
+        set_max_depth : bool, optional
+            As in `call_model`.
+
+        Returns
+        -------
+        list of (float, list of int)
+            Estimated cost and positions in `combos` of each distinct run, in
+            execution order. The first position of a group is trained; the
+            others reuse its result.
+        """
+        groups = {}
+        for i, dynamic_params in enumerate(combos):
+            params = effective_params(fixed_params, dynamic_params, set_max_depth)
+            key = json.dumps(_canonical(params), sort_keys=True) if self.dedupe else i
+            if key not in groups:
+                groups[key] = (self.cost_model.predict(params), [])
+            groups[key][1].append(i)
+
+        plan = list(groups.values())
+        if self.longest_first:
+            # Stable sort: equal estimates keep grid order
+            plan.sort(key=lambda group: -group[0])
+        return plan
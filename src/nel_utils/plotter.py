@@ -1,60 +1,147 @@
+# plotly is imported by the functions that draw, so that importing the
+# module (e.g. for `lttb` or `print_slim_individual`) stays cheap.
+
 import pandas as pd
-from plotly.subplots import make_subplots
-import plotly.graph_objects as go
+from .aggregator import GenerationStats
+from .logstore import LogStore, name_columns
+from .tailer import LogTailer
+
+# Plotted variable -> GenerationStats metric
+STATS_METRIC = {'rmse': 'rmse_train', 'rmse_val': 'rmse_test', 'size': 'size'}
+
+def _log_frame(df_log, columns):
+    """Named-column view of a headerless log frame, or the needed columns of a LogStore."""
+    if isinstance(df_log, LogStore):
+        return df_log.read(columns=columns)
+    return name_columns(df_log)
+
+def _curves(df_log, by=None):
+    """
+    Per-generation mean and std of every plotted variable in one groupby pass.
 
-def make_evolution_plot(df_log, plot_title, logarithmic=False, var='rmse'):
+    Returns a frame indexed by `by` + ['generation'] with (var, 'mean'/'std')
+    columns for var in 'rmse', 'rmse_val', 'size' and 'size_log'.
+    """
     import numpy as np
-    import plotly.graph_objects as go
-    import pandas as pd
 
+    size = pd.to_numeric(df_log['size'], errors='coerce').astype('float64')
     df_plot = pd.DataFrame({
-        'x': df_log.iloc[:, 4],
-        'rmse': df_log.iloc[:, 5],
-        'rmse_val': df_log.iloc[:, 8],
-        'size': df_log.iloc[:, 9]
+        'generation': df_log['generation'].to_numpy(),
+        'rmse': df_log['rmse_train'].to_numpy(dtype='float64'),
+        'rmse_val': pd.to_numeric(df_log['rmse_test'], errors='coerce').to_numpy(),
+        'size': size.to_numpy(),
+        'size_log': np.log10(size.fillna(0).clip(lower=0) + 1).to_numpy()
     })
+    keys = ['generation']
+    if by is not None:
+        df_plot[by] = df_log[by].to_numpy()
+        keys = [by, 'generation']
+
+    return df_plot.groupby(keys).agg(['mean', 'std'])
+
+def _curve(curves, var, variant=None):
+    """One variable of `_curves` as the 'x', 'mean', 'std' frame the plots draw."""
+    agg = curves[var] if variant is None else curves[var].xs(variant, level=0)
+    return agg.rename_axis('x').reset_index()
+
+def lttb(x, y, n_out):
+    """
+    Largest-Triangle-Three-Buckets downsampling.
+
+    Returns the indices of at most `n_out` points of (x, y) that keep the
+    visual shape of the curve: the first and last points, plus one point per
+    bucket, the one forming the largest triangle with its neighbours.
+    """
+    import numpy as np
+
+    x, y = np.asarray(x, dtype='float64'), np.asarray(y, dtype='float64')
+    n = len(x)
+    if n_out >= n or n_out < 3:
+        return np.arange(n)
+
+    y = np.where(np.isnan(y), np.nanmean(y) if not np.isnan(y).all() else 0, y)
+    edges = np.linspace(1, n - 1, n_out - 1).astype(int)
+    idx = np.empty(n_out, dtype=int)
+    idx[0], idx[-1] = 0, n - 1
+
+    for i in range(n_out - 2):
+        lo, hi = edges[i], edges[i + 1]
+        nxt = slice(hi, edges[i + 2] if i + 2 < len(edges) else n)
+        cx, cy = x[nxt].mean(), y[nxt].mean()
+        ax, ay = x[idx[i]], y[idx[i]]
+
+        area = np.abs((ax - cx) * (y[lo:hi] - ay) - (ax - x[lo:hi]) * (cy - ay))
+        idx[i + 1] = lo + int(np.argmax(area))
+    return idx
+
+def _downsample(agg, max_points):
+    """Rows of a curve frame kept by LTTB on its mean; all rows if `max_points` is None."""
+    if max_points is None:
+        return agg
+    return agg.iloc[lttb(agg['x'], agg['mean'], max_points)].reset_index(drop=True)
+
+def make_evolution_plot(df_log, plot_title, logarithmic=False, var='rmse', max_points=None):
+    """
+    Plot the mean and ±1 std envelope of `var` over generations.
+
+    `df_log` is a headerless log DataFrame, a LogStore, a GenerationStats or
+    a LogTailer (polled first, so each call draws the logs as they are now).
+    With `max_points`, each curve is downsampled to that many points (LTTB)
+    and drawn with WebGL traces, so the figure size no longer grows with the
+    number of generations.
+    """
+    import plotly.graph_objects as go
 
-    if var == 'size' and logarithmic:
-        # Convert to numeric, coercing errors to NaN
-        df_plot['size'] = pd.to_numeric(df_plot['size'], errors='coerce').fillna(0)
-        # Now apply log10 safely
-        df_plot['size'] = df_plot['size'].apply(lambda v: np.log10(v + 1) if v >= 0 else 0)
+    if isinstance(df_log, LogTailer):
+        df_log.poll()
+        df_log = df_log.stats
+
+    # Precomputed streaming aggregates: nothing to group
+    if isinstance(df_log, GenerationStats):
+        agg = df_log.frame('size_log' if var == 'size' and logarithmic else STATS_METRIC[var])
+        agg_val = df_log.frame('rmse_test')
+    else:
+        df_log = _log_frame(df_log, ['generation', 'rmse_train', 'rmse_test', 'size'])
+        curves = _curves(df_log)
+        agg = _curve(curves, 'size_log' if var == 'size' and logarithmic else var)
+        agg_val = _curve(curves, 'rmse_val')
+
+    agg, agg_val = _downsample(agg, max_points), _downsample(agg_val, max_points)
+    Scatter = go.Scatter if max_points is None else go.Scattergl
 
-    agg = df_plot.groupby('x')[var].agg(['mean', 'std']).reset_index()
     agg['y_upper'] = agg['mean'] + agg['std']
     agg['y_lower'] = agg['mean'] - agg['std']
     agg.loc[agg['y_lower'] < 0, 'y_lower'] = 0
 
     fig = go.Figure()
 
-    fig.add_trace(go.Scatter(
+    fig.add_trace(Scatter(
         x=agg['x'], y=agg['mean'], mode='lines',
         name='Train' if var == 'rmse' else 'Size', line=dict(color='blue')
     ))
-    fig.add_trace(go.Scatter(
+    fig.add_trace(Scatter(
         x=agg['x'], y=agg['y_upper'], mode='lines',
         line=dict(width=0), showlegend=False
     ))
-    fig.add_trace(go.Scatter(
+    fig.add_trace(Scatter(
         x=agg['x'], y=agg['y_lower'], mode='lines',
         fill='tonexty', fillcolor='rgba(0,0,255,0.1)',
         line=dict(width=0), showlegend=False
     ))
 
     if var == 'rmse':
-        agg_val = df_plot.groupby('x')['rmse_val'].agg(['mean', 'std']).reset_index()
         agg_val['y_upper'] = agg_val['mean'] + agg_val['std']
         agg_val['y_lower'] = agg_val['mean'] - agg_val['std']
 
-        fig.add_trace(go.Scatter(
+        fig.add_trace(Scatter(
             x=agg_val['x'], y=agg_val['mean'], mode='lines',
             name='Validation', line=dict(color='orange')
         ))
-        fig.add_trace(go.Scatter(
+        fig.add_trace(Scatter(
             x=agg_val['x'], y=agg_val['y_upper'], mode='lines',
             line=dict(width=0), showlegend=False
         ))
-        fig.add_trace(go.Scatter(
+        fig.add_trace(Scatter(
             x=agg_val['x'], y=agg_val['y_lower'], mode='lines',
             fill='tonexty', fillcolor='rgba(255,165,0,0.1)',
             line=dict(width=0), showlegend=False
@@ -71,7 +158,7 @@ def make_evolution_plot(df_log, plot_title, logarithmic=False, var='rmse'):
     fig.show()
 
 
-def make_slim_evolution_plots(n_rows, n_cols, slim_versions, df_log, plot_title, var='rmse'):
+def make_slim_evolution_plots(n_rows, n_cols, slim_versions, df_log, plot_title, var='rmse', max_points=None):
     """
     Create and display a grid of evolution plots for multiple SLIM variations.
     Each subplot shows the mean and ±1 standard deviation envelope of a given metric (`var`)
@@ -85,19 +172,26 @@ def make_slim_evolution_plots(n_rows, n_cols, slim_versions, df_log, plot_title,
         Number of columns in the subplot grid.
     slim_versions : list
         List of SLIM versions to be plotted. Each identifier is used to filter the corresponding data from `df_log`.
-    df_log : pandas.DataFrame
+    df_log : pandas.DataFrame, LogStore, GenerationStats or LogTailer
         DataFrame containing the log data for all runs. It must follow a specific structure:
         - Column 0: SLiM version
         - Column 4: Generation
         - Column 5: Train RMSE
         - Column 8: Validation RMSE
         - Column 9: Program size
+        A LogStore is read for the same columns by name; GenerationStats
+        supplies the per-generation aggregates directly; a LogTailer is
+        polled for new rows first and supplies its running aggregates.
     plot_title : str
         Title to display above the full grid of plots.
     var : str, optional
         The variable to plot.
         Either `'rmse'` (default) to show training and validation RMSE,
         or `'size'` to show the evolution of program size.
+    max_points : int, optional
+        Downsample every curve to this many points (LTTB) and draw WebGL
+        traces. The figure size then depends on `max_points` and not on the
+        number of generations. All points and SVG traces if None.
 
     Returns
     -------
@@ -108,8 +202,21 @@ def make_slim_evolution_plots(n_rows, n_cols, slim_versions, df_log, plot_title,
     -----
     - The envelope (±1 std) is visualized as a shaded area.
     - When `var='rmse'`, both training and validation curves are shown.
+    - Log frames are aggregated in a single groupby over (variant, generation).
     """
-    
+    import plotly.graph_objects as go
+    from plotly.subplots import make_subplots
+
+    if isinstance(df_log, LogTailer):
+        df_log.poll()
+        df_log = df_log.stats
+
+    stats = df_log if isinstance(df_log, GenerationStats) else None
+    if stats is None:
+        df_log = _log_frame(df_log, ['variant', 'generation', 'rmse_train', 'rmse_test', 'size'])
+        curves = _curves(df_log, by='variant')
+    Scatter = go.Scatter if max_points is None else go.Scattergl
+
     fig = make_subplots(
         rows=n_rows, cols=n_cols, 
         subplot_titles=[f'{i}' for i in slim_versions],
@@ -122,18 +229,16 @@ def make_slim_evolution_plots(n_rows, n_cols, slim_versions, df_log, plot_title,
         show_legend = i == 0
         
         # Plot data
-        df_plot = pd.DataFrame({
-            'x': df_log[df_log[0]==sv].iloc[:, 4],
-            'rmse': df_log[df_log[0]==sv].iloc[:, 5],
-            'rmse_val': df_log[df_log[0]==sv].iloc[:, 8],
-            'size': df_log[df_log[0]==sv].iloc[:, 9]
-        })
-        agg = df_plot.groupby('x')[var].agg(['mean', 'std']).reset_index()
+        if stats is not None:
+            agg = stats.frame(STATS_METRIC[var], variant=sv)
+        else:
+            agg = _curve(curves, var, variant=sv)
+        agg = _downsample(agg, max_points)
         agg['y_upper'] = agg['mean'] + agg['std']
         agg['y_lower'] = agg['mean'] - agg['std']
         agg.loc[agg['y_lower'] < 0, 'y_lower'] = 0
     
-        fig.add_trace(go.Scatter(
+        fig.add_trace(Scatter(
             x=agg['x'],
             y=agg['mean'],
             mode='lines',
@@ -141,7 +246,7 @@ def make_slim_evolution_plots(n_rows, n_cols, slim_versions, df_log, plot_title,
             line=dict(color='blue'),
             showlegend=show_legend
         ), row=row, col=col)
-        fig.add_trace(go.Scatter(
+        fig.add_trace(Scatter(
             x=agg['x'],
             y=agg['y_upper'],
             mode='lines',
@@ -149,7 +254,7 @@ def make_slim_evolution_plots(n_rows, n_cols, slim_versions, df_log, plot_title,
             line=dict(width=0),
             showlegend=False
         ), row=row, col=col)
-        fig.add_trace(go.Scatter(
+        fig.add_trace(Scatter(
             x=agg['x'],
             y=agg['y_lower'],
             mode='lines',
@@ -161,10 +266,14 @@ def make_slim_evolution_plots(n_rows, n_cols, slim_versions, df_log, plot_title,
         ), row=row, col=col)
 
         if var=='rmse':
-            agg = df_plot.groupby('x')['rmse_val'].agg(['mean', 'std']).reset_index()
+            if stats is not None:
+                agg = stats.frame('rmse_test', variant=sv)
+            else:
+                agg = _curve(curves, 'rmse_val', variant=sv)
+            agg = _downsample(agg, max_points)
             agg['y_upper'] = agg['mean'] + agg['std']
             agg['y_lower'] = agg['mean'] - agg['std']
-            fig.add_trace(go.Scatter(
+            fig.add_trace(Scatter(
                 x=agg['x'],
                 y=agg['mean'],
                 mode='lines',
@@ -172,7 +281,7 @@ def make_slim_evolution_plots(n_rows, n_cols, slim_versions, df_log, plot_title,
                 line=dict(color='orange'),
                 showlegend=show_legend
             ), row=row, col=col)
-            fig.add_trace(go.Scatter(
+            fig.add_trace(Scatter(
                 x=agg['x'],
                 y=agg['y_upper'],
                 mode='lines',
@@ -180,7 +289,7 @@ def make_slim_evolution_plots(n_rows, n_cols, slim_versions, df_log, plot_title,
                 line=dict(width=0),
                 showlegend=False
             ), row=row, col=col)
-            fig.add_trace(go.Scatter(
+            fig.add_trace(Scatter(
                 x=agg['x'],
                 y=agg['y_lower'],
                 mode='lines',
@@ -209,7 +318,35 @@ def make_slim_evolution_plots(n_rows, n_cols, slim_versions, df_log, plot_title,
     fig.show()
 
 
-def plot_features(data, features, num_columns=3, plot_type='Histogram', plot_title='Feature Distributions'):
+def _summary_trace(values, feature, plot_type, bins):
+    """Histogram bars or a box built from precomputed statistics instead of the raw values."""
+    import numpy as np
+    import plotly.graph_objects as go
+
+    values = np.asarray(values, dtype='float64')
+
+    if plot_type == 'Histogram':
+        counts, edges = np.histogram(values, bins=bins)
+        return go.Bar(
+            x=(edges[:-1] + edges[1:]) / 2, y=counts, width=np.diff(edges),
+            name=feature, marker_color='black', opacity=1, showlegend=False
+        )
+
+    # Same statistics plotly computes client-side: linear quartiles, 1.5 IQR fences
+    q1, median, q3 = np.percentile(values, [25, 50, 75])
+    iqr = q3 - q1
+    inside = values[(values >= q1 - 1.5 * iqr) & (values <= q3 + 1.5 * iqr)]
+    return go.Box(
+        q1=[q1], median=[median], q3=[q3],
+        lowerfence=[inside.min()], upperfence=[inside.max()],
+        mean=[values.mean()], sd=[values.std(ddof=1) if len(values) > 1 else 0],
+        x=[feature], name=feature, marker=dict(color='black'), boxpoints=False, showlegend=False
+    )
+
+def plot_features(
+    data, features, num_columns=3, plot_type='Histogram', plot_title='Feature Distributions',
+    precompute=False, bins=50
+):
     """
     Plot feature distributions as either histograms or box plots using Plotly.
 
@@ -219,7 +356,14 @@ def plot_features(data, features, num_columns=3, plot_type='Histogram', plot_tit
         num_columns (int): Number of columns in the subplot grid.
         plot_type (str): Either 'Histogram' or 'Box' to select plot type.
         plot_title (str): Title for the full figure.
+        precompute (bool): Compute histogram bins and box quartiles here and
+            send only those to the browser, instead of every raw value.
+            Box outliers are not drawn in this mode.
+        bins (int): Number of histogram bins when `precompute` is True.
     """
+    import plotly.graph_objects as go
+    from plotly.subplots import make_subplots
+
     plot_mapping = {
         'Histogram': go.Histogram,
         'Box': go.Box
@@ -239,7 +383,9 @@ def plot_features(data, features, num_columns=3, plot_type='Histogram', plot_tit
         col = i % num_columns + 1
         values = data[feature].dropna()
 
-        if plot_type == 'Histogram':
+        if precompute:
+            trace = _summary_trace(values, feature, plot_type, bins)
+        elif plot_type == 'Histogram':
             trace = PlotClass(
                 x=values,
                 name=feature,
@@ -0,0 +1,139 @@
+# nel_utils/racing.py
+#
+# Statistical racing of grid configurations across inner folds.
+#
+# Instead of training every config on every inner fold and comparing at the
+# end, the configs are evaluated fold by fold. From `min_folds` on, any config
+# that is significantly worse than the current best on validation RMSE is
+# dropped. Only the survivors go on to the next folds.
+#
+#   test='ttest'     paired t-test of each config against the best (t-race)
+#   test='friedman'  Friedman test over all survivors, then the Conover
+#                    post-hoc comparison of rank sums against the best (F-race,
+#                    Birattari et al. 2002). A paired t-test is used once two
+#                    configs are left.
+#
+# Scores must be finite or +inf. Censored runs of a Budget score +inf
+# (`budget.score`): a config with an infinite score on any fold ranks last and
+# is dropped, unless no config has finite scores on every fold. NaN scores are
+# rejected, as they would make the best config undefined.
+#
+# Racing is enabled with `nested_cv.run(race=...)` or `nested_cv.run_all(race=...)`.
+
+import numpy as np
+
+TESTS = ('ttest', 'friedman')
+
+def eliminated(res):
+    """True if `res` is the placeholder of a config dropped by a race."""
+    return bool(res.get('eliminated'))
+
+def placeholder(dynamic_params, fold):
+    """Result entry of a config that was eliminated before `fold`."""
+    return {
+        'model': None, 'rmse_train': None, 'rmse_test': None, 'size': None,
+        'dynamic_params': dynamic_params, 'eliminated': True, 'eliminated_at': fold
+    }
+
+class Race:
+    """
+    Elimination rule for racing configs across folds.
+
+    Parameters
+    ----------
+    alpha : float, optional
+        Significance level of the tests.
+    min_folds : int, optional
+        Folds every config is evaluated on before the first elimination.
+    test : str, optional
+        'ttest' (default) or 'friedman'.
+    """
+
+    def __init__(self, alpha=0.05, min_folds=2, test='ttest'):
+        if test not in TESTS:
+            raise ValueError(f"test must be one of {TESTS}, got '{test}'.")
+        if min_folds < 2:
+            raise ValueError('min_folds must be at least 2 for a paired test.')
+
+        self.alpha = alpha
+        self.min_folds = min_folds
+        self.test = test
+
+    def survivors(self, scores):
+        """
+        Configs that are not significantly worse than the best.
+
+        Parameters
+        ----------
+        scores : array-like, shape (n_folds, n_configs)
+            Validation RMSE of the alive configs on every fold done so far,
+            +inf for censored runs.
+
+        Returns
+        -------
+        np.ndarray of bool
+            Mask over the configs, True for those that stay in the race.
+        """
+        scores = np.asarray(scores, dtype='float64')
+        if scores.ndim != 2:
+            raise ValueError(f'Expected an (n_folds, n_configs) array, got shape {scores.shape}.')
+        if np.isnan(scores).any():
+            raise ValueError('Scores hold NaN; score censored runs as inf (budget.score).')
+
+        n_folds, n_configs = scores.shape
+        keep = np.ones(n_configs, dtype=bool)
+        if n_folds < self.min_folds or n_configs < 2:
+            return keep
+
+        # Configs with an infinite score rank last; the tests only see the others
+        finite = np.isfinite(scores).all(axis=0)
+        if not finite.any():
+            return keep
+        keep = finite.copy()
+        scores = scores[:, finite]
+        if scores.shape[1] < 2:
+            return keep
+
+        if self.test == 'friedman' and scores.shape[1] > 2:
+            keep[finite] = self._friedman(scores)
+            return keep
+
+        best = np.argmin(scores.mean(axis=0))
+        alive = np.flatnonzero(finite)
+        for j in range(scores.shape[1]):
+            if j != best:
+                keep[alive[j]] = not self._worse(scores[:, j], scores[:, best])
+        return keep
+
+    def _worse(self, a, b):
+        """Paired one-sided t-test of `a` > `b`."""
+        from scipy.stats import ttest_rel
+
+        diff = a - b
+        if np.all(diff == diff[0]):
+            # No variance: constant positive difference is as significant as it gets
+            return diff[0] > 0
+        return ttest_rel(a, b, alternative='greater').pvalue < self.alpha
+
+    def _friedman(self, scores):
+
+        from scipy.stats import friedmanchisquare, rankdata, t
+
+        n_folds, n_configs = scores.shape
+        keep = np.ones(n_configs, dtype=bool)
+
+        # All configs tied on every fold: the statistic is undefined, nothing differs
+        if np.all(scores == scores[:, :1]):
+            return keep
+        if not friedmanchisquare(*scores.T).pvalue < self.alpha:
+            return keep
+
+        # Conover post-hoc on rank sums, as in F-race
+        ranks = rankdata(scores, axis=1)
+        rank_sums = ranks.sum(axis=0)
+        dof = (n_folds - 1) * (n_configs - 1)
+        spread = max(n_folds * (ranks ** 2).sum() - (rank_sums ** 2).sum(), 0)
+        critical = t.ppf(1 - self.alpha / 2, dof) * np.sqrt(2 * spread / dof)
+
+        best = np.argmin(rank_sums)
+        return rank_sums - rank_sums[best] <= critical
@@ -0,0 +1,87 @@
+# nel_utils/retention.py
+#
+# Bounds how many trained models a grid run keeps in memory.
+#
+# GSGP/SLIM individuals carry their semantics tensors and block lists, so
+# holding every model of every grid point of every fold does not scale.
+# A Retention policy is handed to `caller.call_model` / `nested_cv.run_all`:
+#
+#   'all'    keep every model (previous behaviour)
+#   'top_k'  keep the models of the k best configs on rmse_test per fold;
+#            the others keep only their summary
+#   'disk'   pickle every model to `spill_dir` from inside the worker and
+#            keep only the summary plus 'model_path'
+#
+# Summaries always hold rmse_train, rmse_test, size and dynamic_params.
+
+import os
+import uuid
+
+POLICIES = ('all', 'top_k', 'disk')
+
+def model_size(model):
+    """Node count of a GP tree, GSGP tree or SLIM individual."""
+    for attr in ('nodes_count', 'nodes', 'node_count'):
+        if hasattr(model, attr):
+            return getattr(model, attr)
+    return None
+
+def load_model(res):
+    """Return the model of a result, loading it back from disk if it was spilled."""
+    import cloudpickle
+
+    if res.get('model') is not None or res.get('model_path') is None:
+        return res.get('model')
+    with open(res['model_path'], 'rb') as f:
+        return cloudpickle.load(f)
+
+class Retention:
+    """
+    Model retention policy.
+
+    Parameters
+    ----------
+    policy : str
+        One of 'all', 'top_k', 'disk'.
+    top_k : int, optional
+        Models kept per fold with policy 'top_k'.
+    spill_dir : str, optional
+        Directory for spilled models; required with policy 'disk'.
+    """
+
+    def __init__(self, policy='all', top_k=1, spill_dir=None):
+        if policy not in POLICIES:
+            raise ValueError(f"policy must be one of {POLICIES}, got '{policy}'.")
+        if policy == 'disk' and spill_dir is None:
+            raise ValueError("policy 'disk' needs a spill_dir.")
+
+        self.policy = policy
+        self.top_k = top_k
+        self.spill_dir = spill_dir
+
+    def spill(self, res, key=None):
+        """Worker side: move the model to disk under `key` (or a fresh id)."""
+        import cloudpickle
+
+        if self.policy != 'disk':
+            return res
+
+        os.makedirs(self.spill_dir, exist_ok=True)
+        path = os.path.join(self.spill_dir, f'{key or uuid.uuid4().hex}.pkl')
+        with open(path + '.tmp', 'wb') as f:
+            cloudpickle.dump(res['model'], f)
+        os.replace(path + '.tmp', path)
+
+        res.update({'model': None, 'model_path': path})
+        return res
+
+    def prune(self, models):
+        """Parent side: drop the models outside the top-k of one fold's results, in place."""
+        if self.policy != 'top_k':
+            return models
+
+        held = [res for res in models if res is not None and res.get('model') is not None]
+        held.sort(key=lambda res: res['rmse_test'])
+        for res in held[self.top_k:]:
+            res['model'] = None
+        return models
@@ -1,7 +1,11 @@
 # nel_utils/selector.py
 
+from bisect import bisect_left, bisect_right
+
 import gmpy2
+import numpy as np
 import pandas as pd
+from .logstore import LogStore, name_columns
 
 def gmpy2_nsmallest(df, column, n):
 
@@ -13,12 +17,59 @@ def gmpy2_nsmallest(df, column, n):
 
     return df.loc[top_n_indices]
 
+def size_log10(values):
+    """
+    log10 of non-negative program sizes given as ints, floats or decimal
+    strings. Integers are read from their leading 17 digits, so sizes far
+    beyond float range keep a finite, order-preserving approximation.
+    """
+    values = pd.Series(values, copy=False)
+    if pd.api.types.is_numeric_dtype(values):
+        return np.log10(values.to_numpy(dtype='float64'))
+
+    text = values.astype(str)
+    is_int = text.str.isdigit()
+
+    head = text.str.slice(0, 17)
+    out = np.log10(head.where(is_int, '1').astype('float64')) + (text.str.len() - head.str.len())
+    out[~is_int] = np.log10(text[~is_int].astype('float64'))
+
+    return out.to_numpy()
+
+def bigint_nsmallest(df, column, n):
+    """
+    `n` rows with the smallest exact `column`, as `gmpy2_nsmallest`.
+
+    Rows are preselected with an O(n) partition on the float64 log10 of the
+    sizes (read from `<column>_log10` when present). Exact integer comparison
+    only happens among the candidates tied with the n-th value.
+    """
+    if f'{column}_log10' in df:
+        approx = df[f'{column}_log10'].to_numpy(dtype='float64')
+    else:
+        approx = size_log10(df[column])
+
+    values = df[column].to_numpy()
+    exact = lambda i: (approx[i], gmpy2.mpz(values[i]))
+
+    if len(df) <= n:
+        return df.iloc[sorted(range(len(df)), key=exact)]
+
+    # Everything below the n-th approximate value is in; ties on it are settled exactly
+    kth = np.partition(approx, n - 1)[n - 1]
+    below = np.flatnonzero(approx < kth)
+    tied = np.flatnonzero(approx == kth)
+    if len(below) + len(tied) > n:
+        tied = sorted(tied, key=exact)[:n - len(below)]
+
+    return df.iloc[sorted([*below, *tied], key=exact)]
+
 def nsmallest(df, column, n):
     return df.nsmallest(n, column)
 
 MODEL_DICT = {
     'gp': nsmallest,
-    'gsgp': gmpy2_nsmallest
+    'gsgp': bigint_nsmallest
 }
 
 def select_top_n(
@@ -27,13 +78,33 @@ def select_top_n(
     k=10, 
     n=3
 ):
+    """
+    Pick the `n` smallest programs among the `k` least overfitting rows of
+    the `k` folds with the lowest median test RMSE.
+
+    `df_log` is either the concatenated headerless logs (with a 'cv'
+    column), in which case sorted row indices are returned, or a LogStore,
+    in which case only the needed columns of `model`'s partitions are read
+    and sorted (run_id, generation) pairs are returned. Both are ranked on
+    the same named columns.
+    """
+
+    if isinstance(df_log, LogStore):
+        df_log = df_log.read(
+            columns=['cv', 'run_id', 'generation', 'rmse_train', 'rmse_test', 'size', 'size_exact', 'size_log10'],
+            algorithm=model
+        )
+        df_log = df_log.assign(size=df_log['size_exact'] if model == 'gsgp' else df_log['size'])
+        top_n = _select(df_log[_columns(df_log)].copy(), model, k, n)
+        return sorted(zip(df_log.loc[top_n, 'run_id'], df_log.loc[top_n, 'generation']))
+
+    df_log = name_columns(df_log)
+    return _select(df_log[_columns(df_log)].copy(), model, k, n)
 
-    df = pd.DataFrame({
-        'cv': df_log['cv'],
-        'rmse_train': df_log.iloc[:, 4],
-        'rmse_test': df_log.iloc[:, 5],
-        'size': df_log.iloc[:, 9]
-    })
+def _columns(df_log):
+    return ['cv', 'rmse_train', 'rmse_test', 'size'] + (['size_log10'] if 'size_log10' in df_log else [])
+
+def _select(df, model, k, n):
 
     df['overfit_ratio'] = df['rmse_test'] / df['rmse_train']
 
@@ -45,3 +116,174 @@ def select_top_n(
     top_n = MODEL_DICT[model](top_k, 'size', n)
 
     return sorted(top_n.index.tolist())
+
+# Multi-objective selection
+#
+# `select_pareto` ranks log rows into non-dominated fronts per fold over
+# (rmse_test, size, overfit_ratio), all minimized. Each objective is first
+# replaced by its dense integer rank, so sizes are compared exactly (GSGP
+# sizes as integers, not floats) and the sweep below only handles int64.
+# Identical objective vectors are collapsed and share a front.
+#
+# Fronts are assigned in one pass over the points in lexicographic order
+# (efficient non-dominated sort with binary search over the fronts). A point
+# can only be dominated by earlier points, which are no worse in the first
+# objective, so a front dominates it iff some member is no worse in the
+# other two. Each front keeps that 2-D staircase as sorted lists; a query is
+# a bisection, O(log n) per front probed and O(log F) fronts per point.
+# Inserting into a staircase is a list splice, linear in its length S, so
+# the worst case is O(n (log n log F + S)), with S <= n. The splice is a
+# memmove, and on real logs the staircases stay short.
+
+OBJECTIVES = ('rmse_test', 'size', 'overfit_ratio')
+
+def size_rank(values, approx=None):
+    """
+    Dense ranks (0 = smallest) of program sizes given as numbers or decimal
+    integer strings, with exact integer comparison.
+
+    Sizes are ordered by their float64 log10 (`approx`, computed with
+    `size_log10` if not given); only sizes with equal approximations are
+    compared as integers.
+    """
+    values = pd.Series(values, copy=False)
+    if pd.api.types.is_numeric_dtype(values):
+        return np.unique(values.to_numpy(), return_inverse=True)[1].reshape(-1)
+
+    approx = size_log10(values) if approx is None else np.asarray(approx, dtype='float64')
+    raw = values.to_numpy()
+    order = np.argsort(approx, kind='stable')
+    starts = np.r_[0, np.flatnonzero(np.diff(approx[order])) + 1]
+    ends = np.r_[starts[1:], len(order)]
+
+    # Distinct exact values per group of equal approximations
+    ties = np.flatnonzero(ends - starts > 1)
+    distinct = np.ones(len(starts), dtype='int64')
+    exact = {}
+    for g in ties:
+        group = sorted((gmpy2.mpz(raw[i]), i) for i in order[starts[g]:ends[g]])
+        ranks, prev = [], None
+        for value, i in group:
+            if value != prev:
+                ranks.append([])
+                prev = value
+            ranks[-1].append(i)
+        distinct[g] = len(ranks)
+        exact[g] = ranks
+
+    base = np.r_[0, np.cumsum(distinct)[:-1]]
+    out = np.empty(len(order), dtype='int64')
+    out[order] = np.repeat(base, ends - starts)
+    for g, ranks in exact.items():
+        for r, rows in enumerate(ranks):
+            out[rows] = base[g] + r
+    return out
+
+def _fronts(points):
+    """
+    Front of every row of a lexicographically sorted, duplicate-free
+    (n, 3) integer array (0 = non-dominated).
+    """
+    stair_y, stair_z = [], []
+    out = np.empty(len(points), dtype='int64')
+
+    for i, (_, y, z) in enumerate(points.tolist()):
+        # First front that does not dominate the point
+        lo, hi = 0, len(stair_y)
+        while lo < hi:
+            mid = (lo + hi) // 2
+            j = bisect_right(stair_y[mid], y)
+            if j and stair_z[mid][j - 1] <= z:
+                lo = mid + 1
+            else:
+                hi = mid
+
+        if lo == len(stair_y):
+            stair_y.append([y])
+            stair_z.append([z])
+        else:
+            ys, zs = stair_y[lo], stair_z[lo]
+            j = k = bisect_left(ys, y)
+            while k < len(ys) and zs[k] >= z:
+                k += 1
+            ys[j:k] = [y]
+            zs[j:k] = [z]
+        out[i] = lo
+
+    return out
+
+def pareto_fronts(ranks):
+    """
+    Non-dominated sorting of rows of integer objective ranks (2 or 3
+    objectives, minimized).
+
+    Returns
+    -------
+    np.ndarray
+        Front index of every row, 0 for the Pareto front.
+    """
+    ranks = np.asarray(ranks, dtype='int64')
+    if ranks.ndim != 2 or ranks.shape[1] not in (2, 3):
+        raise ValueError(f'Expected an (n, 2) or (n, 3) array, got shape {ranks.shape}.')
+    if ranks.shape[1] == 2:
+        ranks = np.column_stack([ranks, np.zeros(len(ranks), dtype='int64')])
+    if not len(ranks):
+        return np.empty(0, dtype='int64')
+
+    # Sorted unique vectors; duplicates share the front of their vector
+    points, inverse = np.unique(ranks, axis=0, return_inverse=True)
+    return _fronts(points)[inverse.reshape(-1)]
+
+def select_pareto(df_log, model, n_fronts=1, objectives=OBJECTIVES, by='cv'):
+    """
+    Rank log rows into Pareto fronts per fold and keep the first `n_fronts`.
+
+    Parameters
+    ----------
+    df_log : pd.DataFrame or LogStore
+        Concatenated headerless logs (with a `by` column), or a LogStore, of
+        which only the needed columns of `model`'s partitions are read.
+    model : str
+        'gp', 'gsgp' or 'slim'.
+    n_fronts : int or None, optional
+        Number of fronts to keep per fold; None keeps every row.
+    objectives : tuple of str, optional
+        Two or three of 'rmse_test', 'rmse_train', 'size' and
+        'overfit_ratio' (rmse_test / rmse_train), all minimized.
+    by : str or None, optional
+        Column whose groups (folds) are ranked separately; None ranks all
+        rows together.
+
+    Returns
+    -------
+    pd.DataFrame
+        The kept rows with `by`, 'front' and the objectives (sizes exact),
+        plus 'run_id' and 'generation', sorted by (`by`, front, first
+        objective). Frame input keeps its row index.
+    """
+    if isinstance(df_log, LogStore):
+        columns = ['run_id', 'generation', 'rmse_train', 'rmse_test', 'size', 'size_exact', 'size_log10']
+        df = df_log.read(columns=columns + ([by] if by else []), algorithm=model)
+        df = df.assign(size=df['size_exact'] if model == 'gsgp' else df['size'])
+    else:
+        df = name_columns(df_log)
+
+    df = df.assign(overfit_ratio=df['rmse_test'] / df['rmse_train'])
+    approx = df['size_log10'].to_numpy() if 'size_log10' in df else None
+
+    ranks = np.column_stack([
+        size_rank(df['size'], approx) if name == 'size'
+        else np.unique(df[name].to_numpy(dtype='float64'), return_inverse=True)[1].reshape(-1)
+        for name in objectives
+    ])
+
+    front = np.empty(len(df), dtype='int64')
+    groups = df.groupby(by, sort=False).indices.values() if by else [np.arange(len(df))]
+    for rows in groups:
+        front[rows] = pareto_fronts(ranks[rows])
+
+    keep = np.flatnonzero(front < (np.inf if n_fronts is None else n_fronts))
+    keys = [ranks[keep, 0], front[keep]] + ([df[by].to_numpy()[keep]] if by else [])
+    columns = [c for c in (by, 'run_id', 'generation') if c] + list(objectives)
+    out = df.iloc[keep][columns].assign(front=front[keep])
+    return out.iloc[np.lexsort(keys)]
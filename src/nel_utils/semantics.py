@@ -0,0 +1,198 @@
+# nel_utils/semantics.py
+#
+# Memory-mapped store of final run semantics, and ensembles scored from it.
+#
+# With `call_model(semantics=...)` / `nested_cv.run_all(semantics=...)` each
+# trained run's predictions are computed once, in the worker, on its
+# training set ('train'), on the set its rmse_test is measured on ('val' for
+# inner folds, 'test' for outer refits) and, in `run_all`, on the outer test
+# set of its fold ('test'). Runs are keyed by the result's 'run_id', the UUID
+# the solver logs the run under (see manifest.py).
+#
+# Layout:
+#   <root>/<split>-<n>.f32   one row of n float32 values per run
+#   <root>/index.csv         run_id,split,n,row
+#
+# Data is appended before the index line that points to it, so readers never
+# see a partial row. There is a single writer: the process driving the grid.
+#
+# Ensembles of any runs sharing a split (e.g. every inner run of one outer
+# fold on its outer test set) only gather rows from the memory maps.
+
+import csv
+import os
+
+import numpy as np
+
+HOW = ('mean', 'median', 'weighted')
+
+def compute_semantics(model, inputs):
+    """
+    Predictions of `model` on each named input, as float32 arrays.
+
+    Parameters
+    ----------
+    model : Tree or Individual
+        Trained GP/GSGP tree or SLIM individual (see `compiler.compile_model`).
+    inputs : dict
+        Split name -> X (np.ndarray or torch.Tensor).
+
+    The backend follows the model, not the inputs: slim_gsgp models always
+    run on torch (NumPy inputs are wrapped without copying), other models
+    on NumPy (tensors are converted).
+    """
+    from .compiler import compile_model, model_backend
+
+    if not inputs:
+        return {}
+    backend = model_backend(model)
+    program = compile_model(model, backend)
+
+    out = {}
+    for name, X in inputs.items():
+        if backend == 'numpy' and not isinstance(X, np.ndarray):
+            X = X.detach().cpu().numpy()
+        y = program.predict(X)
+        out[name] = np.asarray(y if isinstance(y, np.ndarray) else y.detach().cpu().numpy(), dtype='float32')
+    return out
+
+class SemanticsStore:
+    """
+    Append-only semantics vectors keyed by (run_id, split). Instances only
+    hold the root path, so they can be passed around freely.
+    """
+
+    def __init__(self, root):
+        self.root = root
+        self._index = None
+        self._maps = {}
+
+    def _path(self, split, n):
+        return os.path.join(self.root, f'{split}-{n}.f32')
+
+    def _read_index(self):
+
+        path = os.path.join(self.root, 'index.csv')
+        stamp = os.stat(path).st_size if os.path.exists(path) else 0
+        if self._index is not None and self._index[0] == stamp:
+            return self._index[1]
+
+        index = {}
+        if stamp:
+            with open(path, newline='') as f:
+                for run_id, split, n, row in csv.reader(f):
+                    index[run_id, split] = (int(n), int(row))
+        # Maps are reopened after growth, so new rows are visible
+        self._index, self._maps = (stamp, index), {}
+        return index
+
+    def __contains__(self, run_id):
+        return any(key[0] == str(run_id) for key in self._read_index())
+
+    def splits(self, run_id):
+        """Splits stored for `run_id`."""
+        return [split for rid, split in self._read_index() if rid == str(run_id)]
+
+    def put(self, run_id, semantics):
+        """Append the vectors of one run; splits already stored are left as they are."""
+        index = self._read_index()
+        os.makedirs(self.root, exist_ok=True)
+
+        lines = []
+        for split, values in semantics.items():
+            if (str(run_id), split) in index:
+                continue
+            values = np.ascontiguousarray(values, dtype='float32').ravel()
+            path = self._path(split, len(values))
+            row = (os.path.getsize(path) if os.path.exists(path) else 0) // max(values.nbytes, 1)
+            with open(path, 'ab') as f:
+                f.write(values.tobytes())
+            lines.append([str(run_id), split, len(values), row])
+
+        with open(os.path.join(self.root, 'index.csv'), 'a', newline='') as f:
+            csv.writer(f).writerows(lines)
+
+    def _map(self, split, n):
+        if (split, n) not in self._maps:
+            self._maps[split, n] = np.memmap(self._path(split, n), dtype='float32', mode='r').reshape(-1, n)
+        return self._maps[split, n]
+
+    def get(self, run_id, split):
+        """Semantics of one run on `split` (a read-only view)."""
+        n, row = self._read_index()[str(run_id), split]
+        return self._map(split, n)[row]
+
+    def matrix(self, run_ids, split):
+        """
+        Semantics of several runs on `split`, shape (n_runs, n).
+
+        Raises
+        ------
+        KeyError
+            If a run has no vector for `split`.
+        ValueError
+            If the runs were evaluated on sets of different sizes.
+        """
+        index = self._read_index()
+        entries = [index[str(run_id), split] for run_id in run_ids]
+        sizes = {n for n, _ in entries}
+        if len(sizes) > 1:
+            raise ValueError(f"Runs have '{split}' semantics of different lengths {sorted(sizes)}.")
+        if not entries:
+            return np.empty((0, 0), dtype='float32')
+
+        n = sizes.pop()
+        return self._map(split, n)[[row for _, row in entries]]
+
+def _runs(runs, overfit_ratio):
+    """Run ids and overfit ratios of a list of run ids or result dicts."""
+    runs = list(runs)
+    if runs and isinstance(runs[0], dict):
+        overfit_ratio = [res['rmse_test'] / res['rmse_train'] for res in runs]
+        runs = [res['run_id'] for res in runs]
+    return runs, overfit_ratio
+
+def ensemble_predict(store, runs, split='test', how='mean', overfit_ratio=None):
+    """
+    Ensemble prediction of several runs from their stored semantics.
+
+    Parameters
+    ----------
+    store : SemanticsStore
+    runs : list of str or list of dict
+        Run ids, or results of `call_model`/`nested_cv` (with 'run_id',
+        'rmse_train' and 'rmse_test').
+    split : str, optional
+        Stored split to combine.
+    how : str, optional
+        'mean', 'median', or 'weighted': a mean weighted by
+        1 / overfit_ratio, so runs that overfit less count more.
+    overfit_ratio : array-like, optional
+        rmse_test / rmse_train per run; needed for 'weighted' with run ids,
+        taken from the results otherwise.
+
+    Returns
+    -------
+    np.ndarray
+    """
+    if how not in HOW:
+        raise ValueError(f"how must be one of {HOW}, got '{how}'.")
+
+    run_ids, overfit_ratio = _runs(runs, overfit_ratio)
+    semantics = store.matrix(run_ids, split)
+
+    if how == 'median':
+        return np.median(semantics, axis=0)
+    if how == 'mean':
+        return semantics.mean(axis=0, dtype='float64')
+
+    if overfit_ratio is None:
+        raise ValueError("how='weighted' needs overfit_ratio, or results instead of run ids.")
+    weights = 1 / np.asarray(overfit_ratio, dtype='float64')
+    return weights @ semantics / weights.sum()
+
+def ensemble_score(store, runs, y, split='test', how='mean', overfit_ratio=None):
+    """RMSE of `ensemble_predict` against the targets `y` of `split`."""
+    pred = ensemble_predict(store, runs, split, how, overfit_ratio)
+    y = np.asarray(y.numpy() if hasattr(y, 'numpy') else y, dtype='float64')
+    return float(np.sqrt(np.mean((pred - y) ** 2)))
@@ -0,0 +1,181 @@
+# nel_utils/shared.py
+#
+# Shared-memory handoff of fold data to worker processes.
+#
+# Without it every task pickles its own X_train/y_train/X_test/y_test
+# slices. Here X, y and the fold index arrays are copied into POSIX shared
+# memory once. Tasks only carry a FoldData handle (segment names, shapes,
+# dtypes), so the per-task payload does not depend on the dataset size. Each
+# worker attaches a segment once and slices its fold locally.
+#
+# Workers are reused across calls. Their attachments are kept for the tasks
+# of one FoldDatasets only: the first task of another one closes them.
+#
+# Torch tensors come back as zero-copy `torch.from_numpy` views. The torch
+# `share_memory_` route is not used because the loky pickler serialises
+# tensors by value instead of through torch's fd-passing reductions.
+
+import uuid
+from multiprocessing import resource_tracker, shared_memory
+
+import numpy as np
+
+# Worker-side attachments of the current owner (FoldDatasets id)
+_ATTACHED = {}
+_OWNER = [None]
+
+# Attachments that could not be closed yet: arrays still view them
+_STALE = []
+
+def _attach(name):
+
+    # The creating process owns and unlinks the segment. Attaching must not
+    # register it with the resource tracker, which may be shared with the parent.
+    register = resource_tracker.register
+    resource_tracker.register = lambda *args: None
+    try:
+        return shared_memory.SharedMemory(name=name)
+    finally:
+        resource_tracker.register = register
+
+def _release():
+    """Close the attachments of the previous owner (and earlier leftovers)."""
+    pending = list(_ATTACHED.values()) + _STALE
+    _ATTACHED.clear()
+    _STALE.clear()
+    for shm in pending:
+        try:
+            shm.close()
+        except BufferError:
+            _STALE.append(shm)
+
+def _attached(name, owner):
+    if owner != _OWNER[0]:
+        _release()
+        _OWNER[0] = owner
+    shm = _ATTACHED.get(name)
+    if shm is None:
+        shm = _ATTACHED[name] = _attach(name)
+    return shm
+
+class SharedArray:
+    """
+    A numpy array or torch tensor copied into a shared memory segment.
+    Pickles as (name, shape, dtype) and reattaches on first `get()`.
+    """
+
+    def __init__(self, array, owner=None):
+        self.owner = owner
+        self.is_torch = not isinstance(array, np.ndarray) and hasattr(array, 'numpy')
+        values = np.ascontiguousarray(array.numpy() if self.is_torch else array)
+
+        self._shm = shared_memory.SharedMemory(create=True, size=max(values.nbytes, 1))
+        self.name = self._shm.name
+        self.shape = values.shape
+        self.dtype = values.dtype.str
+        np.ndarray(self.shape, self.dtype, buffer=self._shm.buf)[...] = values
+
+    def __getstate__(self):
+        return {
+            'name': self.name, 'shape': self.shape, 'dtype': self.dtype, 'is_torch': self.is_torch,
+            'owner': self.owner
+        }
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._shm = None
+
+    def get(self):
+        """Zero-copy view of the shared data, as the type it was created from."""
+        shm = self._shm
+        if shm is None:
+            shm = _attached(self.name, self.owner)
+
+        values = np.ndarray(self.shape, self.dtype, buffer=shm.buf)
+        if self.is_torch:
+            import torch
+            return torch.from_numpy(values)
+        return values
+
+    def unlink(self):
+        if self._shm is not None:
+            self._shm.close()
+            self._shm.unlink()
+            self._shm = None
+
+class FoldData:
+    """
+    Handle to one fold: for every solver argument (X_train, y_train, X_test,
+    y_test), a shared base array and an optional shared index array.
+    """
+
+    def __init__(self, parts):
+        self.parts = parts
+
+    def params(self):
+        """Materialise the fold's solver arguments inside the worker."""
+        out = {}
+        for name, (base, ix) in self.parts.items():
+            values = base.get()
+            if ix is None:
+                out[name] = values
+                continue
+
+            index = ix.get()
+            if base.is_torch:
+                import torch
+                index = torch.from_numpy(index)
+            out[name] = values[index]
+        return out
+
+class FoldDatasets:
+    """
+    Owner of the shared segments for one dataset and its folds. Use as a
+    context manager, or call `close()`, to release the memory.
+
+    Parameters
+    ----------
+    X, y : np.ndarray or torch.Tensor, optional
+        Full dataset that `fold()` indexes into.
+    """
+
+    def __init__(self, X=None, y=None):
+        self.id = uuid.uuid4().hex
+        self._arrays = []
+        self.X = None if X is None else self._share(X)
+        self.y = None if y is None else self._share(y)
+
+    def _share(self, array):
+        shared = SharedArray(array, self.id)
+        self._arrays.append(shared)
+        return shared
+
+    def fold(self, train_ix, test_ix):
+        """FoldData for the rows `train_ix` / `test_ix` of the shared X, y."""
+        train_ix, test_ix = self._share(np.asarray(train_ix)), self._share(np.asarray(test_ix))
+        return FoldData({
+            'X_train': (self.X, train_ix), 'y_train': (self.y, train_ix),
+            'X_test': (self.X, test_ix), 'y_test': (self.y, test_ix)
+        })
+
+    def rows(self, ix):
+        """FoldData holding only the rows `ix` of the shared X, under 'X'."""
+        return FoldData({'X': (self.X, self._share(np.asarray(ix)))})
+
+    def split(self, X_train, y_train, X_test, y_test):
+        """FoldData for an already split train/test pair."""
+        return FoldData({
+            'X_train': (self._share(X_train), None), 'y_train': (self._share(y_train), None),
+            'X_test': (self._share(X_test), None), 'y_test': (self._share(y_test), None)
+        })
+
+    def close(self):
+        for shared in self._arrays:
+            shared.unlink()
+        self._arrays = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
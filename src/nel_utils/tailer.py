@@ -0,0 +1,219 @@
+# nel_utils/tailer.py
+#
+# Incremental tailing of solver logs that are still being written.
+#
+# A LogTailer remembers, per file, the byte offset up to which it has parsed.
+# Each `poll()` reads only what was appended since, up to the last complete
+# line; a half-written row is picked up by the next poll. The new rows are
+# folded into running aggregates:
+#
+#   stats   per (variant, generation) mean/std, as aggregator.GenerationStats
+#   runs    per run: rows, last generation, last and best RMSE, size, time
+#
+# so the cost of a poll depends on the new output, not on the log size.
+# Aggregates are kept per file: a log that shrinks (rewritten by a new run)
+# only resets its own state.
+#
+# Compressed logs (`logio.compress_log`) are finished, so they are read whole
+# once their index exists. A log compressed while it was being tailed is the
+# same file to the tailer: when every row of the plain log was already read,
+# nothing is read again.
+#
+# `plotter.make_evolution_plot` and `plotter.make_slim_evolution_plots`
+# accept a LogTailer and poll it before drawing.
+
+import glob
+import io
+import os
+import time
+
+import pandas as pd
+from .aggregator import GenerationStats, _merge
+from .logio import _codec, plain_path, read_index, read_log, resolve
+from .logstore import name_columns
+
+class _FileState:
+
+    def __init__(self, path):
+        self.path = path
+        self.offset = 0
+        self.rows = 0
+        self.stats = GenerationStats()
+        self.runs = None
+
+def _run_rows(chunk):
+    """Per-run aggregates of one chunk of named log rows."""
+    chunk = chunk.assign(
+        size=pd.to_numeric(chunk['size'], errors='coerce').astype('float64'),
+        rmse_test=pd.to_numeric(chunk['rmse_test'], errors='coerce')
+    ).sort_values('generation', kind='stable')
+    grouped = chunk.groupby('run_id', sort=False)
+
+    last = chunk.drop_duplicates('run_id', keep='last').set_index('run_id')
+    last = last[['variant', 'dataset', 'seed', 'generation', 'rmse_train', 'rmse_test', 'size']]
+    return last.assign(
+        rows=grouped.size(),
+        best_rmse_train=grouped['rmse_train'].min(),
+        best_rmse_test=grouped['rmse_test'].min(),
+        timing=grouped['timing'].sum()
+    )
+
+def _merge_runs(old, new):
+    """Combine per-run aggregates of consecutive chunks; `new` holds the later rows."""
+    if old is None:
+        return new
+
+    both = old.index.intersection(new.index)
+    if len(both):
+        prev = old.loc[both]
+        new.loc[both, 'rows'] += prev['rows']
+        new.loc[both, 'timing'] += prev['timing']
+        for col in ('best_rmse_train', 'best_rmse_test'):
+            new.loc[both, col] = new.loc[both, col].combine(prev[col], min)
+    return pd.concat([old.drop(both), new])
+
+class LogTailer:
+    """
+    Incremental reader of growing headerless log CSVs.
+
+    Parameters
+    ----------
+    paths : str or list of str
+        Log files or glob patterns (e.g. '../log/slim_*.csv'). Patterns are
+        expanded on every poll, so logs created later are picked up.
+        '_settings.csv' files are skipped. A plain path whose log was
+        compressed is read from the `.csv.zst` / `.csv.gz` file instead.
+    """
+
+    def __init__(self, paths):
+        self.patterns = [paths] if isinstance(paths, str) else list(paths)
+        self.files = {}
+        self._stats = None
+
+    def _paths(self):
+        """Log to read per plain log path; the plain file when both forms exist."""
+        paths = {}
+        for pattern in self.patterns:
+            matches = sorted(glob.glob(pattern)) if glob.has_magic(pattern) else [resolve(pattern)]
+            for path in matches:
+                if path.endswith(('_settings.csv', '.idx', '.tmp')):
+                    continue
+                key = plain_path(path)
+                if key not in paths or not _codec(path):
+                    paths[key] = path
+        return paths
+
+    def poll(self):
+        """
+        Parse the lines appended since the last poll.
+
+        Returns
+        -------
+        int
+            Number of new rows.
+        """
+        n_rows = 0
+        for key, path in self._paths().items():
+            try:
+                size = os.path.getsize(path)
+            except OSError:
+                continue
+
+            state = self.files.setdefault(key, _FileState(path))
+            if _codec(path):
+                n_rows += self._poll_compressed(key, path, size)
+                continue
+            if size < state.offset or state.path != path:
+                # Truncated or replaced: start this file over
+                state = self.files[key] = _FileState(path)
+                self._stats = None
+            if size == state.offset:
+                continue
+
+            with open(path, 'rb') as f:
+                f.seek(state.offset)
+                data = f.read(size - state.offset)
+            end = data.rfind(b'\n') + 1
+            if not end:
+                continue
+            state.offset += end
+
+            n_rows += self._update(state, pd.read_csv(io.BytesIO(data[:end]), header=None))
+
+        return n_rows
+
+    def _poll_compressed(self, key, path, size):
+        """Read a compressed log whole, unless it holds the rows already read."""
+        state = self.files[key]
+        if state.path == path and state.offset == size:
+            return 0
+
+        try:
+            rows = read_index(path)['rows']
+        except FileNotFoundError:
+            if _codec(path) != 'gzip':
+                # Still being written: compress_log writes the index last
+                return 0
+            rows = None
+        if state.path != path and state.rows == rows:
+            # Compressed from the plain log read so far
+            state.path, state.offset = path, size
+            return 0
+
+        state = self.files[key] = _FileState(path)
+        state.offset = size
+        self._stats = None
+        return self._update(state, read_log(path)) if rows != 0 else 0
+
+    def _update(self, state, chunk):
+        chunk = name_columns(chunk)
+        state.stats.update(chunk)
+        state.runs = _merge_runs(state.runs, _run_rows(chunk))
+        state.rows += len(chunk)
+        self._stats = None
+        return len(chunk)
+
+    @property
+    def stats(self):
+        """GenerationStats over every file read so far."""
+        if self._stats is None:
+            self._stats = GenerationStats()
+            for state in self.files.values():
+                if state.stats.state is not None:
+                    current = self._stats.state
+                    self._stats.state = state.stats.state if current is None else _merge(current, state.stats.state)
+        return self._stats
+
+    @property
+    def runs(self):
+        """
+        Per-run aggregates, indexed by run_id, with the plain log path under 'path'.
+
+        Columns: variant, dataset, seed, generation (last logged), rmse_train,
+        rmse_test and size at that generation, rows, best_rmse_train,
+        best_rmse_test and timing (summed seconds).
+        """
+        frames = [state.runs.assign(path=path) for path, state in self.files.items() if state.runs is not None]
+        return pd.concat(frames) if frames else pd.DataFrame()
+
+    def follow(self, interval=5.0, timeout=None):
+        """
+        Poll every `interval` seconds and yield the tailer whenever rows were added.
+
+        Stops after `timeout` seconds, or runs until the loop is broken.
+
+        Examples
+        --------
+        >>> from IPython.display import clear_output
+        >>> tailer = LogTailer('../log/slim_*.csv')
+        >>> for _ in tailer.follow(interval=10):
+        ...     clear_output(wait=True)
+        ...     make_evolution_plot(tailer, 'SLIM (live)')
+        """
+        start = time.monotonic()
+        while True:
+            if self.poll():
+                yield self
+            if timeout is not None and time.monotonic() - start >= timeout:
+                return
+            time.sleep(interval)
@@ -0,0 +1,418 @@
+# nel_utils/workqueue.py
+#
+# Shared-filesystem work queue for running grid tasks on several machines.
+#
+# The coordinator (`call_model(queue=...)`) writes one task per
+# (algorithm, config, data, seed) to a directory every node can see; workers
+# started on any node with `python -m nel_utils.workqueue <root>` pull them.
+#
+# Layout:
+#   <root>/data/<sha256>.npy          arrays, stored once by content
+#   <root>/tasks/<order>.<key>.pkl    pending tasks, claimed in name order
+#   <root>/leases/<key>.<n>.json      owner, expiry and error of attempt n
+#   <root>/results/<key>.pkl          finished results
+#   <root>/failed/<key>.json          tasks that used up their retries
+#
+# A worker claims attempt n of a task by creating its lease with O_EXCL, and
+# keeps it alive with a heartbeat while the solver runs. A lease that expires
+# (killed worker, lost node) is taken over by the next worker, which creates
+# the lease of attempt n + 1: only one claimant can, and as leases are only
+# removed with the result, the attempt count cannot be reset. A task that
+# raises is released for a retry at once. After `max_retries` retries it is
+# moved to failed/ and the coordinator raises.
+#
+# Leases compare wall clocks across nodes: keep `lease_timeout` well above
+# the clock skew. Rarely, a worker that lost its lease may still finish the
+# task; results are written atomically and a rerun of the same seeded task
+# is the same run, so the duplicate is harmless.
+
+import hashlib
+import json
+import os
+import socket
+import threading
+import time
+import traceback
+import uuid
+
+import numpy as np
+from .cache import make_key
+from .options import RunOptions
+
+class WorkQueue:
+    """
+    Coordinator and worker side of a queue rooted at a shared directory.
+
+    Parameters
+    ----------
+    root : str
+        Directory visible to the coordinator and every worker.
+    lease_timeout : float, optional
+        Seconds without a heartbeat after which a claimed task is reassigned.
+    max_retries : int, optional
+        Times a task is retried after a failed or lost attempt.
+    poll : float, optional
+        Seconds between checks while waiting for tasks or results.
+    """
+
+    def __init__(self, root, lease_timeout=60.0, max_retries=3, poll=0.5):
+        self.root = root
+        self.lease_timeout = lease_timeout
+        self.max_retries = max_retries
+        self.poll = poll
+        self._seq = 0
+        self._data = {}
+
+        for name in ('data', 'tasks', 'leases', 'results', 'failed'):
+            os.makedirs(os.path.join(root, name), exist_ok=True)
+
+        # Workers started with only the root read the coordinator's settings
+        config = os.path.join(root, 'queue.json')
+        if not os.path.exists(config):
+            _write_json(config, {'lease_timeout': lease_timeout, 'max_retries': max_retries})
+
+    @classmethod
+    def open(cls, root, poll=0.5):
+        """Queue with the settings its coordinator stored in `root`."""
+        with open(os.path.join(root, 'queue.json')) as f:
+            return cls(root, poll=poll, **json.load(f))
+
+    def _path(self, kind, name, ext):
+        return os.path.join(self.root, kind, f'{name}.{ext}')
+
+    # Coordinator side
+
+    def share(self, array):
+        """
+        Store an array once, by content.
+
+        Returns
+        -------
+        tuple
+            (sha256, is_torch), the reference tasks carry instead of the data.
+        """
+        is_torch = not isinstance(array, np.ndarray) and hasattr(array, 'numpy')
+        values = np.ascontiguousarray(array.numpy() if is_torch else array)
+
+        digest = hashlib.sha256(values.dtype.str.encode() + str(values.shape).encode())
+        digest.update(values.data)
+        ref = digest.hexdigest()
+
+        path = self._path('data', ref, 'npy')
+        if not os.path.exists(path):
+            tmp = f'{path}.{uuid.uuid4().hex}.tmp'
+            with open(tmp, 'wb') as f:
+                np.save(f, values)
+            os.replace(tmp, path)
+        return ref, is_torch
+
+    def pending(self):
+        """Keys of the queued tasks, for a batch of `submit` calls."""
+        names = os.listdir(os.path.join(self.root, 'tasks'))
+        return {name.split('.')[1] for name in names if not name.endswith('.tmp')}
+
+    def submit(self, model_key, fixed_params, dynamic_params, seed, data, options=None, splits=None, pending=None):
+        """
+        Queue one run.
+
+        Parameters
+        ----------
+        model_key : str
+            Key of `caller.model_dict`.
+        fixed_params, dynamic_params : dict
+            Solver parameters, without the data arrays.
+        seed : int
+        data : dict
+            Solver argument (e.g. 'X_train') -> (reference from `share`, row
+            indices or None).
+        options : RunOptions, optional
+            Per-run options. The worker applies `set_max_depth`, `retention`
+            (a 'disk' spill_dir must be shared too) and `budget`; the cache
+            stays with the coordinator.
+        splits : dict, optional
+            Split name -> solver argument to compute semantics on.
+        pending : set, optional
+            Result of `pending()`, shared by a batch of submissions so the
+            tasks directory is listed once; the new key is added to it.
+
+        Returns
+        -------
+        str
+            Task key: a hash of the run and of the data contents.
+        """
+        import cloudpickle
+
+        options = (options or RunOptions()).task().replace(cache=None)
+        refs = {name: (ref, None if ix is None else np.asarray(ix).tolist()) for name, (ref, ix) in data.items()}
+        key = make_key(model_key, fixed_params, dynamic_params, refs, seed, options.set_max_depth)
+        if os.path.exists(self._path('results', key, 'pkl')):
+            return key
+        if pending is None:
+            pending = self.pending()
+        if key in pending:
+            return key
+
+        # Name order is claim order: submission order of this coordinator
+        self._seq += 1
+        name = f'{time.time_ns():020d}{self._seq:06d}.{key}'
+        path = self._path('tasks', name, 'pkl')
+        with open(path + '.tmp', 'wb') as f:
+            cloudpickle.dump({
+                'key': key, 'model_key': model_key, 'fixed_params': fixed_params,
+                'dynamic_params': dynamic_params, 'seed': seed, 'data': data,
+                'options': options, 'splits': splits
+            }, f)
+        os.replace(path + '.tmp', path)
+        pending.add(key)
+        return key
+
+    def result(self, key):
+        """Finished result of task `key`, or None while it is pending."""
+        import cloudpickle
+
+        failed = self._path('failed', key, 'json')
+        if os.path.exists(failed):
+            with open(failed) as f:
+                raise RuntimeError(f"Task {key} failed after {self.max_retries} retries:\n{json.load(f)['error']}")
+
+        path = self._path('results', key, 'pkl')
+        if not os.path.exists(path):
+            return None
+        with open(path, 'rb') as f:
+            return cloudpickle.load(f)
+
+    def results(self, keys, timeout=None):
+        """Yield the results of `keys` in order, waiting for each."""
+        start = time.monotonic()
+        for key in keys:
+            while (res := self.result(key)) is None:
+                if timeout is not None and time.monotonic() - start > timeout:
+                    raise TimeoutError(f'Task {key} not finished after {timeout} s.')
+                time.sleep(self.poll)
+            yield res
+
+    def status(self):
+        """Number of pending, leased, finished and failed tasks."""
+        names = lambda kind: [name for name in os.listdir(os.path.join(self.root, kind)) if not name.endswith('.tmp')]
+        tasks = {name.split('.')[1] for name in names('tasks')}
+        leased = tasks & {name.split('.')[0] for name in names('leases')}
+        return {
+            'pending': len(tasks - leased), 'leased': len(leased),
+            'done': len(names('results')), 'failed': len(names('failed'))
+        }
+
+    def stop(self):
+        """Ask every worker to exit once its current task is done."""
+        open(os.path.join(self.root, 'stop'), 'w').close()
+
+    # Worker side
+
+    def _lease(self, key, worker, attempt, error=None):
+        expires = 0 if error else time.time() + self.lease_timeout
+        return {'worker': worker, 'expires': expires, 'attempt': attempt, 'error': error}
+
+    def _lease_path(self, key, attempt):
+        return self._path('leases', f'{key}.{attempt}', 'json')
+
+    def _leases(self):
+        """Task key -> latest attempt with a lease."""
+        latest = {}
+        for name in os.listdir(os.path.join(self.root, 'leases')):
+            if name.endswith('.tmp'):
+                continue
+            key, attempt, _ = name.split('.')
+            latest[key] = max(latest.get(key, 0), int(attempt))
+        return latest
+
+    def _drop(self, task_path, key):
+        """Remove a finished or failed task and its leases."""
+        _remove(task_path)
+        for attempt in range(1, self.max_retries + 2):
+            _remove(self._lease_path(key, attempt))
+
+    def _claim(self, worker):
+        """Lease the first available task: (task file, lease), or None."""
+        leases = self._leases()
+        for name in sorted(os.listdir(os.path.join(self.root, 'tasks'))):
+            if name.endswith('.tmp'):
+                continue
+            key = name.split('.')[1]
+            task_path = os.path.join(self.root, 'tasks', name)
+            if os.path.exists(self._path('results', key, 'pkl')):
+                self._drop(task_path, key)
+                continue
+
+            attempt = leases.get(key, 0) + 1
+            if attempt > 1:
+                try:
+                    with open(self._lease_path(key, attempt - 1)) as f:
+                        held = json.load(f)
+                except (OSError, ValueError):
+                    continue
+                if held['expires'] > time.time():
+                    continue
+
+                # Expired or released: retried under the next attempt's lease
+                if attempt > self.max_retries + 1:
+                    error = held.get('error') or f"lease of worker {held['worker']} expired"
+                    _write_json(self._path('failed', key, 'json'), {'key': key, 'error': error})
+                    self._drop(task_path, key)
+                    continue
+
+            lease = self._lease_path(key, attempt)
+            try:
+                fd = os.open(lease, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+            except FileExistsError:
+                continue
+            with os.fdopen(fd, 'w') as f:
+                json.dump(self._lease(key, worker, attempt), f)
+            return task_path, lease
+
+        return None
+
+    def _heartbeat(self, lease, done):
+        """Renew `lease` until `done` is set or the next attempt has started."""
+        key, attempt = os.path.basename(lease).split('.')[:2]
+        while not done.wait(self.lease_timeout / 3):
+            if os.path.exists(self._lease_path(key, int(attempt) + 1)):
+                return
+            try:
+                with open(lease) as f:
+                    held = json.load(f)
+            except (OSError, ValueError):
+                return
+            _write_json(lease, {**held, 'expires': time.time() + self.lease_timeout})
+
+    def _rows(self, ref, ix):
+
+        name, is_torch = ref
+        if name not in self._data:
+            self._data[name] = np.load(self._path('data', name, 'npy'), mmap_mode='r')
+        values = self._data[name] if ix is None else self._data[name][np.asarray(ix)]
+        if is_torch:
+            import torch
+            return torch.from_numpy(np.array(values))
+        return values
+
+    def _run(self, task_path, lease, worker):
+        import cloudpickle
+        from .caller import _fit_config
+
+        with open(task_path, 'rb') as f:
+            task = cloudpickle.load(f)
+        key = task['key']
+
+        done = threading.Event()
+        beat = threading.Thread(target=self._heartbeat, args=(lease, done), daemon=True)
+        beat.start()
+        try:
+            fixed_params = {**task['fixed_params'], **{
+                name: self._rows(ref, ix) for name, (ref, ix) in task['data'].items()
+            }}
+            res = _fit_config(
+                task['model_key'], fixed_params, task['dynamic_params'], task['seed'], task['options'], key,
+                splits=task['splits']
+            )
+            res['profile']['worker'] = worker
+        except Exception:
+            done.set()
+            try:
+                with open(lease) as f:
+                    held = json.load(f)
+            except (OSError, ValueError):
+                return False
+            # Released at once for a retry, with the error for the failure report
+            _write_json(lease, self._lease(key, worker, held['attempt'], traceback.format_exc()))
+            return False
+        finally:
+            done.set()
+            beat.join()
+
+        path = self._path('results', key, 'pkl')
+        with open(f'{path}.{worker}.tmp', 'wb') as f:
+            cloudpickle.dump(res, f)
+        os.replace(f'{path}.{worker}.tmp', path)
+        self._drop(task_path, key)
+        return True
+
+    def work(self, worker=None, idle_timeout=None, max_tasks=None):
+        """
+        Worker loop: claim, run and report tasks until stopped.
+
+        Parameters
+        ----------
+        worker : str, optional
+            Worker name in leases and profiles; host and pid by default.
+        idle_timeout : float, optional
+            Exit after this many seconds without a task.
+        max_tasks : int, optional
+            Exit after this many tasks.
+
+        Returns
+        -------
+        int
+            Tasks completed.
+        """
+        worker = worker or f'{socket.gethostname()}-{os.getpid()}'
+        n_done, idle = 0, time.monotonic()
+        while not os.path.exists(os.path.join(self.root, 'stop')):
+            claimed = self._claim(worker)
+            if claimed is None:
+                if idle_timeout is not None and time.monotonic() - idle > idle_timeout:
+                    break
+                time.sleep(self.poll)
+                continue
+
+            n_done += self._run(*claimed, worker)
+            idle = time.monotonic()
+            if max_tasks is not None and n_done >= max_tasks:
+                break
+        return n_done
+
+def _write_json(path, obj):
+    tmp = f'{path}.{uuid.uuid4().hex}.tmp'
+    with open(tmp, 'w') as f:
+        json.dump(obj, f)
+    os.replace(tmp, path)
+
+def _remove(path):
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+def _work(root, worker, idle_timeout):
+    WorkQueue.open(root).work(worker, idle_timeout)
+
+def start_workers(root, n_workers, idle_timeout=None):
+    """
+    Start `n_workers` local worker processes, e.g. to stand in for nodes in tests.
+
+    Returns
+    -------
+    list of multiprocessing.Process
+        Already started; stop them with `WorkQueue.stop()` or `terminate()`.
+        They are not daemons, so they can start Budget run processes, and the
+        interpreter waits for them on exit.
+    """
+    import multiprocessing as mp
+
+    _remove(os.path.join(root, 'stop'))
+    ctx = mp.get_context('spawn')
+    procs = [
+        ctx.Process(target=_work, args=(root, f'{socket.gethostname()}-local{i}', idle_timeout))
+        for i in range(n_workers)
+    ]
+    for proc in procs:
+        proc.start()
+    return procs
+
+if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Run a nel_utils work queue worker.')
+    parser.add_argument('root', help='Queue directory shared with the coordinator.')
+    parser.add_argument('--idle-timeout', type=float, default=None, help='Exit after this many idle seconds.')
+    args = parser.parse_args()
+
+    print(f'{WorkQueue.open(args.root).work(idle_timeout=args.idle_timeout)} tasks done')
@@ -0,0 +1,47 @@
+import csv
+
+import numpy as np
+import pytest
+
+@pytest.fixture
+def regression_data():
+    """Small synthetic train/test split as torch tensors; skips without the solvers."""
+    pytest.importorskip('slim_gsgp')
+    torch = pytest.importorskip('torch')
+
+    rng = np.random.default_rng(0)
+    X = rng.normal(size=(60, 3))
+    y = 2 * X[:, 0] - X[:, 1] * X[:, 2] + rng.normal(scale=0.1, size=60)
+    X, y = torch.tensor(X, dtype=torch.float32), torch.tensor(y, dtype=torch.float32)
+    return {'X_train': X[:40], 'y_train': y[:40], 'X_test': X[40:], 'y_test': y[40:]}
+
+@pytest.fixture
+def fixed_params(regression_data, tmp_path):
+    """Fixed solver parameters of a short GP run logging to `tmp_path`."""
+    return {
+        'algorithm': 'gp', **regression_data, 'n_iter': 3, 'init_depth': 2, 'dataset_name': 'synthetic',
+        'log_path': str(tmp_path / 'log' / '_gp_0.csv'), 'verbose': 0
+    }
+
+@pytest.fixture
+def make_log():
+    """Writer of synthetic headerless solver logs; GSGP sizes exceed int64."""
+
+    def write(path, n_runs=3, n_generations=5, seed=0, gsgp=False, variant='StandardGP'):
+        rng = np.random.default_rng(seed)
+        rows = []
+        for run in range(n_runs):
+            run_id = f'{seed:04d}{run:04d}-0000-0000-0000-000000000000'
+            size = 10**30 + run if gsgp else 10 + run
+            for generation in range(n_generations):
+                rmse_train = 10.0 / (generation + 1) + rng.random()
+                rows.append([
+                    variant, run_id, 'synthetic', seed, generation, rmse_train, rng.random() / 100,
+                    float(10 * size), rmse_train + rng.random(), size, 1
+                ])
+                size = size * 2 if gsgp else size + 1
+        with open(path, 'a', newline='') as f:
+            csv.writer(f).writerows(rows)
+        return rows
+
+    return write
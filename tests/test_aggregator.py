@@ -0,0 +1,52 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from nel_utils.aggregator import GenerationStats
+from nel_utils.logio import compress_log
+from nel_utils.logstore import LogStore, name_columns
+
+@pytest.fixture
+def logs(tmp_path, make_log):
+    paths = [str(tmp_path / f'_gp_{cv}.csv') for cv in range(2)]
+    for cv, path in enumerate(paths):
+        make_log(path, n_runs=4, n_generations=6, seed=cv)
+        make_log(path, n_runs=2, n_generations=6, seed=cv + 10, variant='SLIM+SIG2')
+    return paths
+
+def expected(paths, metric, variant=None):
+    df = name_columns(pd.concat([pd.read_csv(path, header=None) for path in paths]))
+    if variant is not None:
+        df = df[df['variant'] == variant]
+    df = df.assign(size=df['size'].astype('float64'), size_log=np.log10(df['size'].astype('float64') + 1))
+    agg = df.groupby('generation')[metric].agg(['mean', 'std']).reset_index()
+    return agg.rename(columns={'generation': 'x'})
+
+@pytest.mark.parametrize('metric', ['rmse_train', 'rmse_test', 'size', 'size_log'])
+def test_chunked_stats_match_a_groupby(logs, metric):
+    stats = GenerationStats.from_csv(logs, chunksize=7)
+    for variant in (None, 'StandardGP', 'SLIM+SIG2'):
+        pd.testing.assert_frame_equal(stats.frame(metric, variant), expected(logs, metric, variant), check_dtype=False)
+
+def test_compressed_logs_and_store_agree(logs, tmp_path):
+    reference = GenerationStats.from_csv(logs).frame('rmse_test')
+
+    compressed = [compress_log(path, 'gzip', block_size=256) for path in logs]
+    pd.testing.assert_frame_equal(GenerationStats.from_csv(compressed, chunksize=5).frame('rmse_test'), reference)
+
+    pytest.importorskip('pyarrow')
+    store = LogStore(str(tmp_path / 'store'))
+    for cv, path in enumerate(logs):
+        store.ingest(path, 'gp', cv)
+    # The store keeps generations as int32
+    from_store = GenerationStats.from_store(store, algorithm='gp').frame('rmse_test')
+    pd.testing.assert_frame_equal(from_store, reference, check_dtype=False)
+    one_fold = GenerationStats.from_store(str(tmp_path / 'store'), cv=1).frame('rmse_test')
+    pd.testing.assert_frame_equal(one_fold, GenerationStats.from_csv(logs[1]).frame('rmse_test'), check_dtype=False)
+
+def test_single_run_has_no_std(tmp_path, make_log):
+    path = str(tmp_path / '_gp_0.csv')
+    make_log(path, n_runs=1, n_generations=3, gsgp=True)
+    agg = GenerationStats.from_csv(path).frame('size_log')
+    assert agg['x'].tolist() == [0, 1, 2] and agg['std'].isna().all()
+    assert agg['mean'].tolist() == pytest.approx([30.0, 30.0 + np.log10(2), 30.0 + np.log10(4)])
@@ -0,0 +1,76 @@
+import csv
+import math
+import os
+import signal
+import time
+import uuid
+
+import pytest
+
+from nel_utils.budget import Budget, censored, score
+
+def growing_run(log_path, n_generations, delay=0.02):
+    """Stand-in for a GSGP run: logs a doubling size per generation under its uuid1."""
+    run_id = uuid.uuid1()
+    size = 81
+    for generation in range(n_generations):
+        with open(log_path, 'a', newline='') as f:
+            csv.writer(f).writerow([
+                'StandardGSGP', run_id, 'ds', 0, generation, 10.0 - generation, 0.01, 1.0,
+                11.0 - generation, size, 1
+            ])
+        size *= 2
+        time.sleep(delay)
+    return 'done'
+
+def test_within_budget_returns_value():
+    value, run_id, stopped = Budget(wall=60, poll=0.05).run(lambda: 42)
+    assert value == 42 and stopped is None
+    assert uuid.UUID(run_id)
+
+def test_size_limit_censors_with_last_generation(tmp_path):
+    log_path = str(tmp_path / 'log.csv')
+    value, run_id, stopped = Budget(size=81 * 2**4, poll=0.01).run(
+        lambda: growing_run(log_path, 200), log_path
+    )
+    assert value is None
+    assert stopped['reason'] == 'size' and stopped['value'] > stopped['limit']
+    assert stopped['generation'] == stopped['last']['generation'] >= 5
+    assert stopped['last']['rmse_test'] == 11.0 - stopped['generation']
+
+    # The run was stopped early, and its rows are whole and carry the run id
+    with open(log_path) as f:
+        rows = list(csv.reader(f))
+    assert {row[1] for row in rows} == {run_id}
+    assert all(len(row) == 11 for row in rows) and len(rows) < 200
+
+def test_wall_limit_censors():
+    value, _, stopped = Budget(wall=0.2, poll=0.02, grace=1).run(lambda: time.sleep(30))
+    assert value is None and stopped['reason'] == 'wall'
+    assert stopped['generation'] is None
+
+def test_sigkill_after_grace():
+    def ignore_term():
+        signal.signal(signal.SIGTERM, signal.SIG_IGN)
+        time.sleep(30)
+
+    start = time.monotonic()
+    _, _, stopped = Budget(wall=0.1, poll=0.02, grace=0.3).run(ignore_term)
+    assert stopped['reason'] == 'wall'
+    assert time.monotonic() - start < 10
+
+def test_errors_are_raised_not_censored():
+    budget = Budget(wall=60, poll=0.05)
+    with pytest.raises(RuntimeError, match='ZeroDivisionError'):
+        budget.run(lambda: 1 / 0)
+    with pytest.raises(RuntimeError, match='without a result'):
+        budget.run(lambda: os.kill(os.getpid(), signal.SIGKILL))
+
+    # The launcher is still usable afterwards
+    assert budget.run(lambda: 'ok')[0] == 'ok'
+
+def test_censored_results_rank_last():
+    done = {'rmse_test': 3.0}
+    stopped = {'rmse_test': 1.0, 'censored': {'reason': 'wall'}}
+    assert not censored(done) and censored(stopped)
+    assert score(done) == 3.0 and math.isinf(score(stopped))
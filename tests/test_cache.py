@@ -0,0 +1,41 @@
+import numpy as np
+
+from nel_utils import caller
+from nel_utils.cache import ResultCache, fingerprint, make_key
+
+FIXED = {'init_depth': 2, 'n_iter': 3, 'log_path': 'a.csv'}
+
+def test_key_depends_on_effective_params():
+    key = make_key('gp', FIXED, {'pop_size': 10}, fold=[0, 1], seed=0)
+    assert key == make_key('gp', {**FIXED, 'log_path': 'b.csv'}, {'pop_size': 10}, fold=[0, 1], seed=0)
+    assert key != make_key('gp', FIXED, {'pop_size': 20}, fold=[0, 1], seed=0)
+    assert key != make_key('gp', FIXED, {'pop_size': 10}, fold=[0, 1], seed=1)
+    assert key != make_key('gp', FIXED, {'pop_size': 10}, fold=[0, 1], seed=0, set_max_depth=True)
+
+def test_key_without_fold_depends_on_data():
+    X = np.arange(12.0).reshape(4, 3)
+    params = {**FIXED, 'X_train': X}
+    key = make_key('gp', params, {'pop_size': 10}, seed=0)
+    assert key == make_key('gp', {**FIXED, 'X_train': X.copy()}, {'pop_size': 10}, seed=0)
+    assert key != make_key('gp', {**FIXED, 'X_train': X + 1}, {'pop_size': 10}, seed=0)
+    assert fingerprint(FIXED) is None
+
+def test_call_model_hits_and_misses(fixed_params, tmp_path):
+    cache = ResultCache(str(tmp_path / 'cache'))
+    grid = {'pop_size': [5, 10]}
+
+    first = caller.call_model(fixed_params, grid, seed=0, cache=cache)
+    assert not any(res['profile'].get('cached') for res in first)
+
+    again = caller.call_model(fixed_params, grid, seed=0, cache=cache)
+    assert all(res['profile'].get('cached') for res in again)
+    assert [res['rmse_test'] for res in again] == [res['rmse_test'] for res in first]
+
+    # max_depth changes the run, so it is trained again
+    deeper = caller.call_model(fixed_params, grid, seed=0, cache=cache, set_max_depth=True)
+    assert not any(res['profile'].get('cached') for res in deeper)
+
+    # So does the data
+    shifted = {**fixed_params, 'y_train': fixed_params['y_train'] + 1}
+    other = caller.call_model(shifted, grid, seed=0, cache=cache)
+    assert not any(res['profile'].get('cached') for res in other)
@@ -0,0 +1,134 @@
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pytest
+
+from nel_utils import caller
+from nel_utils.cache import ResultCache, fingerprint, make_key
+from nel_utils.hooks import Hooks
+from nel_utils.planner import expand
+from nel_utils.retention import Retention, load_model
+
+GRID = {'pop_size': [5, 10], 'p_xo': [0.5, 0.8]}
+
+def summary(results):
+    return [(res['dynamic_params'], res['rmse_train'], res['rmse_test'], res['size']) for res in results]
+
+def test_parallel_matches_serial(fixed_params, tmp_path):
+    serial = caller.call_model(fixed_params, GRID, seed=3)
+    parallel = caller.call_model(
+        {**fixed_params, 'log_path': str(tmp_path / 'parallel' / '_gp_0.csv')}, GRID, seed=3, n_jobs=2
+    )
+    assert summary(parallel) == summary(serial)
+    assert len({res['run_id'] for res in parallel}) == len(parallel)
+
+def test_top_k_keeps_best_models(fixed_params):
+    results = caller.call_model(fixed_params, GRID, seed=3, retention=Retention('top_k', top_k=2))
+    kept = [res for res in results if res['model'] is not None]
+    assert len(kept) == 2
+    best = sorted(res['rmse_test'] for res in results)[:2]
+    assert sorted(res['rmse_test'] for res in kept) == best
+
+def test_disk_spill_round_trip(fixed_params, tmp_path):
+    spill_dir = str(tmp_path / 'models')
+    results = caller.call_model(fixed_params, GRID, seed=3, retention=Retention('disk', spill_dir=spill_dir))
+    reference = caller.call_model(fixed_params, GRID, seed=3)
+
+    for res, ref in zip(results, reference):
+        assert res['model'] is None and os.path.exists(res['model_path'])
+        model = load_model(res)
+        assert model.fitness.item() == pytest.approx(ref['rmse_train'])
+        assert model.test_fitness.item() == pytest.approx(ref['rmse_test'])
+
+    with pytest.raises(ValueError):
+        Retention('disk')
+
+def test_imap_consumes_tasks_as_they_finish():
+    consumed = []
+
+    def tasks():
+        for i in range(50):
+            consumed.append(i)
+            yield i, (i,)
+
+    with ThreadPoolExecutor(2) as executor:
+        results = caller._imap(executor, lambda x: 2 * x, tasks(), window=4)
+        first = next(results)
+        assert len(consumed) <= 5
+        done = [first, *results]
+
+    assert sorted(done) == [(i, 2 * i) for i in range(50)]
+
+def test_cached_grid_is_returned_in_grid_order(tmp_path):
+    rng = np.random.default_rng(0)
+    data = {'X_train': rng.normal(size=(8, 2)), 'y_train': rng.normal(size=8)}
+    fixed = {'n_iter': 3, **data}
+    grid = {'pop_size': [5, 10, 20], 'p_xo': [0.5, 0.8]}
+
+    # Every point is already cached: no solver is called
+    cache = ResultCache(str(tmp_path / 'cache'))
+    for dynamic_params in expand(grid):
+        key = make_key('gp', fixed, dynamic_params, seed=1, data=fingerprint(fixed))
+        cache.put(key, {
+            'model': None, 'rmse_train': 1.0, 'rmse_test': dynamic_params['pop_size'] * dynamic_params['p_xo'],
+            'size': 3, 'dynamic_params': dynamic_params, 'run_id': str(dynamic_params)
+        })
+
+    hooks = Hooks()
+    runs = []
+    hooks.on('run_end', runs.append)
+    results = caller.call_model({'algorithm': 'gp', **fixed}, grid, seed=1, cache=cache, hooks=hooks)
+
+    assert [res['dynamic_params'] for res in results] == list(expand(grid))
+    assert all(res['profile']['cached'] for res in results)
+    assert runs[0]['n_configs'] == 6
+
+def cached_rungs(cache, fixed, rungs, seed=1):
+    """Store results for (n_iter, dynamic_params, rmse_test) triples, as if trained earlier."""
+    for n_iter, dynamic_params, rmse_test in rungs:
+        res = {
+            'model': None, 'rmse_train': rmse_test, 'rmse_test': rmse_test, 'size': 3,
+            'dynamic_params': dynamic_params, 'run_id': f'{dynamic_params}-{n_iter}'
+        }
+        if rmse_test is None:
+            res.update({'rmse_test': float('nan'), 'censored': {'reason': 'wall', 'limit': 1, 'value': 2}})
+        params = {**fixed, 'n_iter': n_iter}
+        cache.put(make_key('gp', params, dynamic_params, seed=seed, data=fingerprint(params)), res)
+
+def test_halving_promotes_the_best_third(tmp_path):
+    rng = np.random.default_rng(0)
+    fixed = {'n_iter': 9, 'X_train': rng.normal(size=(8, 2)), 'y_train': rng.normal(size=8)}
+    grid = {'pop_size': [5, 10, 20], 'p_xo': [0.2, 0.5, 0.8]}
+    points = list(expand(grid))
+
+    # Rung 1: point 4 is best, point 0 was stopped by its budget; rung 3: 4 beats 7 and 1
+    cache = ResultCache(str(tmp_path / 'cache'))
+    first = [None, 2.0, 5.0, 6.0, 1.0, 7.0, 8.0, 1.5, 9.0]
+    cached_rungs(cache, fixed, [(1, point, rmse) for point, rmse in zip(points, first)])
+    cached_rungs(cache, fixed, [(3, points[1], 1.2), (3, points[4], 0.5), (3, points[7], 0.9), (9, points[4], 0.4)])
+
+    hooks = Hooks()
+    rungs = []
+    hooks.on('config_end', lambda info: rungs.append((info['n_iter'], info['config'])))
+    results = caller.call_model(
+        {'algorithm': 'gp', **fixed}, grid, seed=1, search='halving', min_iter=1, eta=3, cache=cache, hooks=hooks
+    )
+
+    assert [res['n_iter'] for res in results] == [1, 3, 1, 1, 9, 1, 1, 3, 1]
+    assert [res['dynamic_params'] for res in results] == points
+    assert results[4]['rmse_test'] == 0.4 and results[7]['rmse_test'] == 0.9
+    assert rungs == [(1, i) for i in range(9)] + [(3, 1), (3, 4), (3, 7), (9, 4)]
+
+def test_halving_needs_n_iter():
+    with pytest.raises(ValueError, match='n_iter'):
+        caller.call_model({'algorithm': 'gp'}, GRID, seed=1, search='halving')
+
+def test_halving_reruns_survivors(fixed_params):
+    fixed_params = {**fixed_params, 'n_iter': 6}
+    results = caller.call_model(fixed_params, GRID, seed=3, search='halving', min_iter=2, eta=2)
+
+    # 4 points at 2 generations, the best 2 at 4, the best of those at 6
+    assert sorted(res['n_iter'] for res in results) == [2, 2, 4, 6]
+    assert [res['dynamic_params'] for res in results] == list(expand(GRID))
+    assert len({res['run_id'] for res in results}) == 4
@@ -0,0 +1,27 @@
+import numpy as np
+import pytest
+
+from nel_utils import caller
+from nel_utils.compiler import compile_model, predict_all
+
+@pytest.mark.parametrize('algorithm, extra', [
+    ('gp', {}),
+    ('gsgp', {'reconstruct': True}),
+    ('slim', {'slim_version': 'SLIM+SIG2'}),
+    ('slim', {'slim_version': 'SLIM*ABS'})
+])
+def test_compiled_predictions_match_solver(fixed_params, algorithm, extra):
+    params = {**fixed_params, 'algorithm': algorithm, 'n_iter': 5, **extra}
+    model = caller.call_model(params, {'pop_size': [10]}, seed=1)[0]['model']
+    X = params['X_test']
+
+    program = compile_model(model)
+    expected = model.predict(X)
+    np.testing.assert_allclose(program.predict(X).numpy(), expected.numpy(), rtol=1e-5, atol=1e-5)
+    np.testing.assert_allclose(
+        predict_all([program, program], X, chunk_size=7)[1].numpy(), expected.numpy(), rtol=1e-5, atol=1e-5
+    )
+
+def test_compile_rejects_other_objects():
+    with pytest.raises(TypeError):
+        compile_model(object())
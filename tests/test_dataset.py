@@ -0,0 +1,63 @@
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from nel_utils import dataset
+from nel_utils.dataset import load_dataset
+from nel_utils.imputer import knn_impute
+
+READ = {'index_col': 'tag'}
+
+@pytest.fixture
+def source(tmp_path):
+    rng = np.random.default_rng(0)
+    values = rng.normal(size=(30, 4))
+    values[rng.random(values.shape) < 0.1] = np.nan
+    index = pd.Index([f'T{i}' for i in range(30)], name='tag')
+    df = pd.DataFrame(values, columns=['a', 'b', 'target', 'c'], index=index)
+    path = str(tmp_path / 'birds.csv')
+    df.to_csv(path)
+    return path
+
+def test_prepared_once_and_memory_mapped(source, tmp_path, monkeypatch):
+    cache_dir = str(tmp_path / 'prepared')
+    X, y, df = load_dataset(source, cache_dir, read_kwargs=READ, as_torch=False, return_frame=True)
+
+    expected = knn_impute(pd.read_csv(source, **READ), n_neighbors=5)
+    np.testing.assert_allclose(df.to_numpy(), expected.to_numpy(), rtol=1e-6)
+    assert list(df.columns) == ['a', 'b', 'target', 'c'] and df.index.name == 'tag' and df.index[0] == 'T0'
+    np.testing.assert_allclose(y, expected['target'].to_numpy(), rtol=1e-6)
+    assert X.shape == (30, 3) and X.dtype == np.float32 and np.isnan(X).sum() == 0
+
+    # The second call only reads the cache entry, as copy-on-write maps
+    monkeypatch.setattr(dataset, '_prepare', lambda *args: pytest.fail('prepared twice'))
+    X2, y2 = load_dataset(source, cache_dir, read_kwargs=READ, as_torch=False)
+    assert isinstance(X2, np.memmap) and np.array_equal(X2, X)
+    X2[0, 0] = 1e6
+    assert load_dataset(source, cache_dir, read_kwargs=READ, as_torch=False)[0][0, 0] != 1e6
+    assert len(os.listdir(cache_dir)) == 1
+
+def test_changes_invalidate_the_entry(source, tmp_path):
+    cache_dir = str(tmp_path / 'prepared')
+    load_dataset(source, cache_dir, read_kwargs=READ, as_torch=False)
+
+    # Other parameters, then other contents: new entries
+    _, y = load_dataset(source, cache_dir, target='a', n_neighbors=0, read_kwargs=READ, as_torch=False)
+    assert np.isnan(y).any()
+    with open(source, 'a') as f:
+        f.write('T30,1,2,3,4\n')
+    X, _ = load_dataset(source, cache_dir, read_kwargs=READ, as_torch=False)
+    assert len(X) == 31 and len(os.listdir(cache_dir)) == 3
+
+def test_unsupported_files_are_rejected(tmp_path):
+    path = tmp_path / 'data.json'
+    path.write_text('{}')
+    with pytest.raises(ValueError, match='.json'):
+        load_dataset(str(path), str(tmp_path / 'prepared'))
+
+def test_tensors_share_the_map(source, tmp_path):
+    torch = pytest.importorskip('torch')
+    X, y = load_dataset(source, str(tmp_path / 'prepared'), read_kwargs=READ)
+    assert isinstance(X, torch.Tensor) and X.dtype == torch.float32 and y.shape == (30,)
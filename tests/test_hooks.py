@@ -0,0 +1,82 @@
+import pandas as pd
+import pytest
+
+from nel_utils import caller
+from nel_utils.hooks import Hooks, TimingCollector, measure
+
+def test_measure_nested_peaks():
+    with measure(trace_memory=True) as outer:
+        with measure() as inner:
+            block = bytearray(4 << 20)
+        del block
+    assert inner['peak_mem'] >= 4 << 20
+    assert outer['peak_mem'] >= inner['peak_mem']
+    assert outer['wall'] >= inner['wall'] >= 0 and outer['cpu'] >= 0
+
+    with measure() as span:
+        pass
+    assert span['peak_mem'] is None
+
+def test_events_carry_fold_context():
+    hooks = Hooks()
+    events = []
+    for event in ('config_start', 'config_end', 'fold_start', 'fold_end', 'run_end'):
+        hooks.on(event, events.append)
+
+    with hooks.run(algorithm='gp'):
+        with hooks.fold(1, outer=0):
+            # call_model's own run scope, nested in nested_cv's
+            with hooks.run(algorithm='gp'):
+                hooks.emit('config_start', config=0)
+        hooks.emit('config_end', config=0, wall=1.0, cpu=1.0, peak_mem=None)
+
+    assert [info['event'] for info in events] == ['fold_start', 'config_start', 'fold_end', 'config_end', 'run_end']
+    assert events[1]['fold'] == 1 and 'fold' not in events[3]
+    assert events[2]['outer'] == 0 and events[2]['wall'] >= 0
+    assert events[-1]['algorithm'] == 'gp'
+
+    with pytest.raises(ValueError, match='config_end'):
+        hooks.on('config_done', print)
+
+def test_timing_collector_flags_slow_configs(tmp_path):
+    hooks = Hooks()
+    timings = TimingCollector(str(tmp_path / 'timings.csv')).attach(hooks)
+
+    with hooks.run():
+        for config, wall in enumerate([1.0, 1.1, 0.9, 1.0, 8.0]):
+            hooks.emit(
+                'config_end', fold=0, config=config, n_iter=10, wall=wall, cpu=wall, peak_mem=None,
+                phases={'fit': wall * 0.9}, dynamic_params={'pop_size': 100 if config == 4 else 10}
+            )
+        hooks.emit('config_end', fold=0, config=5, cached=True, wall=50.0, cpu=0.0, peak_mem=None,
+                   dynamic_params={'pop_size': 10})
+        hooks.emit('fold_end', fold=0, wall=12.0, cpu=12.0, peak_mem=None)
+
+    table = timings.table()
+    assert table['slow'].tolist() == [False, False, False, False, True, False, False]
+    assert table['kind'].tolist() == ['config'] * 6 + ['fold']
+    assert table.loc[4, 'phase_fit'] == pytest.approx(7.2)
+    written = pd.read_csv(tmp_path / 'timings.csv')
+    assert list(written.columns) == list(table.columns) and written['slow'].tolist() == table['slow'].tolist()
+
+    budget = timings.budget('pop_size')
+    assert budget.index.tolist() == [100, 10] and budget['n'].tolist() == [1, 4]
+    assert budget['share'].sum() == pytest.approx(1.0)
+
+    # Near-identical runs are never flagged
+    collector = TimingCollector()
+    for config, wall in enumerate([1.0, 1.0, 1.0, 1.01]):
+        collector._record({'event': 'config_end', 'config': config, 'wall': wall, 'cpu': wall, 'peak_mem': None})
+    assert not collector.table()['slow'].any()
+
+def test_call_model_reports_every_config(fixed_params):
+    hooks = Hooks(trace_memory=True)
+    timings = TimingCollector().attach(hooks)
+    grid = {'pop_size': [5, 10], 'p_xo': [0.5, 0.8]}
+    results = caller.call_model(fixed_params, grid, seed=0, hooks=hooks)
+
+    table = timings.table()
+    assert table['config'].tolist() == [0, 1, 2, 3] and (table['n_iter'] == fixed_params['n_iter']).all()
+    assert {'phase_data', 'phase_fit', 'phase_extract', 'phase_persist'} <= set(table.columns)
+    assert all(res['profile']['peak_mem'] is not None for res in results)
+    assert (table['phase_fit'] <= table['wall']).all()
@@ -0,0 +1,47 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from nel_utils.imputer import BlockKNNImputer, knn_impute
+
+sklearn_impute = pytest.importorskip('sklearn.impute')
+
+def frame(seed, n_rows=200, n_cols=5, missing=0.15):
+    rng = np.random.default_rng(seed)
+    values = rng.normal(size=(n_rows, n_cols))
+    values[rng.random(values.shape) < missing] = np.nan
+    return pd.DataFrame(values, columns=[f'x{i}' for i in range(n_cols)])
+
+@pytest.mark.parametrize('block_size', [7, 1024])
+@pytest.mark.parametrize('n_neighbors', [1, 5])
+def test_brute_matches_sklearn(block_size, n_neighbors):
+    df = frame(0)
+    expected = sklearn_impute.KNNImputer(n_neighbors=n_neighbors).fit_transform(df)
+    got = BlockKNNImputer(n_neighbors=n_neighbors, block_size=block_size).fit_transform(df)
+    np.testing.assert_allclose(got.to_numpy(), expected)
+    assert got.index.equals(df.index) and got.columns.equals(df.columns)
+
+def test_transform_uses_fitted_rows():
+    train, test = frame(1), frame(2, n_rows=50)
+    expected = sklearn_impute.KNNImputer(n_neighbors=3).fit(train).transform(test)
+    got = BlockKNNImputer(n_neighbors=3).fit(train).transform(test)
+    np.testing.assert_allclose(got.to_numpy(), expected)
+
+def test_tree_matches_sklearn_on_complete_donors():
+    pytest.importorskip('scipy')
+    train, test = frame(3, missing=0), frame(4, n_rows=80)
+    expected = sklearn_impute.KNNImputer(n_neighbors=4).fit(train).transform(test)
+    got = BlockKNNImputer(n_neighbors=4, algorithm='tree').fit(train).transform(test)
+    np.testing.assert_allclose(got.to_numpy(), expected)
+
+def test_tree_falls_back_to_brute_with_gaps():
+    pytest.importorskip('scipy')
+    df = frame(5)
+    brute = BlockKNNImputer(n_neighbors=5).fit_transform(df)
+    tree = BlockKNNImputer(n_neighbors=5, algorithm='tree').fit_transform(df)
+    assert not tree.isna().any().any()
+    assert tree.shape == brute.shape
+
+def test_knn_impute_fills_every_gap():
+    df = frame(6)
+    assert not knn_impute(df, n_neighbors=3).isna().any().any()
@@ -0,0 +1,68 @@
+import os
+
+import pandas as pd
+import pytest
+
+from nel_utils.logio import compress_log, open_log, read_index, read_log
+from nel_utils.logstore import LOG_COLUMNS, name_columns
+
+@pytest.fixture(params=['zstd', 'gzip'])
+def codec(request):
+    if request.param == 'zstd':
+        pytest.importorskip('pyarrow')
+    return request.param
+
+@pytest.fixture
+def log(tmp_path, make_log):
+    path = str(tmp_path / '_gp_0.csv')
+    # Two sweeps appended to one log, so runs interleave with their rows
+    make_log(path, n_runs=4, n_generations=30, seed=0)
+    make_log(path, n_runs=2, n_generations=30, seed=1)
+    return path
+
+def test_compressed_log_reads_like_the_plain_one(log, codec):
+    plain = pd.read_csv(log, header=None)
+    out = compress_log(log, codec, block_size=1024, remove=True)
+    assert not os.path.exists(log) and len(read_index(out)['blocks']) > 1
+
+    # The plain path falls back to the compressed log; rows are grouped by run
+    df = read_log(log)
+    assert len(df) == len(plain)
+    pd.testing.assert_frame_equal(df.sort_values([1, 4], ignore_index=True), plain.sort_values([1, 4], ignore_index=True))
+
+    chunks = list(read_log(out, chunksize=50))
+    assert sum(len(chunk) for chunk in chunks) == len(plain)
+    with open_log(out) as f:
+        assert f.read().count(b'\n') == len(plain)
+
+def test_run_id_reads_only_that_run(log, codec):
+    plain = pd.read_csv(log, header=None)
+    run_id = plain[1].iloc[-1]
+    out = compress_log(log, codec, block_size=1024)
+
+    df = read_log(out, run_id=run_id)
+    pd.testing.assert_frame_equal(df, plain[plain[1] == run_id].reset_index(drop=True))
+    assert len(read_index(out)['runs'][run_id]) < len(read_index(out)['blocks'])
+
+    both = read_log(out, run_id=plain[1].unique()[:2], usecols=[1, 4])
+    assert list(both.columns) == [1, 4] and len(both) == 60
+
+def test_missing_run_gives_empty_frame(log, codec):
+    out = compress_log(log, codec)
+
+    df = read_log(out, run_id='not-a-run')
+    assert df.empty and list(name_columns(df).columns) == LOG_COLUMNS
+    assert list(read_log(out, run_id=['not-a-run'], usecols=[1, 4]).columns) == [1, 4]
+    assert read_log(log, run_id=[]).empty
+
+    # Concatenates with runs that are there
+    run_id = read_log(out)[1].iloc[0]
+    assert len(read_log(out, run_id=['not-a-run', run_id])) == 30
+
+def test_invalid_arguments(log):
+    with pytest.raises(ValueError, match='codec'):
+        compress_log(log, 'lz4')
+    with pytest.raises(ValueError, match='chunksize'):
+        read_log(log, run_id='x', chunksize=10)
+    with pytest.raises(ValueError, match='usecols'):
+        read_log(log, run_id='x', usecols=[0, 4])
@@ -0,0 +1,59 @@
+import pandas as pd
+import pytest
+
+pytest.importorskip('pyarrow')
+
+from nel_utils.logstore import LOG_COLUMNS, LogStore, name_columns
+from nel_utils.selector import select_top_n
+
+@pytest.fixture
+def gsgp_logs(tmp_path, make_log):
+    log_dir = tmp_path / 'log'
+    log_dir.mkdir()
+    for cv in range(3):
+        make_log(str(log_dir / f'_gsgp_{cv}.csv'), n_runs=4, seed=cv, gsgp=True, variant='StandardGSGP')
+    return log_dir
+
+def read_frame(log_dir):
+    frames = []
+    for cv in range(3):
+        df = pd.read_csv(log_dir / f'_gsgp_{cv}.csv', header=None, dtype={9: str})
+        frames.append(df.assign(cv=cv))
+    return pd.concat(frames, ignore_index=True)
+
+def test_ingest_keeps_exact_sizes(gsgp_logs, tmp_path):
+    store = LogStore(str(tmp_path / 'store'))
+    assert store.ingest_dir(str(gsgp_logs), 'gsgp') == 60
+
+    df = store.read(algorithm='gsgp', cv=1).sort_values(['run_id', 'generation'])
+    raw = name_columns(pd.read_csv(gsgp_logs / '_gsgp_1.csv', header=None, dtype={9: str}))
+    raw = raw.sort_values(['run_id', 'generation'])
+    assert df['size_exact'].tolist() == raw['size'].tolist()
+    assert df['rmse_test'].tolist() == pytest.approx(raw['rmse_test'].tolist())
+    assert set(LOG_COLUMNS) - {'run_id'} <= set(df.columns)
+
+    # Re-ingesting a log replaces its runs instead of duplicating them
+    store.ingest(str(gsgp_logs / '_gsgp_1.csv'), 'gsgp', 1)
+    assert len(store.read(columns=['generation'], algorithm='gsgp', cv=1)) == 20
+
+def test_read_filters_partitions_and_columns(gsgp_logs, tmp_path):
+    store = LogStore(str(tmp_path / 'store'))
+    store.ingest_dir(str(gsgp_logs), 'gsgp')
+
+    df = store.read(columns=['cv', 'generation'], algorithm='gsgp', cv=[0, 2])
+    assert list(df.columns) == ['cv', 'generation']
+    assert sorted(df['cv'].unique()) == [0, 2] and len(df) == 40
+    assert store.read(algorithm='gp').empty
+
+def test_select_top_n_frame_and_store_agree(gsgp_logs, tmp_path):
+    store = LogStore(str(tmp_path / 'store'))
+    store.ingest_dir(str(gsgp_logs), 'gsgp')
+
+    # Frames return row labels of the frame they were given
+    df_log = read_frame(gsgp_logs)
+    df_log.index += 1000
+    rows = select_top_n(df_log, 'gsgp', k=5, n=3)
+    assert rows == sorted(rows) and set(rows) <= set(df_log.index)
+
+    picked = df_log.loc[rows]
+    assert sorted(zip(picked[1], picked[4])) == select_top_n(store, 'gsgp', k=5, n=3)
@@ -0,0 +1,99 @@
+import json
+import multiprocessing as mp
+import os
+import sys
+import types
+import uuid
+
+import pytest
+
+from nel_utils.manifest import manifest_path, read_manifest, recording
+
+@pytest.fixture
+def solver(monkeypatch):
+    """Solver whose module logs its settings to `<cwd>/log/slim_settings.csv`, as slim_gsgp's SLIM does."""
+    module = types.ModuleType('fake_slim_solver')
+    module.UNIQUE_RUN_ID = uuid.uuid1()
+
+    def log_settings(path, settings_dict, unique_run_id):
+        raise AssertionError('the original log_settings must not be called')
+
+    def slim(**params):
+        module.log_settings(
+            path=os.path.join(os.getcwd(), 'log', 'slim_settings.csv'),
+            settings_dict=[params], unique_run_id=module.UNIQUE_RUN_ID
+        )
+        return module.UNIQUE_RUN_ID
+
+    module.log_settings = log_settings
+    slim.__module__ = module.__name__
+    module.slim = slim
+    monkeypatch.setitem(sys.modules, module.__name__, module)
+    return slim
+
+def fit(solver, log_path, pop_size, seed=0):
+    fixed = {'n_iter': 3, 'log_path': log_path}
+    with recording(solver, 'slim', fixed, {'pop_size': pop_size}, seed, log_path) as run:
+        run_id = solver(pop_size=pop_size)
+    return run.run_id, run_id
+
+def lines(path):
+    with open(path) as f:
+        return [json.loads(line) for line in f]
+
+def test_manifest_lands_next_to_log_path(solver, tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    log_path = str(tmp_path / 'runs' / '_slim_0.csv')
+
+    recorded, logged = fit(solver, log_path, 10)
+    assert recorded == str(logged)
+
+    assert os.path.exists(tmp_path / 'runs' / '_slim_0_manifest.jsonl')
+    assert not os.path.exists(tmp_path / 'log')
+    assert sorted(os.listdir(tmp_path / 'runs')) == ['_slim_0_manifest.jsonl']
+
+def test_sweep_line_written_once(solver, tmp_path):
+    log_path = str(tmp_path / '_slim_0.csv')
+    run_ids = [fit(solver, log_path, pop_size)[0] for pop_size in (10, 20, 10)]
+    fit(solver, log_path, 10, seed=1)
+
+    records = lines(manifest_path(log_path))
+    sweeps = [record for record in records if 'run_id' not in record]
+    assert len(sweeps) == 1 and sweeps[0]['fixed'] == {'n_iter': 3}
+
+    df = read_manifest(log_path)
+    assert df.index[:3].tolist() == run_ids
+    assert df['pop_size'].tolist() == [10, 20, 10, 10] and df['seed'].tolist() == [0, 0, 0, 1]
+    assert (df['n_iter'] == 3).all()
+
+    # A recreated manifest gets its sweep line again
+    os.remove(manifest_path(log_path))
+    fit(solver, log_path, 10)
+    assert [('run_id' in record) for record in lines(manifest_path(log_path))] == [False, True]
+
+def _fit_many(log_path, n_runs):
+    module = types.ModuleType('fake_gp_solver')
+    module.log_settings = None
+
+    def gp(**params):
+        module.log_settings(path=log_path, settings_dict=[params], unique_run_id=uuid.uuid4())
+
+    gp.__module__ = module.__name__
+    sys.modules[module.__name__] = module
+    for pop_size in range(n_runs):
+        with recording(gp, 'gp', {'n_iter': 3}, {'pop_size': pop_size}, 0, log_path):
+            gp(pop_size=pop_size)
+
+def test_concurrent_writers_share_one_sweep_line(tmp_path):
+    log_path = str(tmp_path / '_gp_0.csv')
+    ctx = mp.get_context('fork')
+    procs = [ctx.Process(target=_fit_many, args=(log_path, 20)) for _ in range(4)]
+    for proc in procs:
+        proc.start()
+    for proc in procs:
+        proc.join()
+
+    records = lines(manifest_path(log_path))
+    assert len(records) == 81
+    assert sum('run_id' not in record for record in records) == 1
+    assert sorted(os.listdir(tmp_path)) == ['_gp_0_manifest.jsonl']
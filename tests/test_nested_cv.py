@@ -0,0 +1,151 @@
+import math
+
+import numpy as np
+import pytest
+from sklearn.model_selection import KFold
+
+from nel_utils import nested_cv
+from nel_utils.budget import Budget, censored
+from nel_utils.cache import ResultCache, make_key
+from nel_utils.hooks import Hooks
+from nel_utils.planner import Planner, expand
+from nel_utils.racing import Race, eliminated
+
+GRID = {'pop_size': [10, 20, 30, 40]}
+
+def budgeted_call(fixed_params, param_grid, seed, budget=None, **kwargs):
+    """Stand-in for call_model: pop_size 40 is always over its budget."""
+    assert isinstance(budget, Budget)
+    rng = np.random.default_rng(seed)
+    results = []
+    for dynamic_params in param_grid:
+        res = {'model': None, 'size': 10, 'dynamic_params': dynamic_params, 'run_id': str(dynamic_params)}
+        if dynamic_params['pop_size'] == 40:
+            res.update({
+                'rmse_train': math.nan, 'rmse_test': math.nan, 'size': None,
+                'censored': {'reason': 'size', 'limit': 1, 'value': 2, 'generation': None}
+            })
+        else:
+            res.update({'rmse_train': 1.0, 'rmse_test': dynamic_params['pop_size'] / 10 + rng.normal(scale=0.01)})
+        results.append(res)
+    return results
+
+@pytest.mark.parametrize('test', ['ttest', 'friedman'])
+def test_race_drops_censored_config(test, tmp_path):
+    X, y = np.arange(60.0).reshape(30, 2), np.arange(30.0)
+    results = nested_cv.run(
+        X, y, KFold(3), KFold(5), {'algorithm': 'gp'}, GRID, 0, str(tmp_path), 'synthetic', budgeted_call,
+        race=Race(test=test), budget=Budget(size=1)
+    )
+
+    assert len(results) == 5
+    assert all(censored(fold[3]) for fold in results[:2])
+
+    # Dropped once the race starts; the best config always survives
+    last = results[-1]
+    assert eliminated(last[3]) and last[3]['eliminated_at'] == 2
+    assert not eliminated(last[0]) and last[0]['rmse_test'] == pytest.approx(1.0, abs=0.1)
+
+def inner_score(i_outer, i_inner, dynamic_params):
+    """
+    Noisy near-ties between pop_size 10, 20 and 30, the best being 10 on outer
+    fold 0 and 30 on fold 1; pop_size 40 is always far behind.
+    """
+    i_config = dynamic_params['pop_size'] // 10 - 1
+    if i_config == 3:
+        return 10.0 + i_inner / 10
+    rank = i_config if i_outer == 0 else 2 - i_config
+    return 1.0 + 0.1 * [1.0, -1.0, 0.5, -0.5][(i_inner + i_config) % 4] + rank / 1000
+
+def cached_run(cache, X, y, cv_outer, cv_inner, fixed, seed):
+    """Store every inner and refit result run_all asks for, as if trained earlier."""
+    def put(dynamic_params, fold_ix, task_seed, rmse_test, run_id):
+        cache.put(make_key('gp', fixed, dynamic_params, fold_ix, task_seed), {
+            'model': None, 'rmse_train': rmse_test, 'rmse_test': rmse_test, 'size': 10,
+            'dynamic_params': dynamic_params, 'run_id': run_id
+        })
+
+    for i_outer, (learning_ix, test_ix) in enumerate(cv_outer.split(X, y)):
+        inner = cv_inner.split(X[learning_ix], y[learning_ix])
+        for i_inner, (train_ix, val_ix) in enumerate(inner):
+            for dynamic_params in expand(GRID):
+                put(dynamic_params, [learning_ix[train_ix], learning_ix[val_ix]], seed + i_inner,
+                    inner_score(i_outer, i_inner, dynamic_params), f'{i_outer}-{i_inner}-{dynamic_params}')
+        for dynamic_params in expand(GRID):
+            put(dynamic_params, [learning_ix, test_ix], seed, 0.5 + i_outer, f'{i_outer}-refit-{dynamic_params}')
+
+@pytest.fixture
+def cached(tmp_path):
+    X, y = np.arange(80.0).reshape(40, 2), np.arange(40.0)
+    cache = ResultCache(str(tmp_path / 'cache'))
+    cached_run(cache, X, y, KFold(2), KFold(4), {'n_iter': 3}, seed=7)
+    return X, y, cache
+
+def test_run_all_refits_the_best_config_per_outer_fold(cached, tmp_path):
+    X, y, cache = cached
+    hooks = Hooks()
+    events = []
+    for event in ('config_end', 'fold_end', 'run_end'):
+        hooks.on(event, events.append)
+
+    folds = nested_cv.run_all(
+        X, y, KFold(2), KFold(4), {'algorithm': 'gp', 'n_iter': 3}, GRID, 7, str(tmp_path), 'synthetic',
+        n_jobs=2, cache=cache, hooks=hooks
+    )
+
+    assert [fold['best_params'] for fold in folds] == [{'pop_size': 10}, {'pop_size': 30}]
+    assert [fold['rmse_test'] for fold in folds] == [0.5, 1.5]
+    assert folds[0]['inner_rmse'] == pytest.approx(1.0) and folds[1]['run_id'] == "1-refit-{'pop_size': 30}"
+    for i_outer, fold in enumerate(folds):
+        assert [[res['run_id'] for res in fold_res] for fold_res in fold['inner_results']] == [
+            [f'{i_outer}-{i_inner}-{dynamic_params}' for dynamic_params in expand(GRID)] for i_inner in range(4)
+        ]
+
+    configs = [info for info in events if info['event'] == 'config_end']
+    assert len(configs) == 2 * 4 * 4 + 2 and all(info['cached'] for info in configs)
+    assert sorted(info['fold'] for info in events if info['event'] == 'fold_end') == [
+        (i_outer, i_inner) for i_outer in range(2) for i_inner in range(4)
+    ]
+    assert events[-1]['event'] == 'run_end' and events[-1]['n_configs'] == 4
+
+@pytest.mark.parametrize('test', ['ttest', 'friedman'])
+def test_run_all_race_skips_the_loser(cached, tmp_path, test):
+    X, y, cache = cached
+    folds = nested_cv.run_all(
+        X, y, KFold(2), KFold(4), {'algorithm': 'gp', 'n_iter': 3}, GRID, 7, str(tmp_path), 'synthetic',
+        n_jobs=2, cache=cache, race=Race(test=test, min_folds=3)
+    )
+
+    assert [fold['best_params'] for fold in folds] == [{'pop_size': 10}, {'pop_size': 30}]
+    for fold in folds:
+        last = fold['inner_results'][-1]
+        assert [eliminated(res) for res in last] == [False, False, False, test == 'ttest']
+        assert not any(eliminated(res) for fold_res in fold['inner_results'][:3] for res in fold_res)
+
+def test_run_all_rejects_planner_and_queue(tmp_path):
+    X, y = np.arange(20.0).reshape(10, 2), np.arange(10.0)
+    with pytest.raises(ValueError, match='planner'):
+        nested_cv.run_all(X, y, KFold(2), KFold(2), {'algorithm': 'gp'}, GRID, 0, str(tmp_path), 'd', planner=Planner())
+
+def stacked(train, test):
+    """Train and test rows as one array, of the type the solvers were given."""
+    values = np.concatenate([np.asarray(train), np.asarray(test)])
+    if hasattr(train, 'detach'):
+        import torch
+        return torch.from_numpy(values)
+    return values
+
+def test_run_all_matches_run(fixed_params, tmp_path):
+    from nel_utils.caller import call_model
+
+    X, y = (stacked(fixed_params[f'{name}_train'], fixed_params[f'{name}_test']) for name in ('X', 'y'))
+    fixed = {k: v for k, v in fixed_params.items() if k not in ('X_train', 'y_train', 'X_test', 'y_test', 'log_path')}
+    grid = {'pop_size': [5, 10]}
+
+    folds = nested_cv.run_all(X, y, KFold(2), KFold(2), fixed, grid, 3, str(tmp_path / 'all'), 'synthetic', n_jobs=2)
+    inner = nested_cv.run(X, y, KFold(2), KFold(2), dict(fixed), grid, 3, str(tmp_path), 'synthetic', call_model)
+
+    # Same inner seeds and slices as nested_cv.run on the first outer fold
+    for fold_res, run_res in zip(folds[0]['inner_results'], inner, strict=True):
+        assert [res['rmse_test'] for res in fold_res] == pytest.approx([res['rmse_test'] for res in run_res])
+    assert all(fold['model'] is not None and 'best_params' in fold for fold in folds)
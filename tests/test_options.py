@@ -0,0 +1,35 @@
+import pickle
+
+import pytest
+
+from nel_utils.hooks import Hooks
+from nel_utils.options import RunOptions
+from nel_utils.retention import Retention
+
+def test_keywords_override_options():
+    base = RunOptions(retention=Retention('top_k'), cache='cache')
+    options = RunOptions.of(base, cache=None, set_max_depth=True)
+    assert options.cache is None and options.set_max_depth
+    assert options.retention is base.retention
+    assert base.cache == 'cache' and not base.set_max_depth
+
+    with pytest.raises(TypeError, match='cahce'):
+        RunOptions.of(base, cahce='cache')
+
+def test_kwargs_only_holds_given_fields():
+    hooks = Hooks()
+    assert RunOptions().kwargs() == {}
+    assert RunOptions(hooks=hooks, set_max_depth=True).kwargs() == {'hooks': hooks, 'set_max_depth': True}
+
+def test_task_drops_coordinator_state():
+    hooks = Hooks(trace_memory=True)
+    hooks.on('config_end', lambda info: None)
+    options = RunOptions(hooks=hooks, planner=object(), semantics=object(), queue=object(), budget='budget')
+
+    task = pickle.loads(pickle.dumps(RunOptions(hooks=hooks).task()))
+    assert task.trace_memory and not any(task.hooks.callbacks.values())
+
+    task = options.task()
+    assert task.planner is None and task.semantics is None and task.queue is None
+    assert task.budget == 'budget'
+    assert RunOptions().task().hooks is None
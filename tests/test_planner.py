@@ -0,0 +1,97 @@
+from itertools import product
+
+import pandas as pd
+import pytest
+
+from nel_utils import caller
+from nel_utils.hooks import Hooks
+from nel_utils.planner import CostModel, Planner, expand, parse_settings
+
+GRID = {'pop_size': [10, 100], 'max_depth': [5, 8], 'p_xo': [0.5, 0.8]}
+FIXED = {'algorithm': 'gp', 'init_depth': 2, 'n_iter': 10, 'log_path': 'log.csv'}
+
+def test_expand_is_lazy_product_order():
+    combos = expand(GRID)
+    assert next(combos) == {'pop_size': 10, 'max_depth': 5, 'p_xo': 0.5}
+    assert [next(combos)] + list(combos) == [dict(zip(GRID, values)) for values in product(*GRID.values())][1:]
+
+def test_plan_shares_runs_that_only_differ_in_max_depth():
+    combos = list(expand(GRID))
+    plan = Planner().plan(FIXED, iter(combos), set_max_depth=True)
+    assert sorted(i for _, group in plan for i in group) == list(range(8))
+    assert len(plan) == 4 and all(len(group) == 2 for _, group in plan)
+    for _, (first, other) in plan:
+        assert combos[first]['max_depth'] == 5 and combos[other]['max_depth'] == 8
+
+    # Without set_max_depth every grid point is its own run
+    assert len(Planner().plan(FIXED, expand(GRID))) == 8
+    assert len(Planner(dedupe=False).plan(FIXED, expand(GRID), set_max_depth=True)) == 8
+
+def test_plan_submits_most_expensive_first():
+    # No history: pop_size * n_iter; equal estimates keep grid order
+    plan = Planner().plan(FIXED, expand(GRID))
+    assert [cost for cost, _ in plan] == [1000.0] * 4 + [100.0] * 4
+    assert [group[0] for _, group in plan] == [4, 5, 6, 7, 0, 1, 2, 3]
+    assert [group[0] for _, group in Planner(longest_first=False).plan(FIXED, expand(GRID))] == list(range(8))
+
+def test_cost_model_estimates():
+    history = pd.DataFrame({
+        'pop_size': [10, 10, 100, 1000], 'p_xo': [0.5, 0.5, 0.5, 0.8], 'cost_per_gen': [0.1, 0.3, 1.0, 10.0]
+    })
+    model = CostModel(history)
+
+    # Seen configs: median of their runs, times n_iter
+    assert model.predict({'pop_size': 10, 'p_xo': 0.5, 'n_iter': 10}) == pytest.approx(2.0)
+
+    # Unseen ones: log-linear in pop_size, so between the neighbours
+    cost = model.predict({'pop_size': 300, 'n_iter': 1})
+    assert 1.0 < cost < 10.0
+    assert model.predict({'n_iter': 4, 'pop_size': 7, 'unknown': 'x'}) > 0
+
+    # Parameters the history does not know: pop_size * n_iter
+    assert CostModel().predict({'pop_size': 50, 'n_iter': 4}) == 200.0
+
+def test_cost_model_from_logs(tmp_path, make_log):
+    log_path = str(tmp_path / '_gp_0.csv')
+    rows = make_log(log_path, n_runs=2)
+    with open(tmp_path / '_gp_0_settings.csv', 'w') as f:
+        for run, pop_size in ((0, 10), (1, 100)):
+            f.write(f"{rows[5 * run][1]},{{'pop_size': {pop_size}, 'p_xo': 0.5, 'initializer': 'rhh', "
+                    f"'operator': <built-in function add>, 'prob_const': 0.2}}\n")
+
+    settings = parse_settings(str(tmp_path / '_gp_0_settings.csv'))
+    assert settings['pop_size'].tolist() == [10, 100] and settings['initializer'].tolist() == ['rhh', 'rhh']
+    assert 'operator' not in settings
+
+    model = CostModel.from_logs(log_path)
+    timing = pd.DataFrame(rows).groupby(1)[6].mean()
+    assert model.history.set_index('run_id')['cost_per_gen'].to_dict() == pytest.approx(timing.to_dict())
+    assert model.predict({'pop_size': 100, 'n_iter': 2}) == pytest.approx(2 * timing[rows[5][1]])
+
+    # Logs without settings are skipped
+    assert CostModel.from_logs(str(tmp_path / 'missing.csv')).history.empty
+
+def test_cost_model_from_timings():
+    table = pd.DataFrame({
+        'kind': ['config', 'config', 'config', 'fold'], 'fold': [0, 0, 0, 0], 'config': [0, 1, 2, None],
+        'n_iter': [10, 10, 10, None], 'cached': [False, False, True, False], 'wall': [2.0, 5.0, 0.0, 7.0],
+        'cpu': [2.0, 5.0, 0.0, 7.0], 'peak_mem': [None] * 4, 'phase_fit': [1.9, 4.9, 0.0, None],
+        'pop_size': [10, 100, 100, None], 'slow': [False] * 4
+    })
+    history = CostModel.from_timings(table).history
+    assert list(history.columns) == ['n_iter', 'pop_size', 'cost_per_gen']
+    assert history['cost_per_gen'].tolist() == [0.2, 0.5]
+
+def test_call_model_trains_duplicates_once(fixed_params):
+    hooks = Hooks()
+    starts = []
+    hooks.on('config_start', starts.append)
+    grid = {'pop_size': [5, 10], 'max_depth': [4, 6]}
+    results = caller.call_model(fixed_params, grid, seed=0, set_max_depth=True, planner=Planner(), hooks=hooks)
+
+    assert [res['dynamic_params'] for res in results] == list(expand(grid))
+    assert [res['profile'].get('duplicate_of') for res in results] == [None, 0, None, 2]
+    assert results[1]['run_id'] == results[0]['run_id'] and results[3]['rmse_test'] == results[2]['rmse_test']
+
+    # The larger population starts first
+    assert [info['config'] for info in starts if not info.get('cached')] == [2, 0]
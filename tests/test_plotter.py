@@ -0,0 +1,62 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from nel_utils.aggregator import GenerationStats
+from nel_utils.plotter import lttb, make_evolution_plot, make_slim_evolution_plots
+
+def test_lttb_keeps_ends_and_spikes():
+    x = np.arange(10_000)
+    y = np.sin(x / 500)
+    y[4321] = 50.0
+
+    idx = lttb(x, y, 200)
+    assert len(idx) == 200 and idx[0] == 0 and idx[-1] == len(x) - 1
+    assert (np.diff(idx) > 0).all()
+    assert 4321 in idx
+
+def test_lttb_short_or_degenerate_input():
+    x = np.arange(5.0)
+    assert lttb(x, x, 10).tolist() == [0, 1, 2, 3, 4]
+    assert lttb(x, x, 2).tolist() == [0, 1, 2, 3, 4]
+
+    # NaNs do not poison the triangle areas
+    y = np.full(100, np.nan)
+    y[::3] = np.arange(34.0)
+    idx = lttb(np.arange(100), y, 10)
+    assert len(idx) == 10 and (np.diff(idx) > 0).all()
+    assert len(lttb(np.arange(100), np.full(100, np.nan), 10)) == 10
+
+@pytest.fixture
+def figures(monkeypatch):
+    """Figures the plot functions would show."""
+    basedatatypes = pytest.importorskip('plotly.basedatatypes')
+    shown = []
+    monkeypatch.setattr(basedatatypes.BaseFigure, 'show', lambda fig, *args, **kwargs: shown.append(fig))
+    return shown
+
+@pytest.fixture
+def long_log(tmp_path, make_log):
+    path = str(tmp_path / '_slim_0.csv')
+    make_log(path, n_runs=2, n_generations=2000, variant='SLIM+SIG2')
+    make_log(path, n_runs=2, n_generations=2000, seed=1, variant='SLIM*ABS')
+    return pd.read_csv(path, header=None)
+
+def test_max_points_downsamples_with_webgl(long_log, figures):
+    make_evolution_plot(long_log, 'full')
+    make_evolution_plot(long_log, 'downsampled', max_points=300)
+    full, small = figures
+
+    assert [trace.type for trace in full.data] == ['scatter'] * 6
+    assert [trace.type for trace in small.data] == ['scattergl'] * 6
+    assert len(full.data[0].x) == 2000 and all(len(trace.x) == 300 for trace in small.data)
+    assert small.data[0].x[0] == 0 and small.data[0].x[-1] == 1999
+
+    # Aggregates give the same curves as the raw log
+    make_evolution_plot(GenerationStats().update(long_log), 'stats', max_points=300)
+    np.testing.assert_allclose(figures[-1].data[0].y, small.data[0].y)
+
+def test_slim_grid_downsamples_every_variant(long_log, figures):
+    make_slim_evolution_plots(1, 2, ['SLIM+SIG2', 'SLIM*ABS'], long_log, 'grid', var='size', max_points=100)
+    fig = figures[0]
+    assert len(fig.data) == 6 and all(trace.type == 'scattergl' and len(trace.x) == 100 for trace in fig.data)
@@ -0,0 +1,68 @@
+import numpy as np
+import pytest
+
+from nel_utils.racing import Race, eliminated, placeholder
+
+# Folds x configs: config 2 is clearly worse than 0 and 1
+TTEST_SCORES = np.array([[1.0, 1.05, 5.0], [1.1, 1.0, 5.2], [0.9, 1.0, 5.1]])
+
+# Six folds, config 3 always last
+FRIEDMAN_SCORES = np.array([
+    [1.0, 1.2, 1.1, 3.0], [1.1, 1.0, 1.3, 3.1], [0.9, 1.2, 1.0, 3.2],
+    [1.0, 1.1, 1.2, 2.9], [1.2, 1.0, 1.1, 3.3], [1.0, 1.1, 1.3, 3.0]
+])
+
+CASES = [('ttest', TTEST_SCORES), ('friedman', FRIEDMAN_SCORES)]
+
+@pytest.mark.parametrize('test, scores', CASES)
+def test_clear_loser_is_dropped(test, scores):
+    keep = Race(test=test).survivors(scores)
+    best = np.argmin(scores.mean(axis=0))
+    assert keep[best] and not keep[-1]
+
+@pytest.mark.parametrize('test', ['ttest', 'friedman'])
+def test_tied_configs_all_survive(test):
+    assert Race(test=test).survivors(np.full((4, 3), 2.5)).all()
+
+@pytest.mark.parametrize('test, scores', CASES)
+def test_too_few_folds_keeps_everything(test, scores):
+    race = Race(test=test, min_folds=len(scores) + 1)
+    assert race.survivors(scores).all()
+    assert race.survivors(scores[:, :1]).all()
+
+def test_friedman_without_significance_keeps_everything():
+    # Three folds are not enough for the omnibus test to reject
+    assert Race(test='friedman').survivors(FRIEDMAN_SCORES[:3]).all()
+
+@pytest.mark.parametrize('test, scores', CASES)
+def test_infinite_scores_rank_last(test, scores):
+    scores = np.column_stack([scores, scores[:, 0]])
+    scores[1, -1] = np.inf
+    keep = Race(test=test).survivors(scores)
+    assert not keep[-1] and keep[np.argmin(scores[:, :-1].mean(axis=0))]
+
+    # Only one finite config left: it is the only survivor
+    scores[0, :-2] = np.inf
+    assert Race(test=test).survivors(scores).tolist() == [False] * (scores.shape[1] - 2) + [True, False]
+
+    # Nothing finite to compare against
+    assert Race(test=test).survivors(np.full((3, 3), np.inf)).all()
+
+def test_nan_scores_are_rejected():
+    scores = TTEST_SCORES.copy()
+    scores[0, 1] = np.nan
+    with pytest.raises(ValueError, match='NaN'):
+        Race().survivors(scores)
+    with pytest.raises(ValueError):
+        Race().survivors(np.ones(3))
+
+def test_invalid_settings():
+    with pytest.raises(ValueError):
+        Race(test='anova')
+    with pytest.raises(ValueError):
+        Race(min_folds=1)
+
+def test_placeholder():
+    res = placeholder({'pop_size': 10}, 3)
+    assert eliminated(res) and res['eliminated_at'] == 3 and res['model'] is None
+    assert not eliminated({'rmse_test': 1.0})
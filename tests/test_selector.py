@@ -0,0 +1,63 @@
+import itertools
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from nel_utils.selector import pareto_fronts, select_pareto, size_rank
+
+def brute_force_fronts(points):
+    """Front index by repeatedly peeling off the non-dominated rows."""
+    points = np.asarray(points)
+    front = np.full(len(points), -1)
+    level = 0
+    while (front < 0).any():
+        left = np.flatnonzero(front < 0)
+        for i in left:
+            dominated = any(
+                (points[j] <= points[i]).all() and (points[j] < points[i]).any() for j in left
+            )
+            if not dominated:
+                front[i] = level
+        level += 1
+    return front
+
+@pytest.mark.parametrize('n_objectives', [2, 3])
+@pytest.mark.parametrize('seed', range(5))
+def test_pareto_fronts_matches_brute_force(n_objectives, seed):
+    rng = np.random.default_rng(seed)
+    # Few distinct values, so ties and duplicate rows are common
+    ranks = rng.integers(0, 6, size=(80, n_objectives))
+    assert (pareto_fronts(ranks) == brute_force_fronts(ranks)).all()
+
+def test_pareto_fronts_rejects_other_shapes():
+    with pytest.raises(ValueError):
+        pareto_fronts(np.zeros((4, 4)))
+
+def test_size_rank_compares_big_integers_exactly():
+    sizes = [str(10**30 + 1), str(10**30), '7', str(10**30 + 1)]
+    assert size_rank(sizes).tolist() == [2, 1, 0, 2]
+
+def test_select_pareto_matches_brute_force():
+    rng = np.random.default_rng(0)
+    rows = []
+    for cv, run, generation in itertools.product(range(2), range(3), range(10)):
+        rmse_train = round(rng.uniform(1, 2), 1)
+        size = str(10**25 * int(rng.integers(1, 5)) + int(rng.integers(0, 3)))
+        rows.append([
+            'StandardGSGP', f'run{run}', 'ds', 0, generation, rmse_train, 0.01, 1.0,
+            round(rmse_train + rng.uniform(0, 1), 1), size, 1, cv
+        ])
+    df_log = pd.DataFrame(rows).rename(columns={11: 'cv'})
+
+    out = select_pareto(df_log, 'gsgp', n_fronts=None, objectives=('rmse_test', 'size'))
+    for cv, group in df_log.groupby('cv'):
+        sizes = size_rank(group[9].astype(str))
+        points = np.column_stack([group[8].to_numpy(), sizes])
+        expected = pd.Series(brute_force_fronts(points), index=group.index)
+        got = out[out['cv'] == cv]['front']
+        assert got.sort_index().equals(expected.sort_index())
+
+    first = select_pareto(df_log, 'gsgp', n_fronts=1, objectives=('rmse_test', 'size'))
+    assert (first['front'] == 0).all()
+    assert len(first) == (out['front'] == 0).sum()
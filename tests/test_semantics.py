@@ -0,0 +1,94 @@
+import numpy as np
+import pytest
+
+from nel_utils.compiler import model_backend
+from nel_utils.semantics import SemanticsStore, compute_semantics, ensemble_predict, ensemble_score
+
+class Tree:
+    """GP tree on NumPy functions: x0 * 2 + x1."""
+
+    def __init__(self, add=np.add, mul=np.multiply):
+        self.FUNCTIONS = {'add': {'function': add, 'arity': 2}, 'mul': {'function': mul, 'arity': 2}}
+        self.TERMINALS = {'x0': 0, 'x1': 1}
+        self.CONSTANTS = {'c2': lambda _: 2.0}
+        self.repr_ = ('add', ('mul', 'x0', 'c2'), 'x1')
+
+class SlimTree(Tree):
+    """The same tree, typed as a slim_gsgp model."""
+
+SlimTree.__module__ = 'slim_gsgp.algorithms.GP.representations.tree'
+
+def test_backend_follows_the_model():
+    assert model_backend(Tree()) == 'numpy'
+    assert model_backend(SlimTree()) == 'torch'
+
+def test_numpy_model_semantics():
+    X = np.arange(12, dtype='float64').reshape(6, 2)
+    out = compute_semantics(Tree(), {'train': X, 'val': X[:2]})
+    assert out['train'].dtype == np.float32
+    np.testing.assert_allclose(out['train'], 2 * X[:, 0] + X[:, 1])
+    np.testing.assert_allclose(out['val'], out['train'][:2])
+    assert compute_semantics(Tree(), {}) == {}
+
+def test_slim_gsgp_model_runs_on_torch_with_numpy_input():
+    torch = pytest.importorskip('torch')
+
+    def strict(f):
+        def call(a, b):
+            assert isinstance(a, torch.Tensor) or isinstance(b, torch.Tensor)
+            return f(a, b)
+        return call
+
+    X = np.arange(12, dtype='float32').reshape(6, 2)
+    out = compute_semantics(SlimTree(strict(torch.add), strict(torch.mul)), {'train': X})
+    assert isinstance(out['train'], np.ndarray) and out['train'].dtype == np.float32
+    np.testing.assert_allclose(out['train'], 2 * X[:, 0] + X[:, 1])
+
+    # Tensors given to a NumPy model are converted
+    out = compute_semantics(Tree(), {'train': torch.from_numpy(X)})
+    np.testing.assert_allclose(out['train'], 2 * X[:, 0] + X[:, 1])
+
+def test_store_round_trip(tmp_path):
+    store = SemanticsStore(str(tmp_path / 'semantics'))
+    rng = np.random.default_rng(0)
+    vectors = {run_id: {'train': rng.normal(size=5), 'test': rng.normal(size=3)} for run_id in 'abc'}
+    for run_id, semantics in vectors.items():
+        store.put(run_id, semantics)
+
+    # Splits already stored are kept as they are
+    store.put('a', {'test': np.zeros(3), 'val': np.ones(4)})
+
+    assert 'a' in store and 'z' not in store
+    assert sorted(store.splits('a')) == ['test', 'train', 'val']
+    np.testing.assert_allclose(store.get('b', 'train'), vectors['b']['train'], rtol=1e-6)
+    np.testing.assert_allclose(store.get('a', 'test'), vectors['a']['test'], rtol=1e-6)
+
+    # A fresh instance reads the same data
+    matrix = SemanticsStore(store.root).matrix(['c', 'a'], 'test')
+    np.testing.assert_allclose(matrix, [vectors['c']['test'], vectors['a']['test']], rtol=1e-6)
+
+    store.put('d', {'test': np.zeros(4)})
+    with pytest.raises(ValueError):
+        store.matrix(['a', 'd'], 'test')
+    with pytest.raises(KeyError):
+        store.get('a', 'missing')
+
+def test_ensembles(tmp_path):
+    store = SemanticsStore(str(tmp_path / 'semantics'))
+    store.put('a', {'test': [1.0, 2.0, 3.0]})
+    store.put('b', {'test': [3.0, 4.0, 5.0]})
+    store.put('c', {'test': [2.0, 9.0, 4.0]})
+
+    np.testing.assert_allclose(ensemble_predict(store, ['a', 'b']), [2.0, 3.0, 4.0])
+    np.testing.assert_allclose(ensemble_predict(store, ['a', 'b', 'c'], how='median'), [2.0, 4.0, 4.0])
+
+    results = [
+        {'run_id': 'a', 'rmse_train': 1.0, 'rmse_test': 1.0},
+        {'run_id': 'b', 'rmse_train': 1.0, 'rmse_test': 3.0}
+    ]
+    np.testing.assert_allclose(ensemble_predict(store, results, how='weighted'), [1.5, 2.5, 3.5])
+    with pytest.raises(ValueError):
+        ensemble_predict(store, ['a', 'b'], how='weighted')
+
+    assert ensemble_score(store, ['a', 'b'], np.array([2.0, 3.0, 4.0])) == 0.0
+    assert ensemble_score(store, ['a'], np.array([2.0, 3.0, 4.0])) == pytest.approx(1.0)
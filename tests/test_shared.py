@@ -0,0 +1,65 @@
+import pickle
+
+import numpy as np
+import pytest
+
+from nel_utils import shared
+from nel_utils.caller import _get_executor
+from nel_utils.shared import FoldDatasets
+
+def fold_sums(fold):
+    return {name: float(values.sum()) for name, values in fold.params().items()}
+
+@pytest.fixture
+def data():
+    rng = np.random.default_rng(0)
+    return rng.normal(size=(20, 3)), rng.normal(size=20)
+
+def test_fold_slices_match_numpy(data):
+    X, y = data
+    train_ix, test_ix = np.arange(0, 20, 2), np.arange(1, 20, 2)
+    with FoldDatasets(X, y) as datasets:
+        params = datasets.fold(train_ix, test_ix).params()
+        np.testing.assert_array_equal(params['X_train'], X[train_ix])
+        np.testing.assert_array_equal(params['y_test'], y[test_ix])
+        np.testing.assert_array_equal(datasets.rows([3, 1]).params()['X'], X[[3, 1]])
+
+        split = datasets.split(X[:15], y[:15], X[15:], y[15:]).params()
+        np.testing.assert_array_equal(split['X_test'], X[15:])
+
+def test_handles_pickle_without_the_data(data):
+    X, y = data
+    with FoldDatasets(X, y) as datasets:
+        name = datasets.X.name
+        fold = datasets.fold(np.arange(10), np.arange(10, 20))
+        payload = pickle.dumps(fold)
+        assert len(payload) < X.nbytes
+
+        # A handle reattaches by name; the attachment is dropped once another owner's data is read
+        copy = pickle.loads(payload)
+        np.testing.assert_array_equal(copy.params()['X_test'], X[10:])
+        assert shared._OWNER[0] == datasets.id and shared._ATTACHED
+        with FoldDatasets(X) as other:
+            pickle.loads(pickle.dumps(other.rows([0]))).params()
+            assert shared._OWNER[0] == other.id
+
+    # Closing the owner unlinks its segments
+    with pytest.raises(FileNotFoundError):
+        shared._attach(name)
+
+def test_workers_read_the_shared_folds(data):
+    X, y = data
+    with FoldDatasets(X, y) as datasets:
+        folds = [datasets.fold(np.arange(k, 20, 4), np.arange(20)) for k in range(4)]
+        sums = list(_get_executor(2).map(fold_sums, folds))
+
+    assert [fold['X_train'] for fold in sums] == pytest.approx([float(X[k::4].sum()) for k in range(4)])
+    assert all(fold['y_test'] == pytest.approx(float(y.sum())) for fold in sums)
+
+def test_torch_tensors_come_back_as_tensors(data):
+    torch = pytest.importorskip('torch')
+    X, y = data
+    with FoldDatasets(torch.from_numpy(X), torch.from_numpy(y)) as datasets:
+        params = datasets.fold([0, 2], [1]).params()
+        assert isinstance(params['X_train'], torch.Tensor)
+        assert torch.equal(params['y_train'], torch.from_numpy(y[[0, 2]]))
@@ -0,0 +1,80 @@
+import os
+
+import pandas as pd
+import pytest
+
+from nel_utils.aggregator import GenerationStats
+from nel_utils.logio import compress_log
+from nel_utils.logstore import name_columns
+from nel_utils.tailer import LogTailer
+
+def test_poll_reads_only_appended_rows(tmp_path, make_log):
+    path = str(tmp_path / '_gp_0.csv')
+    tailer = LogTailer(str(tmp_path / '_gp_*.csv'))
+    assert tailer.poll() == 0 and tailer.runs.empty
+
+    rows = make_log(path, n_runs=2, n_generations=3)
+    assert tailer.poll() == 6 and tailer.poll() == 0
+
+    # A half-written line waits for the next poll
+    with open(path, 'a') as f:
+        f.write('StandardGP,run-x,synthetic,0,0,1.5,0.01,')
+    assert tailer.poll() == 0
+    with open(path, 'a') as f:
+        f.write('10.0,2.0,10,1\n')
+    assert tailer.poll() == 1
+
+    runs = tailer.runs
+    assert sorted(runs.index) == sorted({row[1] for row in rows} | {'run-x'})
+    assert runs.loc['run-x', 'rows'] == 1 and (runs['path'] == path).all()
+
+    grouped = name_columns(pd.DataFrame(rows)).groupby('run_id')
+    runs = runs.drop('run-x')
+    assert (runs['rows'] == 3).all() and (runs['generation'] == 2).all()
+    assert runs['best_rmse_train'].to_dict() == pytest.approx(grouped['rmse_train'].min().to_dict())
+    assert runs['timing'].to_dict() == pytest.approx(grouped['timing'].sum().to_dict())
+
+def test_stats_match_a_full_read(tmp_path, make_log):
+    tailer = LogTailer([str(tmp_path / '_gp_0.csv'), str(tmp_path / '_gp_1.csv')])
+    make_log(str(tmp_path / '_gp_0.csv'), n_runs=2, seed=0)
+    tailer.poll()
+    make_log(str(tmp_path / '_gp_0.csv'), n_runs=2, seed=1)
+    make_log(str(tmp_path / '_gp_1.csv'), n_runs=3, seed=2)
+    tailer.poll()
+
+    expected = GenerationStats()
+    for name in ('_gp_0.csv', '_gp_1.csv'):
+        expected.update(name_columns(pd.read_csv(tmp_path / name, header=None)))
+    for metric in ('rmse_train', 'size'):
+        pd.testing.assert_frame_equal(tailer.stats.frame(metric), expected.frame(metric))
+
+def test_rewritten_log_starts_over(tmp_path, make_log):
+    path = str(tmp_path / '_gp_0.csv')
+    make_log(path, n_runs=3)
+    tailer = LogTailer(path)
+    tailer.poll()
+
+    os.remove(path)
+    make_log(path, n_runs=1, seed=1)
+    assert tailer.poll() == 5 and len(tailer.runs) == 1
+
+@pytest.mark.parametrize('codec', ['zstd', 'gzip'])
+def test_compressed_logs(tmp_path, make_log, codec):
+    if codec == 'zstd':
+        pytest.importorskip('pyarrow')
+    path = str(tmp_path / '_gp_0.csv')
+    make_log(path, n_runs=3)
+
+    # Tailed, then compressed: the same log, not read again
+    tailer = LogTailer(str(tmp_path / '_gp_*'))
+    assert tailer.poll() == 15
+    compress_log(path, codec)
+    assert tailer.poll() == 0
+    os.remove(path)
+    assert tailer.poll() == 0 and len(tailer.runs) == 3
+
+    # Compressed before tailing: read whole, also through the plain path
+    for paths in (path, str(tmp_path / '_gp_*')):
+        tailer = LogTailer(paths)
+        assert tailer.poll() == 15 and tailer.poll() == 0
+        assert (tailer.runs['path'] == path).all() and tailer.runs['rows'].tolist() == [5] * 3
@@ -0,0 +1,72 @@
+import json
+import os
+import signal
+import time
+
+import pytest
+
+from nel_utils.caller import DATA_KEYS
+from nel_utils.manifest import read_manifest
+from nel_utils.workqueue import WorkQueue, start_workers
+
+pytest.importorskip('cloudpickle')
+
+def wait_for(condition, timeout=60.0):
+    start = time.monotonic()
+    while not (value := condition()):
+        if time.monotonic() - start > timeout:
+            raise TimeoutError
+        time.sleep(0.01)
+    return value
+
+def leases(queue):
+    """(key, attempt) -> lease, for the leases currently held."""
+    held = {}
+    for name in os.listdir(os.path.join(queue.root, 'leases')):
+        if not name.endswith('.tmp'):
+            key, attempt, _ = name.split('.')
+            try:
+                with open(os.path.join(queue.root, 'leases', name)) as f:
+                    held[key, int(attempt)] = json.load(f)
+            except (OSError, ValueError):
+                pass
+    return held
+
+def test_killed_worker_task_is_retried(fixed_params, tmp_path):
+    queue = WorkQueue(str(tmp_path / 'queue'), lease_timeout=2.0, max_retries=2, poll=0.05)
+    # Long enough runs that the first lease is still held when its worker is killed
+    fixed = {k: v for k, v in fixed_params.items() if k not in DATA_KEYS}
+    fixed['n_iter'] = 60
+    data = {k: (queue.share(fixed_params[k]), None) for k in DATA_KEYS}
+    grid = [{'pop_size': pop_size} for pop_size in (10, 20, 30, 40, 50, 60)]
+    keys = [queue.submit('gp', fixed, dynamic_params, 0, data) for dynamic_params in grid]
+    assert queue.status()['pending'] == len(grid)
+
+    victim, *workers = start_workers(queue.root, 3)
+    try:
+        (key, attempt), lease = wait_for(lambda: next(
+            (item for item in leases(queue).items() if item[1]['worker'].endswith('local0')), None
+        ))
+        os.kill(victim.pid, signal.SIGKILL)
+        victim.join()
+        assert attempt == 1 and not os.path.exists(os.path.join(queue.root, 'results', f'{key}.pkl'))
+
+        # Taken over once the lease expires, under the next attempt
+        retry = wait_for(lambda: leases(queue).get((key, 2)))
+        assert retry['worker'] != lease['worker']
+
+        results = list(queue.results(keys, timeout=120))
+    finally:
+        queue.stop()
+        for proc in workers:
+            proc.join(30)
+
+    assert victim.exitcode == -signal.SIGKILL and [proc.exitcode for proc in workers] == [0, 0]
+    assert [res['dynamic_params'] for res in results] == grid
+    assert not any(res['profile']['worker'] == lease['worker'] for res in results)
+    assert queue.status() == {'pending': 0, 'leased': 0, 'done': len(grid), 'failed': 0}
+
+    # Every task finished exactly once: one manifest entry per config, the killed run has none
+    runs = read_manifest(fixed['log_path'])
+    assert sorted(runs['pop_size']) == [res['pop_size'] for res in grid]
+    assert sorted(runs.index) == sorted(res['run_id'] for res in results)